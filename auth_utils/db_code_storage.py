@@ -1,50 +1,61 @@
-from sqlalchemy import select, insert, update
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import (
+    PASSWORD_RESET_EXPIRE_MINUTES,
+    VERIFICATION_CODE_EXPIRE_MINUTES,
+    VERIFICATION_CODE_MAX_ATTEMPTS,
+)
+from database import async_session_maker
 from models.user_models import verification_code
 
 
+CODE_EXPIRE_MINUTES = {
+    "verify_email": VERIFICATION_CODE_EXPIRE_MINUTES,
+    "reset_password": PASSWORD_RESET_EXPIRE_MINUTES,
+}
+
+
 class DBCodeStorage:
     """
     Verification va parol tiklash kodlarini saqlash uchun database versiyasi.
+    Har bir (user_id, type) uchun bitta qator: yozish bitta upsert, tekshirish bitta UPDATE ... RETURNING.
     """
 
+    def __init__(self, max_attempts: int = VERIFICATION_CODE_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+
     async def set_code(self, session: AsyncSession, user_id: int, code: str, code_type: str) -> bool:
         """
-        Yangi kod yaratish yoki mavjud kodni yangilash.
+        Yangi kod yaratish yoki mavjud kodni yangilash (INSERT ... ON CONFLICT DO UPDATE).
         """
         try:
-            # Avval borligini tekshiramiz
-            result = await session.execute(
-                select(verification_code).where(
-                    (verification_code.c.user_id == user_id)
-                    & (verification_code.c.type == code_type)
-                )
+            now = datetime.utcnow()
+            expires_at = now + timedelta(minutes=CODE_EXPIRE_MINUTES.get(code_type, VERIFICATION_CODE_EXPIRE_MINUTES))
+            stmt = pg_insert(verification_code).values(
+                user_id=user_id,
+                code=code,
+                type=code_type,
+                attempts=0,
+                expires_at=expires_at,
+                created_at=now,
             )
-            existing = result.fetchone()
-
-            if existing:
-                # Mavjud bo‘lsa, yangilaymiz
-                await session.execute(
-                    update(verification_code)
-                    .where(
-                        (verification_code.c.user_id == user_id)
-                        & (verification_code.c.type == code_type)
-                    )
-                    .values(code=code)
-                )
-                print(f"[DB UPDATE] user_id={user_id} ({code_type}) => {code}")
-            else:
-                # Yangi yozuv
-                await session.execute(
-                    insert(verification_code).values(
-                        user_id=user_id,
-                        code=code,
-                        type=code_type
-                    )
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    constraint="unique_user_code",
+                    set_={
+                        "code": stmt.excluded.code,
+                        "attempts": 0,
+                        "expires_at": stmt.excluded.expires_at,
+                        "created_at": stmt.excluded.created_at,
+                    },
                 )
-                print(f"[DB INSERT] user_id={user_id} ({code_type}) => {code}")
-
+            )
             await session.commit()
+            print(f"[DB UPSERT] user_id={user_id} ({code_type})")
             return True
 
         except Exception as e:
@@ -52,40 +63,66 @@ class DBCodeStorage:
             print(f"DBCodeStorage xatolik (set_code): {e}")
             return False
 
-
     async def get_code(self, session: AsyncSession, user_id: int, code_type: str) -> str | None:
+        """
+        Amaldagi kodni olish. Har bir chaqiruv urinish sifatida hisoblanadi;
+        muddati o'tgan yoki urinishlar limiti tugagan kod uchun None qaytadi.
+        """
         try:
             result = await session.execute(
-                select(verification_code.c.code).where(
+                update(verification_code)
+                .where(
                     (verification_code.c.user_id == user_id)
                     & (verification_code.c.type == code_type)
+                    & (verification_code.c.expires_at > datetime.utcnow())
+                    & (verification_code.c.attempts < self.max_attempts)
                 )
+                .values(attempts=verification_code.c.attempts + 1)
+                .returning(verification_code.c.code)
             )
             record = result.scalar()
-            print(f"[DB GET] user_id={user_id} ({code_type}) => {record}")
+            await session.commit()
+            print(f"[DB GET] user_id={user_id} ({code_type}) => {'topildi' if record else 'yoq'}")
             return record
         except Exception as e:
+            await session.rollback()
             print(f"DBCodeStorage xatolik (get_code): {e}")
             return None
 
-
     async def invalidate_code(self, session: AsyncSession, user_id: int, code_type: str) -> bool:
         try:
             await session.execute(
-                update(verification_code)
+                delete(verification_code)
                 .where(
                     (verification_code.c.user_id == user_id)
                     & (verification_code.c.type == code_type)
                 )
-                .values(code="0")
             )
             await session.commit()
-            print(f"[DB INVALIDATE] user_id={user_id} ({code_type}) => 0")
+            print(f"[DB INVALIDATE] user_id={user_id} ({code_type})")
             return True
         except Exception as e:
             await session.rollback()
             print(f"DBCodeStorage xatolik (invalidate_code): {e}")
             return False
 
+    async def purge_expired(self, session: AsyncSession) -> int:
+        result = await session.execute(
+            delete(verification_code).where(verification_code.c.expires_at <= datetime.utcnow())
+        )
+        await session.commit()
+        return result.rowcount or 0
+
 
 db_code_storage = DBCodeStorage()
+
+
+async def purge_expired_verification_codes() -> None:
+    """Scheduler job: muddati o'tgan kodlarni tozalash"""
+    try:
+        async with async_session_maker() as session:
+            deleted = await db_code_storage.purge_expired(session)
+        if deleted:
+            print(f"[DB PURGE] {deleted} ta eskirgan kod o'chirildi")
+    except Exception as e:
+        print(f"DBCodeStorage xatolik (purge_expired): {e}")
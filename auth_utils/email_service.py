@@ -1,15 +1,232 @@
-import requests
+import asyncio
+import contextlib
 import random
 import string
+import time
+from collections import deque
+from datetime import datetime, timedelta
 from typing import Optional
-from config import BREVO_API_KEY, EMAIL_FROM
 
+import httpx
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import (
+    BREVO_API_KEY,
+    EMAIL_FROM,
+    EMAIL_OUTBOX_MAX_ATTEMPTS,
+    EMAIL_OUTBOX_RATE_PER_MINUTE,
+    EMAIL_PROVIDER,
+)
+from database import async_session_maker
+from models.user_models import email_outbox
+
+
+class EmailSendError(Exception):
+    def __init__(self, message: str, *, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class BrevoEmailProvider:
+    """Brevo API orqali email yuborish"""
+
+    api_url = "https://api.brevo.com/v3/smtp/email"
+
+    def __init__(self, api_key: Optional[str], email_from: Optional[str]):
+        self.api_key = api_key
+        self.email_from = email_from
+
+    async def send(self, client: httpx.AsyncClient, message: dict) -> None:
+        payload = {
+            "sender": {"name": "CIMS", "email": self.email_from},
+            "to": [{"email": message["to_email"]}],
+            "subject": message["subject"],
+            "htmlContent": message["html_content"],
+        }
+        if message.get("text_content"):
+            payload["textContent"] = message["text_content"]
+
+        headers = {
+            "accept": "application/json",
+            "api-key": self.api_key,
+            "content-type": "application/json",
+        }
+        try:
+            response = await client.post(self.api_url, json=payload, headers=headers)
+        except httpx.HTTPError as exc:
+            raise EmailSendError(f"Brevo so'rov xatosi: {exc}") from exc
+        if response.status_code in (200, 201, 202):
+            return
+        retryable = response.status_code == 429 or response.status_code >= 500
+        raise EmailSendError(f"{response.status_code} - {response.text}", retryable=retryable)
+
+
+class StubEmailProvider:
+    """Offline provider: hech narsa yubormaydi, emaillarni xotirada saqlaydi (test va lokal ishlash uchun)"""
 
-class EmailService:
     def __init__(self):
-        self.api_url = "https://api.brevo.com/v3/smtp/email"
-        self.api_key = BREVO_API_KEY
-        self.email_from = EMAIL_FROM
+        self.sent: list[dict] = []
+        self.fail_next = 0
+
+    async def send(self, client: httpx.AsyncClient, message: dict) -> None:
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            raise EmailSendError("stub: sun'iy xato")
+        self.sent.append(dict(message))
+        print(f"📭 [stub] Email: {message['to_email']} - {message['subject']}")
+
+
+def build_email_provider():
+    """Sozlama xato bo'lsa ilova ishga tushmaydi: aks holda emaillar "sent" deb belgilanib, hech kimga bormaydi"""
+    provider = (EMAIL_PROVIDER or "").strip().lower()
+    if provider == "brevo":
+        if not BREVO_API_KEY or not EMAIL_FROM:
+            raise RuntimeError("EMAIL_PROVIDER=brevo uchun BREVO_API_KEY va EMAIL_FROM kerak (test uchun EMAIL_PROVIDER=stub)")
+        return BrevoEmailProvider(BREVO_API_KEY, EMAIL_FROM)
+    if provider == "stub":
+        print("⚠️ EMAIL_PROVIDER=stub: emaillar yuborilmaydi, faqat log qilinadi")
+        return StubEmailProvider()
+    raise RuntimeError(f"Noma'lum EMAIL_PROVIDER: {EMAIL_PROVIDER!r} (brevo yoki stub bo'lishi kerak)")
+
+
+class EmailOutboxWorker:
+    """
+    email_outbox jadvalidagi navbatni fon rejimida yuboradi.
+    Bitta umumiy httpx.AsyncClient, qayta urinishlar (exponential backoff) va daqiqalik limit bilan.
+    """
+
+    POLL_INTERVAL_SECONDS = 15
+    BATCH_SIZE = 20
+    # har bir yuborish uchun; batch lease'i yozuvlar soniga qarab hisoblanadi
+    SEND_LEASE_SECONDS = 30
+    SEND_TIMEOUT_SECONDS = 15.0
+    BACKOFF_BASE_SECONDS = 10
+    BACKOFF_MAX_SECONDS = 3600
+
+    def __init__(self, provider=None, *, rate_per_minute: int, max_attempts: int):
+        # None bo'lsa provayder start() da sozlamalardan quriladi: import paytida sozlama tekshirilmaydi
+        self.provider = provider
+        self.rate_per_minute = max(1, rate_per_minute)
+        self.max_attempts = max(1, max_attempts)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._sent_timestamps: deque[float] = deque()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        if self.provider is None:
+            self.provider = build_email_provider()
+        self._client = httpx.AsyncClient(timeout=httpx.Timeout(self.SEND_TIMEOUT_SECONDS, connect=5.0))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                processed = await self.process_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"❌ Email outbox xatolik: {exc}")
+                processed = 0
+            if processed:
+                continue
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), timeout=self.POLL_INTERVAL_SECONDS)
+
+    async def _claim_due(self, limit: int) -> list[dict]:
+        now = datetime.utcnow()
+        # faqat darhol yuboriladigan yozuvlar olinadi, shuning uchun lease kutish vaqtini qamrab olishi shart emas
+        lease_seconds = self.SEND_LEASE_SECONDS * limit
+        due_ids = (
+            select(email_outbox.c.id)
+            .where(
+                email_outbox.c.status.in_(("pending", "sending")),
+                email_outbox.c.next_attempt_at <= now,
+            )
+            .order_by(email_outbox.c.next_attempt_at.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with async_session_maker() as session:
+            # "sending" holatidagi yozuv lease tugaguncha boshqa worker tomonidan olinmaydi
+            result = await session.execute(
+                update(email_outbox)
+                .where(email_outbox.c.id.in_(due_ids))
+                .values(
+                    status="sending",
+                    attempts=email_outbox.c.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=lease_seconds),
+                )
+                .returning(email_outbox)
+            )
+            rows = [dict(row) for row in result.mappings().all()]
+            await session.commit()
+        return rows
+
+    async def _wait_free_rate_slots(self) -> int:
+        """Daqiqalik limitdan bo'sh joy chiqquncha kutadi va bo'sh joylar sonini qaytaradi"""
+        while True:
+            now = time.monotonic()
+            while self._sent_timestamps and now - self._sent_timestamps[0] >= 60:
+                self._sent_timestamps.popleft()
+            free_slots = self.rate_per_minute - len(self._sent_timestamps)
+            if free_slots > 0:
+                return free_slots
+            await asyncio.sleep(60 - (now - self._sent_timestamps[0]))
+
+    def _backoff_delay(self, attempts: int) -> float:
+        delay = min(self.BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)), self.BACKOFF_MAX_SECONDS)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def process_due(self) -> int:
+        free_slots = await self._wait_free_rate_slots()
+        rows = await self._claim_due(min(self.BATCH_SIZE, free_slots))
+        # joylar claim paytida band qilinadi, yuborish sikli limitni kutib lease'ni o'tkazib yubormaydi
+        self._sent_timestamps.extend([time.monotonic()] * len(rows))
+        for row in rows:
+            values: dict
+            try:
+                await self.provider.send(self._client, row)
+                values = {"status": "sent", "sent_at": datetime.utcnow(), "last_error": None}
+                print(f"✅ Email yuborildi: {row['to_email']}")
+            except Exception as exc:
+                retryable = getattr(exc, "retryable", True)
+                if retryable and row["attempts"] < self.max_attempts:
+                    values = {
+                        "status": "pending",
+                        "next_attempt_at": datetime.utcnow() + timedelta(seconds=self._backoff_delay(row["attempts"])),
+                        "last_error": str(exc)[:2000],
+                    }
+                else:
+                    values = {"status": "failed", "last_error": str(exc)[:2000]}
+                print(f"❌ Yuborishda xato ({row['to_email']}, urinish {row['attempts']}): {exc}")
+            async with async_session_maker() as session:
+                await session.execute(update(email_outbox).where(email_outbox.c.id == row["id"]).values(**values))
+                await session.commit()
+        return len(rows)
+
+
+class EmailService:
+    def __init__(self, worker: EmailOutboxWorker):
+        self.worker = worker
 
     def generate_verification_code(self, length: int = 4) -> str:
         """4 xonali tasdiqlash kodini yaratish"""
@@ -17,42 +234,31 @@ class EmailService:
 
     async def send_email(
         self,
+        session: AsyncSession,
         to_email: str,
         subject: str,
         html_content: str,
         text_content: Optional[str] = None
-    ) -> bool:
-        """Brevo API orqali email yuborish"""
-        try:
-            payload = {
-                "sender": {"name": "CIMS", "email": self.email_from},
-                "to": [{"email": to_email}],
-                "subject": subject,
-                "htmlContent": html_content,
-            }
-
-            if text_content:
-                payload["textContent"] = text_content
-
-            headers = {
-                "accept": "application/json",
-                "api-key": self.api_key,
-                "content-type": "application/json",
-            }
-
-            response = requests.post(self.api_url, json=payload, headers=headers)
-            if response.status_code in [200, 201]:
-                print(f"✅ Email yuborildi: {to_email}")
-                return True
-            else:
-                print(f"❌ Yuborishda xato: {response.status_code} - {response.text}")
-                return False
-
-        except Exception as e:
-            print(f"❌ Brevo API orqali yuborishda xatolik: {e}")
-            return False
-
-    async def send_verification_email(self, to_email: str, code: str) -> bool:
+    ) -> int:
+        """Emailni outbox navbatiga yozish; haqiqiy yuborishni fon worker bajaradi"""
+        result = await session.execute(
+            insert(email_outbox).values(
+                to_email=to_email,
+                subject=subject,
+                html_content=html_content,
+                text_content=text_content,
+                status="pending",
+                attempts=0,
+                next_attempt_at=datetime.utcnow(),
+                created_at=datetime.utcnow(),
+            ).returning(email_outbox.c.id)
+        )
+        outbox_id = result.scalar_one()
+        await session.commit()
+        self.worker.wake()
+        return outbox_id
+
+    async def send_verification_email(self, session: AsyncSession, to_email: str, code: str) -> int:
         subject = "Email Tasdiqlash - CIMS"
         html_content = f"""
         <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
@@ -64,9 +270,9 @@ class EmailService:
             <p>Hurmat bilan, <strong>CIMS jamoasi</strong></p>
         </div>
         """
-        return await self.send_email(to_email, subject, html_content)
+        return await self.send_email(session, to_email, subject, html_content)
 
-    async def send_password_reset_email(self, to_email: str, code: str) -> bool:
+    async def send_password_reset_email(self, session: AsyncSession, to_email: str, code: str) -> int:
         subject = "Parol Tiklash - CIMS"
         html_content = f"""
         <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
@@ -78,7 +284,11 @@ class EmailService:
             <p>Hurmat bilan, <strong>CIMS jamoasi</strong></p>
         </div>
         """
-        return await self.send_email(to_email, subject, html_content)
+        return await self.send_email(session, to_email, subject, html_content)
 
 
-email_service = EmailService()
+email_outbox_worker = EmailOutboxWorker(
+    rate_per_minute=EMAIL_OUTBOX_RATE_PER_MINUTE,
+    max_attempts=EMAIL_OUTBOX_MAX_ATTEMPTS,
+)
+email_service = EmailService(email_outbox_worker)
@@ -0,0 +1,53 @@
+import time
+from collections import deque
+
+from config import CODE_RESEND_EMAIL_LIMIT, CODE_RESEND_IP_LIMIT, CODE_RESEND_WINDOW_SECONDS
+
+
+class SlidingWindowRateLimiter:
+    """
+    Process ichidagi oddiy limiter: har bir kalit uchun oxirgi `window_seconds` ichidagi urinishlar soni.
+    """
+
+    MAX_KEYS = 50_000
+
+    def __init__(self, limit: int, window_seconds: int):
+        self.limit = max(1, limit)
+        self.window_seconds = window_seconds
+        self._hits: dict[str, deque[float]] = {}
+
+    def _prune(self, now: float) -> None:
+        for key in list(self._hits.keys()):
+            hits = self._hits[key]
+            while hits and now - hits[0] >= self.window_seconds:
+                hits.popleft()
+            if not hits:
+                self._hits.pop(key, None)
+
+    def allow(self, key: str) -> bool:
+        now = time.monotonic()
+        if len(self._hits) > self.MAX_KEYS:
+            self._prune(now)
+        hits = self._hits.setdefault(key, deque())
+        while hits and now - hits[0] >= self.window_seconds:
+            hits.popleft()
+        if len(hits) >= self.limit:
+            return False
+        hits.append(now)
+        return True
+
+
+class CodeResendRateLimiter:
+    """Kod yuborish so'rovlari uchun email va IP bo'yicha limit"""
+
+    def __init__(self):
+        self.by_email = SlidingWindowRateLimiter(CODE_RESEND_EMAIL_LIMIT, CODE_RESEND_WINDOW_SECONDS)
+        self.by_ip = SlidingWindowRateLimiter(CODE_RESEND_IP_LIMIT, CODE_RESEND_WINDOW_SECONDS)
+
+    def allow(self, email: str, ip_address: str | None) -> bool:
+        if ip_address and not self.by_ip.allow(ip_address):
+            return False
+        return self.by_email.allow((email or "").strip().lower())
+
+
+code_resend_limiter = CodeResendRateLimiter()
@@ -0,0 +1,120 @@
+"""
+Measures how long a visitor waits before seeing the first words of an AI reply, streamed versus
+a single full completion, against the local fake LLM. Also checks that aborting a stream makes the
+fake upstream see the disconnect (i.e. generation is actually cancelled).
+
+Usage:
+    python -m benchmarks.ai_reply_ttft
+    python -m benchmarks.ai_reply_ttft --requests 20 --concurrency 5 --first-token-delay 1.2
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.fake_llm import FakeLLMServer
+from cognilabsai.llm_stream import LLMStreamAborted, stream_chat_completion
+
+
+PAYLOAD = {"model": "fake", "messages": [{"role": "user", "content": "Salom"}]}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(label: str, values: list[float]) -> None:
+    print(
+        f"{label:<28} p50={statistics.median(values):.3f}s "
+        f"p95={percentile(values, 0.95):.3f}s max={max(values):.3f}s",
+        flush=True,
+    )
+
+
+async def run_full(client: httpx.AsyncClient, url: str) -> float:
+    started = time.perf_counter()
+    response = await client.post(url, json=PAYLOAD, timeout=60)
+    response.raise_for_status()
+    response.json()
+    return time.perf_counter() - started
+
+
+async def run_streamed(client: httpx.AsyncClient, url: str) -> tuple[float, float]:
+    result = await stream_chat_completion(client, url, headers={}, payload=PAYLOAD, on_delta=_noop, timeout=60)
+    return result["first_token_seconds"], result["total_seconds"]
+
+
+async def _noop(delta: str) -> None:
+    return None
+
+
+async def run_aborted(client: httpx.AsyncClient, url: str, abort_after: float) -> bool:
+    deadline = time.perf_counter() + abort_after
+    try:
+        await stream_chat_completion(
+            client,
+            url,
+            headers={},
+            payload=PAYLOAD,
+            on_delta=_noop,
+            should_abort=lambda: time.perf_counter() >= deadline,
+            abort_poll_seconds=0.05,
+            timeout=60,
+        )
+    except LLMStreamAborted:
+        return True
+    return False
+
+
+async def bounded(concurrency: int, jobs):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with semaphore:
+            return await job()
+
+    return await asyncio.gather(*(run(job) for job in jobs))
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    server = FakeLLMServer(first_token_delay=args.first_token_delay, token_delay=args.token_delay)
+    port = await server.start()
+    url = f"http://127.0.0.1:{port}/v1/chat/completions"
+    print(f"fake generation time {server.generation_seconds:.2f}s, {args.requests} requests x{args.concurrency}", flush=True)
+    try:
+        async with httpx.AsyncClient() as client:
+            full = await bounded(args.concurrency, [lambda: run_full(client, url)] * args.requests)
+            streamed = await bounded(args.concurrency, [lambda: run_streamed(client, url)] * args.requests)
+            cancelled_before = server.stats["cancelled"]
+            aborted = await bounded(
+                args.concurrency,
+                [lambda: run_aborted(client, url, server.first_token_delay + 0.5)] * args.concurrency,
+            )
+            await asyncio.sleep(server.token_delay * 4)
+    finally:
+        await server.stop()
+
+    summarize("full completion (first byte)", full)
+    summarize("streamed: first token", [ttft for ttft, _ in streamed])
+    summarize("streamed: last token", [total for _, total in streamed])
+    print(
+        f"aborted streams: {sum(aborted)}/{len(aborted)} raised LLMStreamAborted, "
+        f"upstream saw {server.stats['cancelled'] - cancelled_before} disconnects",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--first-token-delay", type=float, default=1.2)
+    parser.add_argument("--token-delay", type=float, default=0.04)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Messages per second through cognilabsai.service.create_message on a local Postgres.
+
+Uses the database from the usual DB_* environment variables. A throwaway conversation with
+channel "benchmark" is created and removed afterwards.
+
+Usage:
+    python -m benchmarks.create_message_throughput --messages 2000 --concurrency 8
+
+`--legacy` also runs the previous statement sequence (lookup, insert, update, commit, re-select)
+against the same database for comparison.
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+from sqlalchemy import delete, insert, select, update
+
+from database import async_session_maker
+from cognilabsai import service
+from cognilabsai.tables import cognilabsai_conversation, cognilabsai_message
+
+
+async def legacy_create_message(session, conversation_id: int, text_value: str) -> dict:
+    await session.execute(select(cognilabsai_conversation).where(cognilabsai_conversation.c.id == conversation_id))
+    result = await session.execute(
+        insert(cognilabsai_message).values(
+            conversation_id=conversation_id,
+            channel="benchmark",
+            sender_type="client",
+            text=text_value,
+            is_read=False,
+            created_at=service.utcnow(),
+        ).returning(cognilabsai_message.c.id)
+    )
+    message_id = result.scalar_one()
+    await session.execute(
+        update(cognilabsai_conversation)
+        .where(cognilabsai_conversation.c.id == conversation_id)
+        .values(
+            last_message_at=service.utcnow(),
+            last_message_preview=text_value,
+            unread_count=cognilabsai_conversation.c.unread_count + 1,
+            updated_at=service.utcnow(),
+        )
+    )
+    await session.commit()
+    await session.execute(update(cognilabsai_conversation).where(cognilabsai_conversation.c.id == conversation_id).values(**service.FOLLOW_UP_RESET_VALUES))
+    await session.commit()
+    result = await session.execute(select(cognilabsai_message).where(cognilabsai_message.c.id == message_id))
+    return dict(result.mappings().first())
+
+
+async def current_create_message(session, conversation_id: int, text_value: str) -> dict:
+    return await service.create_message(
+        session,
+        conversation_id=conversation_id,
+        channel="benchmark",
+        sender_type="client",
+        text_value=text_value,
+    )
+
+
+async def run(label: str, create, conversation_id: int, total: int, concurrency: int) -> None:
+    queue: asyncio.Queue = asyncio.Queue()
+    for index in range(total):
+        queue.put_nowait(index)
+
+    async def worker():
+        async with async_session_maker() as session:
+            while True:
+                try:
+                    index = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await create(session, conversation_id, f"benchmark message {index}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<10} {total} messages in {elapsed:6.2f}s  ->  {total / elapsed:8.1f} msg/s")
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    async with async_session_maker() as session:
+        await service.ensure_schema(session)
+        result = await session.execute(
+            insert(cognilabsai_conversation)
+            .values(channel="benchmark", client_external_id=uuid4().hex, unread_count=0, created_at=service.utcnow(), updated_at=service.utcnow())
+            .returning(cognilabsai_conversation.c.id)
+        )
+        conversation_id = result.scalar_one()
+        await session.commit()
+    try:
+        if args.legacy:
+            await run("legacy", legacy_create_message, conversation_id, args.messages, args.concurrency)
+        await run("current", current_create_message, conversation_id, args.messages, args.concurrency)
+    finally:
+        async with async_session_maker() as session:
+            await session.execute(delete(cognilabsai_message).where(cognilabsai_message.c.conversation_id == conversation_id))
+            await session.execute(delete(cognilabsai_conversation).where(cognilabsai_conversation.c.id == conversation_id))
+            await session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--legacy", action="store_true")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Local stand-in for an OpenAI-compatible /chat/completions endpoint, for exercising the streaming
+reply path without an API key.
+
+Usage:
+    python -m benchmarks.fake_llm --port 8900 --first-token-delay 1.5 --token-delay 0.04
+
+Then point the integration's openai_base_url at http://127.0.0.1:8900/v1.
+Requests with "stream": true get SSE chunks, one word per chunk; other requests get one JSON
+body after the whole "generation" time. Streams the client hangs up on are counted as cancelled.
+
+Fault injection (also adjustable at runtime through `set_faults`):
+    --error-rate 0.3    answer 30% of requests with 503
+    --slow-rate 0.5     delay 50% of requests by --slow-seconds before answering
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Optional
+
+
+DEFAULT_REPLY = (
+    "Assalomu alaykum! Men Cognilabs kompaniyasining AI yordamchisiman. "
+    "Sizga qaysi xizmatlarimiz qiziq: veb-sayt, mobil ilova, CRM yoki chatbot? "
+    "Qisqacha biznesingiz haqida yozsangiz, mutaxassisimiz siz bilan bog'lanadi."
+)
+
+
+class FakeLLMServer:
+    def __init__(
+        self,
+        reply: str = DEFAULT_REPLY,
+        first_token_delay: float = 1.5,
+        token_delay: float = 0.04,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_seconds: float = 30.0,
+        seed: int = 3,
+    ):
+        self.words = reply.split(" ")
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self._random = random.Random(seed)
+        self.stats = {"requests": 0, "streams": 0, "completed": 0, "cancelled": 0, "errors": 0, "slowed": 0}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def set_faults(self, error_rate: float = 0.0, slow_rate: float = 0.0, slow_seconds: Optional[float] = None) -> None:
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        if slow_seconds is not None:
+            self.slow_seconds = slow_seconds
+
+    @property
+    def generation_seconds(self) -> float:
+        return self.first_token_delay + self.token_delay * (len(self.words) - 1)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[dict]:
+        head = await reader.readuntil(b"\r\n\r\n")
+        content_length = 0
+        for line in head.decode("latin-1").split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                content_length = int(value.strip())
+        body = await reader.readexactly(content_length) if content_length else b"{}"
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    payload = await self._read_request(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                self.stats["requests"] += 1
+                if self._random.random() < self.slow_rate:
+                    self.stats["slowed"] += 1
+                    await asyncio.sleep(self.slow_seconds)
+                if self._random.random() < self.error_rate:
+                    self.stats["errors"] += 1
+                    await self._error(writer)
+                    continue
+                if payload and payload.get("stream"):
+                    await self._stream(writer)
+                    return
+                await self._complete(writer)
+        finally:
+            writer.close()
+
+    def _chunk(self, delta: dict, finish_reason: Optional[str] = None) -> bytes:
+        body = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(body, ensure_ascii=False)}\n\n".encode("utf-8")
+
+    async def _stream(self, writer: asyncio.StreamWriter) -> None:
+        self.stats["streams"] += 1
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        try:
+            writer.write(self._chunk({"role": "assistant", "content": ""}))
+            await writer.drain()
+            await asyncio.sleep(self.first_token_delay)
+            for index, word in enumerate(self.words):
+                if reader_gone(writer):
+                    raise ConnectionResetError()
+                writer.write(self._chunk({"content": word if index == 0 else f" {word}"}))
+                await writer.drain()
+                await asyncio.sleep(self.token_delay)
+            writer.write(self._chunk({}, finish_reason="stop"))
+            writer.write(b"data: [DONE]\n\n")
+            await writer.drain()
+            self.stats["completed"] += 1
+        except ConnectionError:
+            self.stats["cancelled"] += 1
+
+    async def _error(self, writer: asyncio.StreamWriter) -> None:
+        body = b'{"error": {"message": "injected fault", "type": "server_error"}}'
+        writer.write(
+            b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: application/json\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii")
+            + body
+        )
+        await writer.drain()
+
+    async def _complete(self, writer: asyncio.StreamWriter) -> None:
+        await asyncio.sleep(self.generation_seconds)
+        body = json.dumps(
+            {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": " ".join(self.words)},
+                        "finish_reason": "stop",
+                    }
+                ],
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii")
+            + body
+        )
+        await writer.drain()
+        self.stats["completed"] += 1
+
+
+def reader_gone(writer: asyncio.StreamWriter) -> bool:
+    return writer.is_closing() or writer.transport.is_closing()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    server = FakeLLMServer(
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay,
+        error_rate=args.error_rate,
+        slow_rate=args.slow_rate,
+        slow_seconds=args.slow_seconds,
+    )
+    port = await server.start(args.host, args.port)
+    print(f"fake LLM listening on http://{args.host}:{port}/v1 (generation {server.generation_seconds:.2f}s)", flush=True)
+    started = time.perf_counter()
+    try:
+        while True:
+            await asyncio.sleep(30)
+            print(f"[{time.perf_counter() - started:.0f}s] {server.stats}", flush=True)
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--first-token-delay", type=float, default=1.5)
+    parser.add_argument("--token-delay", type=float, default=0.04)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-seconds", type=float, default=30.0)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
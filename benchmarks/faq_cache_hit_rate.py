@@ -0,0 +1,117 @@
+"""
+Replays visitor questions through FAQAnswerIndex and reports hit rate, false-hit rate, lookup
+cost and the model time saved.
+
+Usage:
+    python -m benchmarks.faq_cache_hit_rate
+    python -m benchmarks.faq_cache_hit_rate --trace questions.jsonl --llm-seconds 4.5
+
+Trace format (JSON lines): {"question": "...", "intent": "price_site"}
+`intent` is optional; when present, a hit on an entry with a different intent counts as a false
+hit. Every missed question with an intent is treated as approved by an operator (as they would
+approve the pending candidate), at most --max-per-intent phrasings per intent. Without --trace a
+synthetic stream of paraphrased Uzbek/Russian questions is generated (typos, punctuation and word
+order vary).
+"""
+import argparse
+import json
+import random
+import time
+
+from cognilabsai.faq_cache import FAQAnswerIndex, is_cacheable_question, normalize_question
+
+
+INTENTS = {
+    "price_site": ["sayt qilish narxi qancha", "sayt narxi qancha", "veb sayt qancha turadi", "сколько стоит сайт"],
+    "price_bot": ["telegram bot narxi qancha", "bot qilish qancha turadi", "сколько стоит телеграм бот"],
+    "price_crm": ["crm tizim narxi qancha", "crm qancha turadi", "сколько стоит crm система"],
+    "price_app": ["mobil ilova narxi qancha", "ilova qilish qancha turadi", "сколько стоит мобильное приложение"],
+    "address": ["ofisingiz qayerda joylashgan", "manzilingiz qayerda", "где находится ваш офис"],
+    "duration": ["sayt necha kunda tayyor bo'ladi", "qancha vaqtda qilib berasiz", "за сколько дней сделаете сайт"],
+    "portfolio": ["portfoliongizni ko'rsata olasizmi", "qilgan ishlaringiz bormi", "можно посмотреть ваши работы"],
+}
+
+
+def perturb(rng: random.Random, question: str) -> str:
+    words = question.split(" ")
+    if len(words) > 2 and rng.random() < 0.2:
+        index = rng.randrange(len(words) - 1)
+        words[index], words[index + 1] = words[index + 1], words[index]
+    text_value = " ".join(words)
+    if rng.random() < 0.3:
+        position = rng.randrange(len(text_value))
+        text_value = text_value[:position] + text_value[position + 1:]
+    if rng.random() < 0.3:
+        text_value = text_value.replace("'", "ʻ")
+    if rng.random() < 0.5:
+        text_value = text_value.capitalize() + rng.choice(["?", "??", " ?", "!", ""])
+    return text_value
+
+
+def build_synthetic_trace(count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    intents = list(INTENTS)
+    weights = [40, 15, 10, 10, 8, 10, 7]
+    trace = []
+    for _ in range(count):
+        if rng.random() < 0.25:
+            # one-off questions the cache should not answer
+            trace.append({"question": f"bizda {rng.randint(2, 400)} ta xodim bor, {rng.choice(['integratsiya', 'hisobot', 'ombor'])} kerak", "intent": None})
+            continue
+        intent = rng.choices(intents, weights=weights)[0]
+        trace.append({"question": perturb(rng, rng.choice(INTENTS[intent])), "intent": intent})
+    return trace
+
+
+def load_trace(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as source:
+        return [json.loads(line) for line in source if line.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace")
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--max-per-intent", type=int, default=5)
+    parser.add_argument("--llm-seconds", type=float, default=4.0, help="average generate_ai_reply latency")
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace) if args.trace else build_synthetic_trace(args.questions, args.seed)
+    index = FAQAnswerIndex()
+    index.rebuild([], 1)
+    entries: list[dict] = []
+    approved_per_intent: dict = {}
+    eligible = hits = false_hits = 0
+    lookup_seconds = 0.0
+    for item in trace:
+        question = item["question"]
+        if not is_cacheable_question(normalize_question(question)):
+            continue
+        eligible += 1
+        started = time.perf_counter()
+        match = index.lookup(question)
+        lookup_seconds += time.perf_counter() - started
+        if match is not None:
+            hits += 1
+            if item.get("intent") != match[0].get("intent"):
+                false_hits += 1
+            continue
+        index.record_generation(args.llm_seconds)
+        intent = item.get("intent")
+        if intent and approved_per_intent.get(intent, 0) < args.max_per_intent:
+            approved_per_intent[intent] = approved_per_intent.get(intent, 0) + 1
+            entries.append({"id": len(entries) + 1, "question_text": question, "answer_text": intent, "intent": intent})
+            index.rebuild(entries, 1)
+
+    if not eligible:
+        print("no cacheable questions in trace")
+        return
+    print(f"{len(trace)} questions, {eligible} cacheable, {len(entries)} approved entries")
+    print(f"hit rate {hits / eligible:.1%} ({hits}), false hits {false_hits}")
+    print(f"lookup mean {lookup_seconds / eligible * 1e6:.0f}us")
+    print(f"model time saved ~{hits * args.llm_seconds / 60:.1f} min at {args.llm_seconds}s per generation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Compares a fresh httpx.AsyncClient per call with the shared pooled client from utils.http_clients
+against a local mock upstream.
+
+Usage:
+    python -m benchmarks.http_client_pool
+    python -m benchmarks.http_client_pool --requests 300 --concurrency 10 --handshake-delay 0.03
+
+The mock server speaks HTTP/1.1 with keep-alive over plain TCP. --handshake-delay is applied once
+per new connection to stand in for the TCP+TLS round trips to a remote API, which loopback does
+not have.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from utils.http_clients import HTTPClientRegistry, UpstreamSettings
+
+
+RESPONSE_BODY = b'{"choices":[{"message":{"content":"ok"}}]}'
+
+
+async def run_mock_server(handshake_delay: float, response_delay: float) -> tuple[asyncio.AbstractServer, int]:
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        await asyncio.sleep(handshake_delay)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                await asyncio.sleep(response_delay)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(RESPONSE_BODY)}\r\n\r\n".encode()
+                    + RESPONSE_BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def measure(call, total: int, concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies
+
+
+def describe(label: str, latencies: list[float]) -> str:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return f"{label:<22} mean {statistics.mean(ordered) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms"
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    server, port = await run_mock_server(args.handshake_delay, args.response_delay)
+    url = f"http://127.0.0.1:{port}/v1/chat/completions"
+    payload = {"model": "mock", "messages": [{"role": "user", "content": "salom"}]}
+    registry = HTTPClientRegistry({"mock": UpstreamSettings(timeout=10.0, max_connections=args.concurrency, http2=False)})
+
+    async def fresh_client_call():
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            (await client.post(url, json=payload)).raise_for_status()
+
+    async def pooled_client_call():
+        async with registry.use("mock") as client:
+            (await client.post(url, json=payload)).raise_for_status()
+
+    async with server:
+        fresh = await measure(fresh_client_call, args.requests, args.concurrency)
+        pooled = await measure(pooled_client_call, args.requests, args.concurrency)
+        await registry.aclose()
+
+    print(describe("fresh client per call", fresh))
+    print(describe("pooled registry client", pooled))
+    saved = statistics.mean(fresh) - statistics.mean(pooled)
+    print(f"saved per call:        {saved * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--handshake-delay", type=float, default=0.03, help="per-connection setup cost, seconds")
+    parser.add_argument("--response-delay", type=float, default=0.005, help="server think time, seconds")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Drives post_llm against the fault-injecting fake LLM through three phases (healthy, outage,
+recovery) and reports, per phase, how long callers were held, how many calls fell back
+immediately and how many requests still reached the failing upstream. Runs once with the circuit
+breaker and once with it effectively disabled.
+
+Usage:
+    python -m benchmarks.llm_circuit_breaker
+    python -m benchmarks.llm_circuit_breaker --fault slow --outage 20 --callers 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.fake_llm import FakeLLMServer
+from utils.circuit_breaker import CircuitOpenError
+from utils.llm_gateway import llm_telemetry, post_llm
+
+
+PAYLOAD = {"model": "fake", "messages": [{"role": "user", "content": "Salom"}]}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def caller(url: str, deadline: float, results: list[tuple[str, float]], timeout: float, pause: float) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await post_llm("benchmark", "fake", url, headers={}, payload=PAYLOAD, timeout=timeout)
+            outcome = "ok" if response.status_code < 400 else "error"
+        except CircuitOpenError:
+            outcome = "fallback"
+        except (httpx.TimeoutException, httpx.TransportError):
+            outcome = "error"
+        results.append((outcome, time.perf_counter() - started))
+        await asyncio.sleep(pause)
+
+
+async def run_phase(server: FakeLLMServer, url: str, args: argparse.Namespace, label: str, seconds: float) -> dict:
+    results: list[tuple[str, float]] = []
+    requests_before = server.stats["requests"]
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(caller(url, deadline, results, args.timeout, args.pause) for _ in range(args.callers)))
+    held = [elapsed for _, elapsed in results]
+    return {
+        "phase": label,
+        "calls": len(results),
+        "ok": sum(1 for outcome, _ in results if outcome == "ok"),
+        "fallback": sum(1 for outcome, _ in results if outcome == "fallback"),
+        "error": sum(1 for outcome, _ in results if outcome == "error"),
+        "upstream_requests": server.stats["requests"] - requests_before,
+        "held_p50": statistics.median(held) if held else 0.0,
+        "held_p95": percentile(held, 0.95) if held else 0.0,
+        "held_total": sum(held),
+    }
+
+
+async def run(args: argparse.Namespace, breaker_enabled: bool) -> tuple[list[dict], dict]:
+    server = FakeLLMServer(first_token_delay=args.latency, token_delay=0.0, slow_seconds=args.timeout * 2)
+    port = await server.start()
+    url = f"http://127.0.0.1:{port}/v1/chat/completions"
+    breaker = llm_telemetry.breaker_for(url)
+    if not breaker_enabled:
+        breaker.failure_rate_threshold = breaker.slow_call_rate_threshold = 2.0
+    breaker.open_seconds = args.open_seconds
+    breaker.slow_call_seconds = args.timeout * 0.8
+    try:
+        phases = [await run_phase(server, url, args, "healthy", args.healthy)]
+        if args.fault == "errors":
+            server.set_faults(error_rate=1.0)
+        else:
+            server.set_faults(slow_rate=1.0)
+        phases.append(await run_phase(server, url, args, "outage", args.outage))
+        server.set_faults()
+        phases.append(await run_phase(server, url, args, "recovery", args.recovery))
+    finally:
+        await server.stop()
+    return phases, breaker.snapshot()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fault", choices=["errors", "slow"], default="errors")
+    parser.add_argument("--callers", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3, help="healthy generation time")
+    parser.add_argument("--timeout", type=float, default=3.0)
+    parser.add_argument("--pause", type=float, default=0.2, help="pause between calls of one caller")
+    parser.add_argument("--healthy", type=float, default=5.0)
+    parser.add_argument("--outage", type=float, default=15.0)
+    parser.add_argument("--recovery", type=float, default=15.0)
+    parser.add_argument("--open-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for breaker_enabled in (False, True):
+        print(f"\n== circuit breaker {'on' if breaker_enabled else 'off'} ({args.fault}) ==")
+        # every run gets a new port, hence its own breaker
+        phases, breaker = asyncio.run(run(args, breaker_enabled))
+        for row in phases:
+            print(
+                f"{row['phase']:<9} calls={row['calls']:<5} ok={row['ok']:<5} fallback={row['fallback']:<5} "
+                f"error={row['error']:<4} upstream={row['upstream_requests']:<5} "
+                f"held p50={row['held_p50']:.2f}s p95={row['held_p95']:.2f}s total={row['held_total']:.0f}s"
+            )
+        print(f"breaker: {breaker}")
+
+
+if __name__ == "__main__":
+    main()
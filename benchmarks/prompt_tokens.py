@@ -0,0 +1,145 @@
+"""
+Replays conversations and compares the estimated prompt size of every AI reply under the old
+prompt builder (system prompts + 30 raw messages) and the rolling-summary builder (system prompts +
+stored summary + recent messages fitted to COGNILABSAI_PROMPT_TOKEN_BUDGET).
+
+Usage:
+    python -m benchmarks.prompt_tokens
+    python -m benchmarks.prompt_tokens --trace messages.jsonl --budget 3000
+
+Trace format (JSON lines, in conversation order):
+    {"conversation_id": 12, "sender_type": "client", "text": "..."}
+Export one with:
+    COPY (SELECT json_build_object('conversation_id', conversation_id, 'sender_type', sender_type, 'text', text)
+          FROM cognilabsai_message ORDER BY conversation_id, id) TO STDOUT;
+Without --trace a synthetic set of long Instagram-style threads is generated. The summary is
+not generated by a model here; it is modelled as a fixed ~150-word text, the cap the summary
+prompt asks for.
+"""
+import argparse
+import json
+import random
+import statistics
+from collections import defaultdict
+
+from cognilabsai.prompt_budget import estimate_prompt_tokens, fit_recent_messages
+
+
+SYSTEM_PROMPT_TOKENS_TEXT = "x" * 2400  # stand-in for system prompt + behaviour prompt (~600 tokens)
+SUMMARY_TEXT = " ".join(["mijoz"] * 150)
+RECENT_LIMIT = 30
+TRIGGER = 24
+KEEP_RECENT = 12
+MAX_BATCH = 60
+
+CLIENT_LINES = [
+    "Assalomu alaykum, sayt qilish narxi qancha?",
+    "Bizda kichik do'kon bor, onlayn savdo qilmoqchimiz, to'lov tizimlari ham kerak bo'ladi",
+    "Здравствуйте, сколько стоит чат-бот для Instagram?",
+    "CRM ham kerak, xodimlar 15 ta, filiallar ikkita",
+    "Qachon bog'lanasizlar? Ertaga soat 3 dan keyin qulay",
+    "ok rahmat",
+]
+AI_LINES = [
+    "Assalomu alaykum! Men Cognilabs AI yordamchisiman. Qaysi xizmatlarimiz sizni qiziqtiradi: veb-sayt, "
+    "mobil ilova, CRM yoki chatbot? Loyihangiz haqida qisqacha yozsangiz, aniq narx bo'yicha mutaxassisimiz "
+    "siz bilan bog'lanadi.",
+    "Tushunarli! Onlayn do'kon uchun katalog, savatcha, Click/Payme integratsiyasi va admin panel kiradi. "
+    "Narx funksionalga qarab belgilanadi. Ismingiz va telefon raqamingizni qoldirsangiz, menejer bog'lanadi.",
+    "Спасибо! Уточните, пожалуйста, в какой сфере вы работаете и когда вам удобно принять звонок?",
+]
+
+
+def build_synthetic_trace(conversations: int, seed: int) -> dict[int, list[dict]]:
+    rng = random.Random(seed)
+    threads: dict[int, list[dict]] = {}
+    for conversation_id in range(1, conversations + 1):
+        length = int(rng.paretovariate(1.2) * 8)
+        items = []
+        for index in range(min(length, 600)):
+            if index % 2 == 0:
+                items.append({"sender_type": "client", "text": rng.choice(CLIENT_LINES)})
+            else:
+                items.append({"sender_type": rng.choice(["ai", "ai", "ai", "operator"]), "text": rng.choice(AI_LINES)})
+        threads[conversation_id] = items
+    return threads
+
+
+def load_trace(path: str) -> dict[int, list[dict]]:
+    threads: dict[int, list[dict]] = defaultdict(list)
+    with open(path, encoding="utf-8") as source:
+        for line in source:
+            if line.strip():
+                item = json.loads(line)
+                threads[int(item["conversation_id"])].append(
+                    {"sender_type": item["sender_type"], "text": item.get("text") or ""}
+                )
+    return threads
+
+
+def as_chat(item: dict) -> dict:
+    role = "assistant" if item["sender_type"] in ("ai", "operator") else "user"
+    return {"role": role, "content": item["text"]}
+
+
+def system_messages() -> list[dict]:
+    return [{"role": "system", "content": SYSTEM_PROMPT_TOKENS_TEXT}]
+
+
+def replay(threads: dict[int, list[dict]], budget: int) -> tuple[list[int], list[int], int]:
+    before: list[int] = []
+    after: list[int] = []
+    summary_calls = 0
+    for items in threads.values():
+        cursor = 0  # number of messages folded into the summary
+        for position, item in enumerate(items, start=1):
+            if item["sender_type"] != "client":
+                continue
+            # old builder: 30 raw messages
+            legacy = system_messages() + [as_chat(entry) for entry in items[max(0, position - RECENT_LIMIT):position]]
+            before.append(estimate_prompt_tokens(legacy))
+
+            prompt = system_messages()
+            if cursor:
+                prompt.append({"role": "system", "content": SUMMARY_TEXT})
+            recent = [as_chat(entry) for entry in items[max(cursor, position - RECENT_LIMIT):position]]
+            prompt.extend(fit_recent_messages(recent, budget - estimate_prompt_tokens(prompt)))
+            after.append(estimate_prompt_tokens(prompt))
+
+            # after the reply: one folding pass, as schedule_conversation_summary does
+            unsummarized = position - cursor
+            if unsummarized >= TRIGGER:
+                cursor += min(unsummarized - KEEP_RECENT, MAX_BATCH)
+                summary_calls += 1
+    return before, after, summary_calls
+
+
+def percentile(values: list[int], fraction: float) -> int:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace")
+    parser.add_argument("--conversations", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--budget", type=int, default=3000)
+    args = parser.parse_args()
+
+    threads = load_trace(args.trace) if args.trace else build_synthetic_trace(args.conversations, args.seed)
+    before, after, summary_calls = replay(threads, args.budget)
+    if not before:
+        print("no client messages in trace")
+        return
+    print(f"{len(threads)} conversations, {len(before)} AI replies, {summary_calls} summary updates")
+    for label, values in (("raw history", before), ("summary+recent", after)):
+        print(
+            f"{label:<16} mean={statistics.mean(values):.0f} p50={percentile(values, 0.5)} "
+            f"p95={percentile(values, 0.95)} max={max(values)} total={sum(values)}"
+        )
+    print(f"prompt tokens saved: {1 - sum(after) / sum(before):.1%}")
+
+
+if __name__ == "__main__":
+    main()
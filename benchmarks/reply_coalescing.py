@@ -0,0 +1,92 @@
+"""
+Replays a client-message trace through AIReplyCoordinator and reports how many
+LLM generations are needed compared with one generation per message.
+
+Usage:
+    python -m benchmarks.reply_coalescing
+    python -m benchmarks.reply_coalescing --trace trace.jsonl --debounce 2 --llm-latency 6
+
+Trace format (JSON lines): {"conversation_id": 12, "at": 3.4}  (seconds from start)
+Without --trace a synthetic trace of bursty conversations is generated.
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from cognilabsai.reply_coordinator import AIReplyCoordinator
+
+
+def build_synthetic_trace(conversations: int, seed: int) -> list[tuple[float, int]]:
+    rng = random.Random(seed)
+    events: list[tuple[float, int]] = []
+    for conversation_id in range(1, conversations + 1):
+        at = rng.uniform(0, 30)
+        for _ in range(rng.randint(1, 4)):
+            # burst: 1-5 messages typed a couple of seconds apart
+            for _ in range(rng.randint(1, 5)):
+                events.append((at, conversation_id))
+                at += rng.uniform(0.3, 2.5)
+            at += rng.uniform(20, 90)
+    return sorted(events)
+
+
+def load_trace(path: str) -> list[tuple[float, int]]:
+    events = []
+    with open(path, encoding="utf-8") as source:
+        for line in source:
+            if line.strip():
+                item = json.loads(line)
+                events.append((float(item["at"]), int(item["conversation_id"])))
+    return sorted(events)
+
+
+async def replay(events: list[tuple[float, int]], debounce: float, llm_latency: float, speedup: float) -> dict:
+    llm_calls = 0
+
+    async def fake_runner(conversation_id: int, is_stale) -> dict:
+        nonlocal llm_calls
+        llm_calls += 1
+        await asyncio.sleep(llm_latency / speedup)
+        return {"conversation_id": conversation_id, "stale": is_stale()}
+
+    coordinator = AIReplyCoordinator(fake_runner, debounce_seconds=debounce / speedup)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    waiters = []
+    for at, conversation_id in events:
+        delay = started + at / speedup - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        waiters.append(coordinator.request(conversation_id))
+    await asyncio.gather(*waiters)
+    return {
+        "messages": len(events),
+        "llm_calls_naive": len(events),
+        "llm_calls_coordinated": llm_calls,
+        "superseded": coordinator.stats["superseded"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--debounce", type=float, default=2.0, help="debounce window, seconds")
+    parser.add_argument("--llm-latency", type=float, default=6.0, help="simulated LLM latency, seconds")
+    parser.add_argument("--speedup", type=float, default=50.0, help="replay the trace this many times faster")
+    args = parser.parse_args()
+
+    events = load_trace(args.trace) if args.trace else build_synthetic_trace(args.conversations, args.seed)
+    result = asyncio.run(replay(events, args.debounce, args.llm_latency, args.speedup))
+    saved = result["llm_calls_naive"] - result["llm_calls_coordinated"]
+    print(f"messages:               {result['messages']}")
+    print(f"LLM calls (per message): {result['llm_calls_naive']}")
+    print(f"LLM calls (coordinated): {result['llm_calls_coordinated']}")
+    print(f"superseded generations:  {result['superseded']}")
+    print(f"saved:                   {saved} ({saved / max(1, result['messages']):.0%})")
+
+
+if __name__ == "__main__":
+    main()
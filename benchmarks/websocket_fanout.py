@@ -0,0 +1,157 @@
+"""
+Fans events out to simulated operator websockets through CognilabsAIConnectionManager and
+reports how long the broadcasting caller is held and how late healthy clients receive events,
+next to the previous serial send_json loop.
+
+Usage:
+    python -m benchmarks.websocket_fanout
+    python -m benchmarks.websocket_fanout --sockets 500 --slow 20 --dead 5 --events 300
+
+Healthy sockets take --send-ms per frame, slow ones --slow-send-ms, dead ones never complete a
+send (a half-open TCP connection). Events are a mix of message.created and message.delta.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from cognilabsai.realtime import CognilabsAIConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, send_seconds: float | None):
+        # None: the peer stopped reading, sends never finish
+        self.send_seconds = send_seconds
+        self.received: list[float] = []
+        self.closed_with: int | None = None
+
+    async def accept(self) -> None:
+        return None
+
+    async def _deliver(self, message: str) -> None:
+        if self.send_seconds is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.send_seconds)
+        self.received.append(time.perf_counter())
+
+    async def send_text(self, message: str) -> None:
+        await self._deliver(message)
+
+    async def send_json(self, data) -> None:
+        await self._deliver(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_with = code
+
+
+async def serial_broadcast(sockets: list[FakeWebSocket], payload: dict, timeout: float) -> None:
+    """The loop broadcast used before: one awaited send_json per socket"""
+    encoded_payload = jsonable_encoder(payload)
+    for websocket in sockets:
+        try:
+            # the old loop had no timeout at all; without one a dead socket stalls it forever
+            await asyncio.wait_for(websocket.send_json(encoded_payload), timeout)
+        except Exception:
+            pass
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def build_payload(index: int) -> dict:
+    if index % 4 == 0:
+        return {"type": "message.created", "conversation_id": 1, "message": {"id": index, "text": "Assalomu alaykum " * 8}}
+    return {"type": "message.delta", "conversation_id": 1, "stream_id": "bench", "sequence": index, "delta": "so'z " * 6}
+
+
+def build_sockets(args: argparse.Namespace) -> list[FakeWebSocket]:
+    healthy = args.sockets - args.slow - args.dead
+    return (
+        [FakeWebSocket(args.send_ms / 1000) for _ in range(healthy)]
+        + [FakeWebSocket(args.slow_send_ms / 1000) for _ in range(args.slow)]
+        + [FakeWebSocket(None) for _ in range(args.dead)]
+    )
+
+
+def report(label: str, held: list[float], sent_at: list[float], sockets: list[FakeWebSocket], healthy: int, extra: str = "") -> None:
+    lags = [
+        received - sent_at[position]
+        for websocket in sockets[:healthy]
+        for position, received in enumerate(websocket.received)
+    ]
+    delivered = sum(len(websocket.received) for websocket in sockets[:healthy])
+    expected = healthy * len(sent_at)
+    print(
+        f"{label:<7} caller held p50={statistics.median(held) * 1000:.2f}ms p99={percentile(held, 0.99) * 1000:.2f}ms "
+        f"total={sum(held):.2f}s | healthy delivery {delivered}/{expected} "
+        f"lag p50={statistics.median(lags) * 1000:.1f}ms p99={percentile(lags, 0.99) * 1000:.1f}ms {extra}"
+    )
+
+
+async def run_serial(args: argparse.Namespace) -> None:
+    sockets = build_sockets(args)
+    healthy = args.sockets - args.slow - args.dead
+    held: list[float] = []
+    sent_at: list[float] = []
+    for index in range(args.serial_events):
+        started = time.perf_counter()
+        sent_at.append(started)
+        await serial_broadcast(sockets, build_payload(index), args.send_timeout)
+        held.append(time.perf_counter() - started)
+        await asyncio.sleep(args.interval_ms / 1000)
+    report("serial", held, sent_at, sockets, healthy)
+
+
+async def run_queued(args: argparse.Namespace) -> None:
+    manager = CognilabsAIConnectionManager(max_queue=args.queue_size, send_timeout=args.send_timeout)
+    sockets = build_sockets(args)
+    healthy = args.sockets - args.slow - args.dead
+    for websocket in sockets:
+        await manager.connect(websocket)
+    held: list[float] = []
+    sent_at: list[float] = []
+    for index in range(args.events):
+        started = time.perf_counter()
+        sent_at.append(started)
+        await manager.broadcast(build_payload(index), conversation_id=1)
+        held.append(time.perf_counter() - started)
+        await asyncio.sleep(args.interval_ms / 1000)
+    # let healthy queues drain before measuring
+    deadline = time.perf_counter() + 5
+    while time.perf_counter() < deadline and any(
+        len(websocket.received) < args.events for websocket in sockets[:healthy]
+    ):
+        await asyncio.sleep(0.05)
+    cut_off = sum(1 for websocket in sockets if websocket.closed_with is not None)
+    report("queued", held, sent_at, sockets, healthy, f"| cut off {cut_off} | {manager.snapshot()}")
+    for websocket in list(manager._senders):
+        await manager.disconnect(websocket)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=500)
+    parser.add_argument("--slow", type=int, default=20)
+    parser.add_argument("--dead", type=int, default=5)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, default=20.0, help="pause between broadcasts")
+    parser.add_argument("--send-ms", type=float, default=0.2)
+    parser.add_argument("--slow-send-ms", type=float, default=150.0)
+    parser.add_argument("--send-timeout", type=float, default=2.0)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--serial-events", type=int, default=10, help="each dead socket costs the serial loop a full timeout per event")
+    args = parser.parse_args()
+
+    print(f"{args.sockets} sockets ({args.slow} slow, {args.dead} dead), {args.events} events every {args.interval_ms}ms")
+    asyncio.run(run_queued(args))
+    if args.serial_events:
+        asyncio.run(run_serial(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+
+CONFIG_NOTIFY_CHANNEL = "cognilabsai_config"
+
+
+class IntegrationConfigCache:
+    """
+    In-memory copy of the single cognilabsai_global_integration row.
+
+    The row carries a `config_version` that the settings endpoints bump on every write; the new
+    version is published with NOTIFY so other processes drop their copy. A load that races with an
+    invalidation is returned to its caller but not cached.
+    """
+
+    def __init__(self):
+        self._config: Optional[dict] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self.version: Optional[int] = None
+        self.stats = {"hits": 0, "loads": 0, "invalidations": 0}
+
+    def peek(self) -> Optional[dict]:
+        if self._config is None:
+            return None
+        self.stats["hits"] += 1
+        return dict(self._config)
+
+    async def load(self, loader: Callable[[], Awaitable[dict]]) -> dict:
+        async with self._lock:
+            if self._config is not None:
+                self.stats["hits"] += 1
+                return dict(self._config)
+            generation = self._generation
+            config = await loader()
+            self.stats["loads"] += 1
+            if generation == self._generation:
+                self._config = dict(config)
+                self.version = config.get("config_version")
+            return dict(config)
+
+    def invalidate(self, version: Optional[int] = None) -> None:
+        if version is not None and self.version is not None and version <= self.version and self._config is not None:
+            return
+        self._generation += 1
+        self._config = None
+        self.stats["invalidations"] += 1
+
+    def handle_notify(self, payload: str) -> None:
+        try:
+            version = int(payload)
+        except (TypeError, ValueError):
+            version = None
+        self.invalidate(version)
+
+
+integration_config_cache = IntegrationConfigCache()
@@ -0,0 +1,149 @@
+import hashlib
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+
+FAQ_NOTIFY_CHANNEL = "cognilabsai_faq"
+
+_APOSTROPHES = re.compile(r"[ʻʼ’‘`´]")
+_NON_WORD = re.compile(r"[^\w']+", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(text_value: str) -> str:
+    normalized = _APOSTROPHES.sub("'", (text_value or "").lower())
+    normalized = _NON_WORD.sub(" ", normalized)
+    return _SPACES.sub(" ", normalized).strip()
+
+
+def question_key(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def is_cacheable_question(normalized: str) -> bool:
+    # greetings and one-word replies ("ok", "salom", "ha") only make sense in context
+    return 8 <= len(normalized) <= 300 and len(normalized.split(" ")) >= 2
+
+
+def question_features(normalized: str) -> Counter:
+    padded = f" {normalized} "
+    features: Counter = Counter(padded[index:index + 3] for index in range(len(padded) - 2))
+    features.update(f"w:{word}" for word in normalized.split(" ") if word)
+    return features
+
+
+class FAQAnswerIndex:
+    """
+    In-memory lookup over operator-approved FAQ answers for one integration-config version.
+
+    Lookup is exact on the normalized question first, then TF-IDF cosine similarity over character
+    trigrams and words, which tolerates typos, missing apostrophes and reordered words. Only
+    matches scoring at least NEAR_DUPLICATE_THRESHOLD are served. The index is rebuilt lazily when
+    marked dirty (approve/evict, NOTIFY from another process) or when the config version changes.
+    """
+
+    NEAR_DUPLICATE_THRESHOLD = 0.75
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._dirty = True
+        self._entries: dict[int, dict] = {}
+        self._exact: dict[str, int] = {}
+        self._postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        self._idf: dict[str, float] = {}
+        self._default_idf = 1.0
+        self._generation_seconds_total = 0.0
+        self._generations = 0
+        self.stats = {
+            "lookups": 0,
+            "exact_hits": 0,
+            "near_hits": 0,
+            "misses": 0,
+            "saved_seconds": 0.0,
+            "rebuilds": 0,
+        }
+
+    def needs_rebuild(self, version: Optional[int]) -> bool:
+        return self._dirty or version != self.version
+
+    def mark_dirty(self, *_args) -> None:
+        self._dirty = True
+
+    def rebuild(self, entries: Iterable[dict], version: Optional[int]) -> None:
+        entries = [entry for entry in entries if entry.get("question_text") and entry.get("answer_text")]
+        documents = {entry["id"]: question_features(normalize_question(entry["question_text"])) for entry in entries}
+        document_frequency: Counter = Counter()
+        for features in documents.values():
+            document_frequency.update(features.keys())
+        count = len(documents)
+        self._idf = {feature: math.log((1 + count) / (1 + frequency)) + 1.0 for feature, frequency in document_frequency.items()}
+        self._default_idf = math.log(1 + count) + 1.0
+        self._postings = defaultdict(list)
+        for entry_id, features in documents.items():
+            weights = {feature: tf * self._idf[feature] for feature, tf in features.items()}
+            norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+            for feature, weight in weights.items():
+                self._postings[feature].append((entry_id, weight / norm))
+        self._entries = {entry["id"]: dict(entry) for entry in entries}
+        self._exact = {normalize_question(entry["question_text"]): entry["id"] for entry in entries}
+        self.version = version
+        self._dirty = False
+        self.stats["rebuilds"] += 1
+
+    def lookup(self, question: str) -> Optional[tuple[dict, float, str]]:
+        """Return (entry, score, "exact" | "near") for the best approved answer, or None."""
+        self.stats["lookups"] += 1
+        normalized = normalize_question(question)
+        entry_id = self._exact.get(normalized)
+        if entry_id is not None:
+            return dict(self._entries[entry_id]), 1.0, "exact"
+        features = question_features(normalized)
+        weights = {feature: tf * self._idf.get(feature, self._default_idf) for feature, tf in features.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        scores: dict[int, float] = defaultdict(float)
+        for feature, weight in weights.items():
+            for candidate_id, candidate_weight in self._postings.get(feature, ()):
+                scores[candidate_id] += (weight / norm) * candidate_weight
+        if not scores:
+            return None
+        best_id, best_score = max(scores.items(), key=lambda item: item[1])
+        if best_score < self.NEAR_DUPLICATE_THRESHOLD:
+            return None
+        return dict(self._entries[best_id]), best_score, "near"
+
+    def record_lookup(self, kind: Optional[str]) -> None:
+        if kind == "exact":
+            self.stats["exact_hits"] += 1
+        elif kind == "near":
+            self.stats["near_hits"] += 1
+        else:
+            self.stats["misses"] += 1
+            return
+        self.stats["saved_seconds"] += self.average_generation_seconds
+
+    def record_generation(self, seconds: float) -> None:
+        self._generation_seconds_total += seconds
+        self._generations += 1
+
+    @property
+    def average_generation_seconds(self) -> float:
+        if not self._generations:
+            return 0.0
+        return self._generation_seconds_total / self._generations
+
+    def snapshot(self) -> dict:
+        hits = self.stats["exact_hits"] + self.stats["near_hits"]
+        answered = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "saved_seconds": round(self.stats["saved_seconds"], 2),
+            "hit_rate": round(hits / answered, 4) if answered else 0.0,
+            "average_generation_seconds": round(self.average_generation_seconds, 3),
+            "indexed_entries": len(self._entries),
+            "config_version": self.version,
+        }
+
+
+faq_answer_index = FAQAnswerIndex()
@@ -0,0 +1,276 @@
+import asyncio
+import contextlib
+import heapq
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import case, or_, select, tuple_, update
+
+from database import async_session_maker
+
+from cognilabsai.tables import cognilabsai_conversation
+
+
+# deadlines read per index range scan; the next ones are read when the earliest loaded is reached
+FOLLOW_UP_WINDOW_SIZE = 500
+# schedules written by other app processes only reach this heap when the window is read again
+FOLLOW_UP_RESYNC_SECONDS = 300
+# a claimed conversation is not picked up again before this, even if its process died mid-send
+FOLLOW_UP_CLAIM_SECONDS = 120
+# a follow-up that failed or could not be sent yet is tried again after this
+FOLLOW_UP_RETRY_SECONDS = 60
+FOLLOW_UP_SEND_CONCURRENCY = 4
+
+
+class FollowUpScheduler:
+    """
+    Keeps the next follow-up deadline of every scheduled conversation in a min-heap and sleeps
+    until the earliest one. Deadlines are read from the indexed next_follow_up_at column a window
+    at a time, and `schedule` is called whenever a message or a settings change moves one.
+
+    Heap entries are never removed: an entry that no longer matches `_due` is skipped when it
+    comes up. Before `dispatch` runs the conversation is claimed in the database, which also
+    re-checks that the follow-up is still due and keeps other processes from sending it too.
+    """
+
+    def __init__(self):
+        self.dispatch: Optional[Callable[[int], Awaitable[None]]] = None
+        self._heap: list[tuple[datetime, int]] = []
+        self._due: dict[int, datetime] = {}
+        # keyset position of the last row read; rows after it are not in memory yet
+        self._loaded_until: Optional[tuple[datetime, int]] = None
+        self._window_complete = False
+        self._resync_at = 0.0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"loaded": 0, "scheduled": 0, "dispatched": 0, "skipped": 0, "failed": 0}
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def schedule(self, conversation_id: int, due_at: Optional[datetime]) -> None:
+        """Called after a committed change moved the conversation's next_follow_up_at"""
+        if not self.is_running:
+            return
+        if due_at is None:
+            self._due.pop(conversation_id, None)
+            return
+        if self._due.get(conversation_id) == due_at:
+            return
+        self._push(conversation_id, due_at)
+        self.stats["scheduled"] += 1
+        if self._heap[0] == (due_at, conversation_id):
+            self._wake.set()
+
+    def _push(self, conversation_id: int, due_at: datetime) -> None:
+        self._due[conversation_id] = due_at
+        heapq.heappush(self._heap, (due_at, conversation_id))
+
+    def _offer(self, conversation_id: int, due_at: datetime) -> None:
+        # a row read before a concurrent commit may be stale; the earlier deadline is kept because
+        # the claim re-checks it against the database anyway
+        current = self._due.get(conversation_id)
+        if current is None or due_at < current:
+            self._push(conversation_id, due_at)
+
+    async def start(self) -> None:
+        if self.is_running:
+            return
+        self._resync_at = 0.0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self._heap = []
+        self._due = {}
+
+    def _next_deadline(self) -> Optional[datetime]:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def _needs_window(self) -> bool:
+        if self._window_complete:
+            return False
+        earliest = self._next_deadline()
+        return earliest is None or self._loaded_until is None or earliest > self._loaded_until[0]
+
+    def _sleep_seconds(self) -> float:
+        seconds = self._resync_at - time.monotonic()
+        earliest = self._next_deadline()
+        if earliest is not None:
+            seconds = min(seconds, (earliest - datetime.utcnow()).total_seconds())
+        return max(seconds, 0.0)
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                await self._run_once()
+                timeout = self._sleep_seconds()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[cognilabsai-follow-up] scheduler error: {exc}", flush=True)
+                timeout = FOLLOW_UP_RETRY_SECONDS
+            if timeout <= 0:
+                continue
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+
+    async def _run_once(self) -> None:
+        if time.monotonic() >= self._resync_at:
+            await self._reload()
+        elif self._needs_window():
+            await self._load_window()
+        now = datetime.utcnow()
+        due_ids: list[int] = []
+        while (earliest := self._next_deadline()) is not None and earliest <= now:
+            _, conversation_id = heapq.heappop(self._heap)
+            del self._due[conversation_id]
+            due_ids.append(conversation_id)
+        if not due_ids:
+            return
+        semaphore = asyncio.Semaphore(FOLLOW_UP_SEND_CONCURRENCY)
+
+        async def fire_limited(conversation_id: int) -> None:
+            async with semaphore:
+                await self._fire(conversation_id)
+
+        await asyncio.gather(*(fire_limited(conversation_id) for conversation_id in due_ids))
+
+    async def _reload(self) -> None:
+        self._resync_at = time.monotonic() + FOLLOW_UP_RESYNC_SECONDS
+        # reset before reading, so schedule() calls made meanwhile land in the new heap
+        self._heap = []
+        self._due = {}
+        self._loaded_until = None
+        self._window_complete = False
+        await self._load_window()
+
+    async def _load_window(self) -> None:
+        query = select(cognilabsai_conversation.c.id, cognilabsai_conversation.c.next_follow_up_at).where(
+            cognilabsai_conversation.c.next_follow_up_at.is_not(None)
+        )
+        if self._loaded_until is not None:
+            query = query.where(
+                tuple_(cognilabsai_conversation.c.next_follow_up_at, cognilabsai_conversation.c.id)
+                > tuple_(*self._loaded_until)
+            )
+        query = query.order_by(
+            cognilabsai_conversation.c.next_follow_up_at.asc(),
+            cognilabsai_conversation.c.id.asc(),
+        ).limit(FOLLOW_UP_WINDOW_SIZE)
+        async with async_session_maker() as session:
+            rows = (await session.execute(query)).all()
+        for conversation_id, due_at in rows:
+            self._offer(conversation_id, due_at)
+        self.stats["loaded"] += len(rows)
+        if len(rows) < FOLLOW_UP_WINDOW_SIZE:
+            self._window_complete = True
+        else:
+            self._loaded_until = (rows[-1][1], rows[-1][0])
+
+    async def _fire(self, conversation_id: int) -> None:
+        if not await self._claim(conversation_id):
+            self.stats["skipped"] += 1
+            return
+        try:
+            await self.dispatch(conversation_id)
+            self.stats["dispatched"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.stats["failed"] += 1
+            print(f"[cognilabsai-follow-up] conversation {conversation_id} follow-up error: {exc}", flush=True)
+        await self._release(conversation_id)
+
+    async def _claim(self, conversation_id: int) -> bool:
+        now = datetime.utcnow()
+        async with async_session_maker() as session:
+            result = await session.execute(
+                update(cognilabsai_conversation)
+                .where(
+                    cognilabsai_conversation.c.id == conversation_id,
+                    cognilabsai_conversation.c.next_follow_up_at <= now,
+                    or_(
+                        cognilabsai_conversation.c.follow_up_claimed_until.is_(None),
+                        cognilabsai_conversation.c.follow_up_claimed_until <= now,
+                    ),
+                )
+                .values(
+                    follow_up_claimed_until=now + timedelta(seconds=FOLLOW_UP_CLAIM_SECONDS),
+                    updated_at=cognilabsai_conversation.c.updated_at,
+                )
+                .returning(cognilabsai_conversation.c.id)
+            )
+            claimed = result.scalar() is not None
+            if not claimed:
+                # moved, cleared or being sent by another process: follow whatever the row says now
+                result = await session.execute(
+                    select(
+                        cognilabsai_conversation.c.next_follow_up_at,
+                        cognilabsai_conversation.c.follow_up_claimed_until,
+                    ).where(cognilabsai_conversation.c.id == conversation_id)
+                )
+                row = result.first()
+            await session.commit()
+        if not claimed and row is not None:
+            self._reschedule(conversation_id, row[0], row[1])
+        return claimed
+
+    async def _release(self, conversation_id: int) -> None:
+        now = datetime.utcnow()
+        async with async_session_maker() as session:
+            result = await session.execute(
+                update(cognilabsai_conversation)
+                .where(cognilabsai_conversation.c.id == conversation_id)
+                .values(
+                    # still due means nothing was sent (send error, missing token): hold it back
+                    follow_up_claimed_until=case(
+                        (
+                            cognilabsai_conversation.c.next_follow_up_at <= now,
+                            now + timedelta(seconds=FOLLOW_UP_RETRY_SECONDS),
+                        ),
+                        else_=None,
+                    ),
+                    updated_at=cognilabsai_conversation.c.updated_at,
+                )
+                .returning(
+                    cognilabsai_conversation.c.next_follow_up_at,
+                    cognilabsai_conversation.c.follow_up_claimed_until,
+                )
+            )
+            row = result.first()
+            await session.commit()
+        if row is not None:
+            self._reschedule(conversation_id, row[0], row[1])
+
+    def _reschedule(
+        self,
+        conversation_id: int,
+        next_follow_up_at: Optional[datetime],
+        claimed_until: Optional[datetime],
+    ) -> None:
+        if next_follow_up_at is None:
+            return
+        self.schedule(conversation_id, max(next_follow_up_at, claimed_until) if claimed_until else next_follow_up_at)
+
+    def snapshot(self) -> dict:
+        earliest = self._next_deadline()
+        return {
+            "running": self.is_running,
+            "pending": len(self._due),
+            "next_due_at": earliest.isoformat() if earliest else None,
+            "window_complete": self._window_complete,
+            **self.stats,
+        }
+
+
+follow_up_scheduler = FollowUpScheduler()
@@ -0,0 +1,121 @@
+import asyncio
+import contextlib
+import json
+import time
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+
+DeltaCallback = Callable[[str], Awaitable[None]]
+
+
+class LLMStreamAborted(Exception):
+    telemetry_outcome = "aborted"
+
+
+class LLMHTTPError(Exception):
+    telemetry_outcome = "http_error"
+
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"{status_code}: {body[:300]}")
+        self.status_code = status_code
+        self.body = body
+
+
+def merge_tool_call_delta(tool_calls: dict[int, dict], delta: dict) -> None:
+    entry = tool_calls.setdefault(
+        int(delta.get("index") or 0),
+        {"id": None, "type": "function", "function": {"name": "", "arguments": ""}},
+    )
+    if delta.get("id"):
+        entry["id"] = delta["id"]
+    function_delta = delta.get("function") or {}
+    if function_delta.get("name"):
+        entry["function"]["name"] += function_delta["name"]
+    if function_delta.get("arguments"):
+        entry["function"]["arguments"] += function_delta["arguments"]
+
+
+async def stream_chat_completion(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    headers: dict,
+    payload: dict,
+    on_delta: Optional[DeltaCallback] = None,
+    should_abort: Optional[Callable[[], bool]] = None,
+    abort_poll_seconds: float = 0.25,
+    timeout: float = 90,
+) -> dict:
+    """
+    POST an OpenAI-compatible chat/completions request with `stream: true` and reassemble the
+    assistant message (text and tool calls) from the SSE chunks. Text deltas are handed to
+    `on_delta` as they arrive. If `should_abort()` turns true the response is closed, which drops
+    the upstream connection and stops generation, and LLMStreamAborted is raised.
+
+    Returns {"message", "finish_reason", "usage", "first_token_seconds", "total_seconds"}; `usage` is
+    the final chunk's token usage (requested via stream_options) or None if the provider omits it.
+    """
+    started = time.perf_counter()
+    state = {"first_token_seconds": None, "finish_reason": None, "usage": None}
+    content_parts: list[str] = []
+    tool_calls: dict[int, dict] = {}
+
+    async def read_stream() -> None:
+        async with client.stream("POST", url, headers=headers, json={**payload, "stream": True, "stream_options": {"include_usage": True}}, timeout=timeout) as response:
+            if response.status_code >= 400:
+                body = (await response.aread()).decode("utf-8", errors="replace")
+                raise LLMHTTPError(response.status_code, body)
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+                if chunk.get("usage"):
+                    state["usage"] = chunk["usage"]
+                for choice in chunk.get("choices") or []:
+                    delta = choice.get("delta") or {}
+                    if (delta.get("content") or delta.get("tool_calls")) and state["first_token_seconds"] is None:
+                        state["first_token_seconds"] = time.perf_counter() - started
+                    if delta.get("content"):
+                        content_parts.append(delta["content"])
+                        if on_delta is not None:
+                            await on_delta(delta["content"])
+                    for tool_call_delta in delta.get("tool_calls") or []:
+                        merge_tool_call_delta(tool_calls, tool_call_delta)
+                    if choice.get("finish_reason"):
+                        state["finish_reason"] = choice["finish_reason"]
+
+    if should_abort is None:
+        await read_stream()
+    else:
+        reader = asyncio.create_task(read_stream())
+        try:
+            while not reader.done():
+                await asyncio.wait({reader}, timeout=abort_poll_seconds)
+                if not reader.done() and should_abort():
+                    reader.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await reader
+                    raise LLMStreamAborted()
+        except asyncio.CancelledError:
+            reader.cancel()
+            raise
+        reader.result()
+
+    message: dict = {"role": "assistant", "content": "".join(content_parts)}
+    if tool_calls:
+        message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+    return {
+        "message": message,
+        "finish_reason": state["finish_reason"],
+        "usage": state["usage"],
+        "first_token_seconds": state["first_token_seconds"],
+        "total_seconds": time.perf_counter() - started,
+    }
@@ -0,0 +1,185 @@
+import asyncio
+import contextlib
+import gzip
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from utils.file_storage import TELEGRAM_MEDIA_DIR
+
+
+MediaFetcher = Callable[[], Awaitable[Optional[bytes]]]
+MediaTransform = Callable[[bytes], Optional[bytes]]
+SuffixDetector = Callable[[bytes], str]
+
+
+def gunzip_if_needed(payload: bytes) -> Optional[bytes]:
+    try:
+        return gzip.decompress(payload)
+    except Exception:
+        return payload or None
+
+
+class TelegramMediaStore:
+    """
+    Content-addressed store for Telegram avatars and stickers.
+
+    Files are named after Telegram's own immutable ids (profile photo id, sticker document id), so
+    the same media is fetched once no matter how many messages or snapshots reference it.
+    Downloads run on a bounded queue drained by a couple of workers; when the queue is full or a
+    download fails nothing is stored and the next reference tries again.
+
+    `ensure` hands out the URL as soon as the download is queued, for names whose suffix is known
+    up front. `resolve` is for media whose format only shows in the bytes: the key is a stem, the
+    suffix is picked from the payload, and the caller waits for the file. `stored_url` answers
+    without waiting, so a caller on a hot path can check first and resolve in the background.
+    """
+
+    URL_PREFIX = "/images/telegram_media"
+
+    def __init__(self, directory: Path = TELEGRAM_MEDIA_DIR, worker_count: int = 2, max_queue: int = 200):
+        self.directory = directory
+        self.worker_count = worker_count
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        # key (file name or stem) -> completes with the stored file name, or None when nothing was stored
+        self._pending: dict[str, asyncio.Future] = {}
+        # key -> stored file name
+        self._stored: dict[str, str] = {}
+        self._tasks: list[asyncio.Task] = []
+        self.stats = {"hits": 0, "queued": 0, "downloaded": 0, "dropped": 0, "failed": 0}
+
+    def url_for(self, file_name: str) -> str:
+        return f"{self.URL_PREFIX}/{file_name}"
+
+    def _lookup(self, key: str, by_stem: bool = False) -> Optional[str]:
+        stored = self._stored.get(key)
+        if stored is not None:
+            return stored
+        if not by_stem:
+            stored = key if (self.directory / key).is_file() else None
+        else:
+            stored = next((path.name for path in self.directory.glob(f"{key}.*") if path.is_file()), None)
+        if stored is not None:
+            self._stored[key] = stored
+        return stored
+
+    def _enqueue(
+        self,
+        key: str,
+        fetch: MediaFetcher,
+        transform: Optional[MediaTransform],
+        detect_suffix: Optional[SuffixDetector],
+    ) -> Optional[asyncio.Future]:
+        """The pending download of `key`, queued now if needed; None when the queue is full"""
+        pending = self._pending.get(key)
+        if pending is not None:
+            return pending
+        try:
+            self._queue.put_nowait((key, fetch, transform, detect_suffix))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return None
+        pending = self._pending[key] = asyncio.get_running_loop().create_future()
+        self.stats["queued"] += 1
+        return pending
+
+    def ensure(self, file_name: str, fetch: MediaFetcher, transform: Optional[MediaTransform] = None) -> Optional[str]:
+        """URL of `file_name` when it is stored or its download is queued, None when the job was dropped"""
+        if self._lookup(file_name):
+            self.stats["hits"] += 1
+            return self.url_for(file_name)
+        if self._enqueue(file_name, fetch, transform, None) is None:
+            return None
+        return self.url_for(file_name)
+
+    def stored_url(self, stem: str) -> Optional[str]:
+        """URL of the stored `stem.*` file, None when it is not on disk yet"""
+        stored = self._lookup(stem, by_stem=True)
+        if stored is None:
+            return None
+        self.stats["hits"] += 1
+        return self.url_for(stored)
+
+    async def resolve(
+        self,
+        stem: str,
+        fetch: MediaFetcher,
+        detect_suffix: SuffixDetector,
+        transform: Optional[MediaTransform] = None,
+        timeout: float = 15.0,
+    ) -> Optional[str]:
+        """URL of the stored `stem.*` file, downloading it first; None when it could not be stored in time"""
+        stored_url = self.stored_url(stem)
+        if stored_url is not None:
+            return stored_url
+        pending = self._enqueue(stem, fetch, transform, detect_suffix)
+        if pending is None:
+            return None
+        try:
+            # shielded: a caller giving up does not cancel the download for the others
+            stored = await asyncio.wait_for(asyncio.shield(pending), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.url_for(stored) if stored else None
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        for pending in self._pending.values():
+            if not pending.done():
+                pending.set_result(None)
+        self._pending.clear()
+
+    async def _worker(self) -> None:
+        while True:
+            key, fetch, transform, detect_suffix = await self._queue.get()
+            stored = None
+            try:
+                stored = await self._download(key, fetch, transform, detect_suffix)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.stats["failed"] += 1
+                print(f"[cognilabsai-media] {key} download error: {exc}", flush=True)
+            finally:
+                pending = self._pending.pop(key, None)
+                if pending is not None and not pending.done():
+                    pending.set_result(stored)
+                self._queue.task_done()
+
+    async def _download(
+        self,
+        key: str,
+        fetch: MediaFetcher,
+        transform: Optional[MediaTransform],
+        detect_suffix: Optional[SuffixDetector],
+    ) -> Optional[str]:
+        stored = self._lookup(key, by_stem=detect_suffix is not None)
+        if stored is not None:
+            return stored
+        payload = await fetch()
+        if payload and transform is not None:
+            payload = transform(bytes(payload))
+        if not payload:
+            self.stats["failed"] += 1
+            return None
+        file_name = key if detect_suffix is None else f"{key}{detect_suffix(bytes(payload))}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        destination = self.directory / file_name
+        temporary = destination.with_name(f".{file_name}.part")
+        # write-then-rename so a half-written file is never served
+        await asyncio.to_thread(temporary.write_bytes, bytes(payload))
+        os.replace(temporary, destination)
+        self._stored[key] = file_name
+        self.stats["downloaded"] += 1
+        return file_name
@@ -0,0 +1,395 @@
+import asyncio
+import contextlib
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Protocol
+
+from sqlalchemy import delete, exists, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import async_session_maker
+
+from cognilabsai.realtime import manager
+from cognilabsai.tables import cognilabsai_message, cognilabsai_outbound_message
+
+
+OUTBOX_OPEN_STATUSES = ("pending", "sending")
+OUTBOX_BATCH_SIZE = 20
+# rows of one batch belong to different conversations, so they can go out in parallel
+OUTBOX_SEND_CONCURRENCY = 4
+OUTBOX_POLL_SECONDS = 10
+# a claimed row is not picked up again before this, even if its worker died mid-send
+OUTBOX_SEND_LEASE_SECONDS = 120
+OUTBOX_BACKOFF_BASE_SECONDS = 5
+OUTBOX_BACKOFF_MAX_SECONDS = 900
+# sent rows are only kept for idempotency and inspection; the message row keeps the delivery status
+OUTBOX_SENT_RETENTION = timedelta(days=7)
+OUTBOX_PURGE_INTERVAL_SECONDS = 3600
+OUTBOX_PURGE_BATCH_SIZE = 5000
+REMOTE_ID_COLUMNS = {"instagram": "instagram_message_id", "telegram": "telegram_message_id"}
+
+
+class OutboundSendError(Exception):
+    def __init__(self, message: str, *, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        # upstream asked us to back off (Telegram FLOOD_WAIT, Graph API throttling)
+        self.retry_after = retry_after
+
+
+class ChannelSender(Protocol):
+    async def send(self, row: dict) -> Optional[str]:
+        """Delivers one outbox row upstream and returns the remote message id"""
+
+
+class StubChannelSender:
+    """Offline sender for local work: nothing leaves the process, sent rows are kept in memory"""
+
+    def __init__(self, channel: str, latency_seconds: float = 0.05):
+        self.channel = channel
+        self.latency_seconds = latency_seconds
+        self.sent: list[dict] = []
+        self.fail_next = 0
+
+    async def send(self, row: dict) -> Optional[str]:
+        await asyncio.sleep(self.latency_seconds)
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            raise OutboundSendError("stub: simulated upstream failure")
+        self.sent.append(dict(row))
+        print(f"[cognilabsai-outbox] stub {self.channel} -> {row['recipient_id']}: {row['text'][:60]}", flush=True)
+        return f"stub-{self.channel}-{row['id']}"
+
+
+class TokenBucket:
+    """
+    Allows `rate` sends per second on average and up to `burst` at once. `pause` stops all sends
+    for a while when the upstream reports throttling for the whole account.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(rate, 0.001)
+        self.burst = float(max(1, burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # waiters are served one at a time, in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def take_available(self, limit: int) -> int:
+        """Takes up to `limit` tokens that are there right now, without waiting"""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return 0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        taken = min(limit, int(self.tokens))
+        self.tokens -= taken
+        return taken
+
+    def refund(self, count: int) -> None:
+        if time.monotonic() >= self.blocked_until:
+            self.tokens = min(self.burst, self.tokens + count)
+
+    def paused_for(self) -> float:
+        return max(0.0, self.blocked_until - time.monotonic())
+
+    def pause(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated = self.blocked_until
+
+
+class OutboundChannelWorker:
+    """
+    Sends the due outbox rows of one channel. Only the oldest open row of each conversation is
+    claimed, so replies reach the client in the order they were written even across retries.
+    """
+
+    def __init__(self, channel: str, sender: ChannelSender, bucket: TokenBucket, max_attempts: int):
+        self.channel = channel
+        self.sender = sender
+        self.bucket = bucket
+        self.max_attempts = max(1, max_attempts)
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._last_purge = 0.0
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "postponed": 0, "purged": 0}
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                processed = await self.process_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[cognilabsai-outbox] {self.channel} worker error: {exc}", flush=True)
+                processed = 0
+            if time.monotonic() - self._last_purge >= OUTBOX_PURGE_INTERVAL_SECONDS:
+                self._last_purge = time.monotonic()
+                try:
+                    await self.purge_sent()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    print(f"[cognilabsai-outbox] {self.channel} purge error: {exc}", flush=True)
+            if processed:
+                continue
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), timeout=OUTBOX_POLL_SECONDS)
+
+    async def _claim_due(self, limit: int) -> list[dict]:
+        now = datetime.utcnow()
+        earlier = cognilabsai_outbound_message.alias("earlier")
+        due_ids = (
+            select(cognilabsai_outbound_message.c.id)
+            .where(
+                cognilabsai_outbound_message.c.channel == self.channel,
+                cognilabsai_outbound_message.c.status.in_(OUTBOX_OPEN_STATUSES),
+                cognilabsai_outbound_message.c.next_attempt_at <= now,
+                ~exists().where(
+                    earlier.c.conversation_id == cognilabsai_outbound_message.c.conversation_id,
+                    earlier.c.status.in_(OUTBOX_OPEN_STATUSES),
+                    earlier.c.id < cognilabsai_outbound_message.c.id,
+                ),
+            )
+            .order_by(cognilabsai_outbound_message.c.id.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with async_session_maker() as session:
+            result = await session.execute(
+                update(cognilabsai_outbound_message)
+                .where(cognilabsai_outbound_message.c.id.in_(due_ids))
+                .values(
+                    status="sending",
+                    attempts=cognilabsai_outbound_message.c.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=OUTBOX_SEND_LEASE_SECONDS),
+                )
+                .returning(cognilabsai_outbound_message)
+            )
+            rows = [dict(row) for row in result.mappings().all()]
+            await session.commit()
+        return rows
+
+    def _backoff_delay(self, attempts: int) -> float:
+        delay = min(OUTBOX_BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)), OUTBOX_BACKOFF_MAX_SECONDS)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def process_due(self) -> int:
+        # tokens are taken before the claim, so a claimed row never waits out the rate limit or a
+        # FLOOD_WAIT pause while its lease runs down
+        await self.bucket.acquire()
+        granted = 1 + self.bucket.take_available(OUTBOX_BATCH_SIZE - 1)
+        rows = await self._claim_due(granted)
+        if len(rows) < granted:
+            self.bucket.refund(granted - len(rows))
+        if not rows:
+            return 0
+        semaphore = asyncio.Semaphore(OUTBOX_SEND_CONCURRENCY)
+
+        async def deliver_limited(row: dict) -> None:
+            async with semaphore:
+                await self._deliver(row)
+
+        await asyncio.gather(*(deliver_limited(row) for row in rows))
+        return len(rows)
+
+    async def _deliver(self, row: dict) -> None:
+        paused_for = self.bucket.paused_for()
+        if paused_for:
+            # another row of this batch hit throttling: hand this one back without spending an attempt
+            await self._postpone(row, paused_for)
+            return
+        now = datetime.utcnow()
+        try:
+            remote_message_id = await self.sender.send(row)
+            values = {"status": "sent", "sent_at": now, "remote_message_id": remote_message_id, "last_error": None}
+            self.stats["sent"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            retryable = getattr(exc, "retryable", True)
+            retry_after = getattr(exc, "retry_after", None)
+            if retry_after:
+                self.bucket.pause(retry_after)
+            if retryable and row["attempts"] < self.max_attempts:
+                delay = max(retry_after or 0.0, self._backoff_delay(row["attempts"]))
+                values = {
+                    "status": "pending",
+                    "next_attempt_at": now + timedelta(seconds=delay),
+                    "last_error": str(exc)[:2000],
+                }
+                self.stats["retried"] += 1
+            else:
+                values = {"status": "failed", "last_error": str(exc)[:2000]}
+                self.stats["failed"] += 1
+            print(
+                f"[cognilabsai-outbox] {self.channel} row {row['id']} attempt {row['attempts']} failed: {exc}",
+                flush=True,
+            )
+        await self._settle(row, values)
+
+    async def _postpone(self, row: dict, seconds: float) -> None:
+        async with async_session_maker() as session:
+            await session.execute(
+                update(cognilabsai_outbound_message)
+                .where(cognilabsai_outbound_message.c.id == row["id"])
+                .values(
+                    status="pending",
+                    attempts=cognilabsai_outbound_message.c.attempts - 1,
+                    next_attempt_at=datetime.utcnow() + timedelta(seconds=seconds),
+                )
+            )
+            await session.commit()
+        self.stats["postponed"] += 1
+
+    async def purge_sent(self) -> int:
+        """Deletes this channel's sent rows older than the retention, in batches"""
+        cutoff = datetime.utcnow() - OUTBOX_SENT_RETENTION
+        purged = 0
+        while True:
+            expired_ids = (
+                select(cognilabsai_outbound_message.c.id)
+                .where(
+                    cognilabsai_outbound_message.c.status == "sent",
+                    cognilabsai_outbound_message.c.sent_at < cutoff,
+                    cognilabsai_outbound_message.c.channel == self.channel,
+                )
+                .limit(OUTBOX_PURGE_BATCH_SIZE)
+                .scalar_subquery()
+            )
+            async with async_session_maker() as session:
+                result = await session.execute(
+                    delete(cognilabsai_outbound_message).where(cognilabsai_outbound_message.c.id.in_(expired_ids))
+                )
+                await session.commit()
+            purged += result.rowcount or 0
+            if (result.rowcount or 0) < OUTBOX_PURGE_BATCH_SIZE:
+                break
+        self.stats["purged"] += purged
+        return purged
+
+    async def _settle(self, row: dict, values: dict) -> None:
+        message_values = {"delivery_status": values["status"], "delivery_error": values.get("last_error")}
+        remote_id_column = REMOTE_ID_COLUMNS.get(self.channel)
+        if values.get("remote_message_id") and remote_id_column:
+            message_values[remote_id_column] = values["remote_message_id"]
+        async with async_session_maker() as session:
+            await session.execute(
+                update(cognilabsai_outbound_message)
+                .where(cognilabsai_outbound_message.c.id == row["id"])
+                .values(**values)
+            )
+            result = await session.execute(
+                update(cognilabsai_message)
+                .where(cognilabsai_message.c.id == row["message_id"])
+                .values(**message_values)
+                .returning(*cognilabsai_message.c)
+            )
+            message = result.mappings().first()
+            await session.commit()
+        # a retry that failed again changes nothing the client shows beyond the first error
+        if message is not None and (values["status"] != "pending" or row["attempts"] == 1):
+            await manager.broadcast(
+                {
+                    "type": "message.updated",
+                    "conversation_id": row["conversation_id"],
+                    "message": dict(message),
+                },
+                conversation_id=row["conversation_id"],
+            )
+
+
+class OutboundOutbox:
+    """Per-channel outbox workers for replies sent to Instagram and Telegram"""
+
+    def __init__(self):
+        self.workers: dict[str, OutboundChannelWorker] = {}
+
+    def register(self, channel: str, sender: ChannelSender, *, rate: float, burst: int, max_attempts: int) -> None:
+        self.workers[channel] = OutboundChannelWorker(channel, sender, TokenBucket(rate, burst), max_attempts)
+
+    def handles(self, channel: str) -> bool:
+        return channel in self.workers
+
+    async def enqueue(self, session: AsyncSession, message: dict, idempotency_key: str) -> None:
+        """Adds the row in the caller's transaction; a repeated key raises IntegrityError"""
+        await session.execute(
+            insert(cognilabsai_outbound_message).values(
+                idempotency_key=idempotency_key,
+                message_id=message["id"],
+                conversation_id=message["conversation_id"],
+                channel=message["channel"],
+                recipient_id=message["client_external_id"],
+                text=message["text"],
+                status="pending",
+                attempts=0,
+                next_attempt_at=datetime.utcnow(),
+                created_at=datetime.utcnow(),
+            )
+        )
+
+    async def find_message(self, session: AsyncSession, idempotency_key: str) -> Optional[dict]:
+        result = await session.execute(
+            select(cognilabsai_message)
+            .select_from(
+                cognilabsai_outbound_message.join(
+                    cognilabsai_message, cognilabsai_message.c.id == cognilabsai_outbound_message.c.message_id
+                )
+            )
+            .where(cognilabsai_outbound_message.c.idempotency_key == idempotency_key)
+        )
+        row = result.mappings().first()
+        return dict(row) if row else None
+
+    def wake(self, channel: str) -> None:
+        worker = self.workers.get(channel)
+        if worker is not None:
+            worker.wake()
+
+    async def start(self) -> None:
+        for worker in self.workers.values():
+            await worker.start()
+
+    async def stop(self) -> None:
+        for worker in self.workers.values():
+            await worker.stop()
+
+    def snapshot(self) -> dict:
+        return {channel: dict(worker.stats) for channel, worker in self.workers.items()}
+
+
+outbound_outbox = OutboundOutbox()
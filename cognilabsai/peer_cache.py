@@ -0,0 +1,147 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Iterable, Optional
+
+
+SnapshotResolver = Callable[[str], Awaitable[dict]]
+SnapshotPersister = Callable[[dict[str, dict]], Awaitable[None]]
+
+
+class _PeerEntry:
+    __slots__ = ("snapshot", "fetched_at", "failed_until")
+
+    def __init__(self, snapshot: Optional[dict], fetched_at: float, failed_until: float = 0.0):
+        self.snapshot = snapshot
+        self.fetched_at = fetched_at
+        self.failed_until = failed_until
+
+
+class PeerSnapshotCache:
+    """
+    Stale-while-revalidate cache for Telegram peer snapshots.
+
+    Fresh entries are served as is. Stale entries (older than FRESH_SECONDS but younger than
+    STALE_SECONDS) are served immediately while one background refresh per peer runs. Misses
+    are resolved concurrently, at most `concurrency` at a time. Failed lookups are remembered for
+    NEGATIVE_SECONDS (or the FloodWait duration) so a broken peer is not retried on every page load.
+    """
+
+    FRESH_SECONDS = 60
+    STALE_SECONDS = 6 * 3600
+    NEGATIVE_SECONDS = 300
+    MAX_ENTRIES = 10_000
+
+    def __init__(self, resolver: SnapshotResolver, persister: Optional[SnapshotPersister] = None, concurrency: int = 4):
+        self._resolver = resolver
+        self._persister = persister
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._entries: dict[str, _PeerEntry] = {}
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self.stats = {"fresh": 0, "stale": 0, "misses": 0, "negative": 0, "errors": 0}
+
+    def set_persister(self, persister: Optional[SnapshotPersister]) -> None:
+        self._persister = persister
+
+    def seed(self, peer: str, snapshot: dict, age_seconds: float) -> None:
+        """Prime the cache from a persisted snapshot unless a newer one is already in memory."""
+        fetched_at = time.monotonic() - max(0.0, age_seconds)
+        entry = self._entries.get(peer)
+        if entry is not None and entry.snapshot is not None and entry.fetched_at >= fetched_at:
+            return
+        self._entries[peer] = _PeerEntry(dict(snapshot), fetched_at)
+
+    def invalidate(self, peer: Optional[str] = None) -> None:
+        if peer is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(peer, None)
+
+    async def _resolve(self, peer: str) -> Optional[dict]:
+        async with self._semaphore:
+            try:
+                snapshot = await self._resolver(peer)
+            except Exception as exc:
+                self.stats["errors"] += 1
+                # telethon FloodWaitError carries the required wait in `seconds`
+                wait_seconds = getattr(exc, "seconds", None) or self.NEGATIVE_SECONDS
+                now = time.monotonic()
+                previous = self._entries.get(peer)
+                self._entries[peer] = _PeerEntry(
+                    previous.snapshot if previous else None,
+                    previous.fetched_at if previous else now,
+                    failed_until=now + float(wait_seconds),
+                )
+                return None
+        self._entries[peer] = _PeerEntry(dict(snapshot), time.monotonic())
+        return snapshot
+
+    async def _persist(self, snapshots: dict[str, dict]) -> None:
+        if not snapshots or self._persister is None:
+            return
+        try:
+            await self._persister(snapshots)
+        except Exception as exc:
+            print(f"[cognilabsai-peers] persist error: {exc}", flush=True)
+
+    async def _refresh(self, peer: str) -> None:
+        try:
+            snapshot = await self._resolve(peer)
+            if snapshot is not None:
+                await self._persist({peer: snapshot})
+        finally:
+            self._refreshing.pop(peer, None)
+
+    def _schedule_refresh(self, peer: str) -> None:
+        if peer in self._refreshing:
+            return
+        self._refreshing[peer] = asyncio.create_task(self._refresh(peer))
+
+    def _prune(self, now: float) -> None:
+        if len(self._entries) <= self.MAX_ENTRIES:
+            return
+        for peer, entry in list(self._entries.items()):
+            if now - entry.fetched_at > self.STALE_SECONDS and entry.failed_until < now:
+                self._entries.pop(peer, None)
+
+    async def get_many(self, peers: Iterable[str]) -> dict[str, Optional[dict]]:
+        now = time.monotonic()
+        self._prune(now)
+        results: dict[str, Optional[dict]] = {}
+        missing: list[str] = []
+        for peer in dict.fromkeys(peers):
+            entry = self._entries.get(peer)
+            if entry is not None and entry.failed_until > now:
+                self.stats["negative"] += 1
+                results[peer] = dict(entry.snapshot) if entry.snapshot else None
+                continue
+            if entry is not None and entry.snapshot is not None:
+                age = now - entry.fetched_at
+                if age <= self.FRESH_SECONDS:
+                    self.stats["fresh"] += 1
+                    results[peer] = dict(entry.snapshot)
+                    continue
+                if age <= self.STALE_SECONDS:
+                    self.stats["stale"] += 1
+                    results[peer] = dict(entry.snapshot)
+                    self._schedule_refresh(peer)
+                    continue
+            self.stats["misses"] += 1
+            missing.append(peer)
+        if missing:
+            resolved = await asyncio.gather(*(self._resolve(peer) for peer in missing))
+            fetched = {peer: snapshot for peer, snapshot in zip(missing, resolved) if snapshot is not None}
+            for peer, snapshot in zip(missing, resolved):
+                results[peer] = dict(snapshot) if snapshot is not None else None
+            await self._persist(fetched)
+        return results
+
+    async def get(self, peer: str) -> Optional[dict]:
+        return (await self.get_many([peer])).get(peer)
+
+    async def stop(self) -> None:
+        tasks = list(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._refreshing.clear()
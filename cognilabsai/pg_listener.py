@@ -0,0 +1,98 @@
+import asyncio
+import contextlib
+from typing import Awaitable, Callable, Optional
+
+import asyncpg
+
+from config import DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_USER
+
+
+NotifyCallback = Callable[[str], Awaitable[None] | None]
+
+
+class PostgresListener:
+    """
+    One dedicated asyncpg connection that LISTENs on a set of channels and fans NOTIFY payloads
+    out to in-process callbacks. Reconnects with backoff; `on_reconnect` callbacks run after every
+    (re)connect so subscribers can resync whatever they may have missed while disconnected.
+    """
+
+    RECONNECT_MIN_SECONDS = 1.0
+    RECONNECT_MAX_SECONDS = 30.0
+
+    def __init__(self):
+        self._callbacks: dict[str, list[NotifyCallback]] = {}
+        self._reconnect_callbacks: list[Callable[[], Awaitable[None] | None]] = []
+        self._connection: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, channel: str, callback: NotifyCallback) -> None:
+        self._callbacks.setdefault(channel, []).append(callback)
+
+    def on_reconnect(self, callback: Callable[[], Awaitable[None] | None]) -> None:
+        self._reconnect_callbacks.append(callback)
+
+    async def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self._close_connection()
+
+    async def _close_connection(self) -> None:
+        if self._connection is not None:
+            with contextlib.suppress(Exception):
+                await self._connection.close()
+            self._connection = None
+
+    async def _dispatch(self, channel: str, payload: str) -> None:
+        for callback in self._callbacks.get(channel, []):
+            try:
+                result = callback(payload)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as exc:
+                print(f"[cognilabsai-listen] {channel} callback error: {exc}", flush=True)
+
+    def _on_notify(self, connection, pid, channel: str, payload: str) -> None:
+        asyncio.get_running_loop().create_task(self._dispatch(channel, payload))
+
+    async def _run(self) -> None:
+        delay = self.RECONNECT_MIN_SECONDS
+        while True:
+            lost = asyncio.Event()
+            try:
+                self._connection = await asyncpg.connect(
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    host=DB_HOST,
+                    port=DB_PORT,
+                    database=DB_NAME,
+                )
+                self._connection.add_termination_listener(lambda connection: lost.set())
+                for channel in self._callbacks:
+                    await self._connection.add_listener(channel, self._on_notify)
+                delay = self.RECONNECT_MIN_SECONDS
+                for callback in self._reconnect_callbacks:
+                    result = callback()
+                    if asyncio.iscoroutine(result):
+                        await result
+                await lost.wait()
+                print("[cognilabsai-listen] connection lost, reconnecting", flush=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[cognilabsai-listen] listener error: {exc}", flush=True)
+            finally:
+                await self._close_connection()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.RECONNECT_MAX_SECONDS)
+
+
+pg_listener = PostgresListener()
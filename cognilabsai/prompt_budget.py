@@ -0,0 +1,48 @@
+import math
+from typing import Iterable
+
+
+# chat/completions adds a few tokens of framing per message (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+PROMPT_OVERHEAD_TOKENS = 3
+
+
+def estimate_tokens(text_value: str) -> int:
+    """
+    Cheap token estimate for budgeting, no tokenizer needed.
+
+    BPE tokenizers average ~4 characters per token for Latin text; Cyrillic text encodes to two
+    UTF-8 bytes per letter and tokenizes much denser, so the byte length is used as a second
+    bound. Both overestimate slightly, which is the safe side for a budget.
+    """
+    if not text_value:
+        return 0
+    return max(math.ceil(len(text_value) / 4), math.ceil(len(text_value.encode("utf-8")) / 5))
+
+
+def estimate_message_tokens(message: dict) -> int:
+    content = message.get("content")
+    if isinstance(content, list):
+        content = " ".join(str(item.get("text") or "") for item in content if isinstance(item, dict))
+    return MESSAGE_OVERHEAD_TOKENS + estimate_tokens(content or "")
+
+
+def estimate_prompt_tokens(messages: Iterable[dict]) -> int:
+    return PROMPT_OVERHEAD_TOKENS + sum(estimate_message_tokens(message) for message in messages)
+
+
+def fit_recent_messages(messages: list[dict], budget_tokens: int, min_messages: int = 2) -> list[dict]:
+    """
+    Keep the newest chat messages that fit into `budget_tokens`, oldest dropped first.
+    The last `min_messages` are always kept so the model sees what it is answering.
+    """
+    kept: list[dict] = []
+    used = 0
+    for message in reversed(messages):
+        cost = estimate_message_tokens(message)
+        if used + cost > budget_tokens and len(kept) >= min_messages:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    return kept
@@ -0,0 +1,133 @@
+import math
+import time
+from collections import Counter
+from typing import Optional
+
+from config import (
+    COGNILABSAI_PUBLIC_IP_MESSAGES_PER_MINUTE,
+    COGNILABSAI_PUBLIC_IP_REQUESTS_PER_MINUTE,
+    COGNILABSAI_PUBLIC_SESSION_MESSAGES_PER_MINUTE,
+    COGNILABSAI_PUBLIC_WS_PER_IP,
+)
+
+
+class KeyedTokenBucket:
+    """
+    One token bucket per key (IP, session), refilled at `per_minute` tokens a minute up to `burst`.
+    Buckets that refilled completely carry no state and are dropped when the table grows.
+    """
+
+    MAX_KEYS = 50_000
+
+    def __init__(self, per_minute: float, burst: Optional[int] = None):
+        self.rate = max(per_minute, 1) / 60.0
+        self.burst = float(burst if burst is not None else max(3, int(per_minute) // 4))
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def _prune(self, now: float) -> None:
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if tokens + (now - updated) * self.rate >= self.burst:
+                self._buckets.pop(key, None)
+
+    def take(self, key: str) -> float:
+        """0 when a token was taken, otherwise the seconds until the next one"""
+        now = time.monotonic()
+        if len(self._buckets) > self.MAX_KEYS:
+            self._prune(now)
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate
+        self._buckets[key] = (tokens - 1, now)
+        return 0.0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimited(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class PublicChatLimiter:
+    """
+    In-process limits for the unauthenticated website chat: request rate per IP, message rate per
+    IP and per session, and concurrent website sockets per IP. Each worker process keeps its own
+    counts, so the effective limit is per process.
+    """
+
+    def __init__(
+        self,
+        ip_requests_per_minute: float = COGNILABSAI_PUBLIC_IP_REQUESTS_PER_MINUTE,
+        ip_messages_per_minute: float = COGNILABSAI_PUBLIC_IP_MESSAGES_PER_MINUTE,
+        session_messages_per_minute: float = COGNILABSAI_PUBLIC_SESSION_MESSAGES_PER_MINUTE,
+        sockets_per_ip: int = COGNILABSAI_PUBLIC_WS_PER_IP,
+    ):
+        self.ip_requests = KeyedTokenBucket(ip_requests_per_minute)
+        self.ip_messages = KeyedTokenBucket(ip_messages_per_minute)
+        self.session_messages = KeyedTokenBucket(session_messages_per_minute)
+        self.sockets_per_ip = max(1, sockets_per_ip)
+        self._sockets: Counter[str] = Counter()
+        self.accepted = Counter()
+        self.rejected = Counter()
+
+    def _reject(self, reason: str, retry_after: float) -> None:
+        self.rejected[reason] += 1
+        raise RateLimited(reason, retry_after)
+
+    def check_request(self, ip_address: Optional[str]) -> None:
+        retry_after = self.ip_requests.take(ip_address or "unknown")
+        if retry_after:
+            self._reject("ip_requests", retry_after)
+        self.accepted["requests"] += 1
+
+    def check_message(self, ip_address: Optional[str], session_id: str) -> None:
+        # the session bucket is checked first so a flood on one session does not spend the IP's budget
+        # session ids are picked by the client, so a client rotating them is held by the IP bucket
+        retry_after = self.session_messages.take(session_id.strip())
+        if retry_after:
+            self._reject("session_messages", retry_after)
+        retry_after = self.ip_messages.take(ip_address or "unknown")
+        if retry_after:
+            self._reject("ip_messages", retry_after)
+        self.accepted["messages"] += 1
+
+    def open_socket(self, ip_address: Optional[str]) -> None:
+        key = ip_address or "unknown"
+        if self._sockets[key] >= self.sockets_per_ip:
+            self._reject("ip_sockets", 30.0)
+        self._sockets[key] += 1
+        self.accepted["sockets"] += 1
+
+    def close_socket(self, ip_address: Optional[str]) -> None:
+        key = ip_address or "unknown"
+        self._sockets[key] -= 1
+        if self._sockets[key] <= 0:
+            del self._sockets[key]
+
+    def snapshot(self) -> dict:
+        return {
+            "accepted": dict(self.accepted),
+            "rejected": dict(self.rejected),
+            "rejected_total": sum(self.rejected.values()),
+            "open_sockets": sum(self._sockets.values()),
+            "tracked_ips": len(self.ip_requests),
+            "tracked_sessions": len(self.session_messages),
+            "limits": {
+                "ip_requests_per_minute": round(self.ip_requests.rate * 60, 2),
+                "ip_messages_per_minute": round(self.ip_messages.rate * 60, 2),
+                "session_messages_per_minute": round(self.session_messages.rate * 60, 2),
+                "sockets_per_ip": self.sockets_per_ip,
+            },
+        }
+
+
+public_chat_limiter = PublicChatLimiter()
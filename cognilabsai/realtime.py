@@ -1,50 +1,310 @@
 import asyncio
-from collections import defaultdict
+import bisect
+import json
+from collections import OrderedDict, defaultdict
+from typing import Callable, Iterable, Optional
 
 from fastapi.encoders import jsonable_encoder
 from fastapi import WebSocket
 
+from config import (
+    COGNILABSAI_WS_REPLAY_BUFFER_SIZE,
+    COGNILABSAI_WS_REPLAY_CONVERSATIONS,
+    COGNILABSAI_WS_SEND_QUEUE_SIZE,
+    COGNILABSAI_WS_SEND_TIMEOUT_SECONDS,
+)
+
+
+# Superseded by the final message.created, so a backed-up client can skip them instead of being cut off
+DROPPABLE_EVENT_TYPES = {"message.delta"}
+# 1013 "try again later": the client fell too far behind and should reconnect
+OVERFLOW_CLOSE_CODE = 1013
+# close tasks of cut-off sockets; the loop only keeps weak references to tasks
+_closing_tasks: set[asyncio.Task] = set()
+
+
+def encode_event(payload: dict) -> str:
+    """Same wire format as WebSocket.send_json"""
+    return json.dumps(jsonable_encoder(payload), separators=(",", ":"), ensure_ascii=False)
+
+
+class ConversationReplayBuffer:
+    """
+    Last sequenced events of recently active conversations, so a reconnecting website widget can
+    be sent what it missed without touching the database. Least recently active conversations
+    are evicted first.
+    """
+
+    def __init__(
+        self,
+        per_conversation: int = COGNILABSAI_WS_REPLAY_BUFFER_SIZE,
+        max_conversations: int = COGNILABSAI_WS_REPLAY_CONVERSATIONS,
+    ):
+        self.per_conversation = per_conversation
+        self.max_conversations = max_conversations
+        self._events: OrderedDict[int, list[tuple[int, str]]] = OrderedDict()
+
+    def record(self, conversation_id: int, event_seq: int, message: str) -> None:
+        events = self._events.get(conversation_id)
+        if events is None:
+            events = self._events[conversation_id] = []
+            if len(self._events) > self.max_conversations:
+                self._events.popitem(last=False)
+        else:
+            self._events.move_to_end(conversation_id)
+        if not events or event_seq > events[-1][0]:
+            events.append((event_seq, message))
+        else:
+            # concurrent writers may broadcast out of commit order
+            position = bisect.bisect_left(events, (event_seq,))
+            if position < len(events) and events[position][0] == event_seq:
+                return
+            events.insert(position, (event_seq, message))
+        if len(events) > self.per_conversation:
+            del events[: len(events) - self.per_conversation]
+
+    def covers(self, conversation_id: int, after_seq: int) -> bool:
+        """True when every event after `after_seq` that this process has seen is still buffered"""
+        events = self._events.get(conversation_id)
+        if not events or events[0][0] > after_seq + 1:
+            return False
+        expected = after_seq + 1
+        for event_seq, _ in events:
+            if event_seq < expected:
+                continue
+            if event_seq != expected:
+                return False
+            expected += 1
+        return True
+
+    def since(self, conversation_id: int, after_seq: int) -> list[tuple[int, str]]:
+        events = self._events.get(conversation_id) or []
+        return [(event_seq, message) for event_seq, message in events if event_seq > after_seq]
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+class WebSocketSender:
+    """
+    Owns the writes to one websocket: broadcasts only enqueue, a dedicated task drains the
+    queue, so a slow or half-dead client never holds up the caller or the other clients.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_queue: int = COGNILABSAI_WS_SEND_QUEUE_SIZE,
+        send_timeout: float = COGNILABSAI_WS_SEND_TIMEOUT_SECONDS,
+    ):
+        self.websocket = websocket
+        self.send_timeout = send_timeout
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self.dropped = 0
+        self.sent = 0
+        self._task = asyncio.create_task(self._run())
+
+    def offer(self, message: str, droppable: bool = False) -> bool:
+        """False when the client is gone or was just cut off for falling behind"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            if droppable:
+                self.dropped += 1
+                return True
+            self.close("overflow")
+            return False
+        return True
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                message = await self.queue.get()
+                await asyncio.wait_for(self.websocket.send_text(message), self.send_timeout)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.close("send_timeout")
+        except Exception as exc:
+            print(f"CognilabsAI websocket send error: {exc}")
+            self.close("send_error")
+
+    def close(self, reason: str) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+        if reason in ("overflow", "send_timeout"):
+            print(f"CognilabsAI websocket dropped ({reason}, {self.queue.qsize()} queued)")
+            task = asyncio.create_task(self._close_websocket())
+            _closing_tasks.add(task)
+            task.add_done_callback(_closing_tasks.discard)
+
+    async def _close_websocket(self) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=OVERFLOW_CLOSE_CODE), self.send_timeout)
+        except asyncio.TimeoutError:
+            print("CognilabsAI websocket close timed out")
+        except Exception as exc:
+            print(f"CognilabsAI websocket close error: {exc}")
+
+    async def stop(self) -> None:
+        self.close("disconnected")
+        try:
+            await self._task
+        except BaseException:
+            pass
+
 
 class CognilabsAIConnectionManager:
-    def __init__(self):
+    def __init__(
+        self,
+        max_queue: int = COGNILABSAI_WS_SEND_QUEUE_SIZE,
+        send_timeout: float = COGNILABSAI_WS_SEND_TIMEOUT_SECONDS,
+    ):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
         self._all_connections: set[WebSocket] = set()
         self._conversation_connections: dict[int, set[WebSocket]] = defaultdict(set)
+        self._website_connections: dict[int, set[WebSocket]] = defaultdict(set)
+        self._senders: dict[WebSocket, WebSocketSender] = {}
         self._lock = asyncio.Lock()
+        self.replay_buffer = ConversationReplayBuffer()
+        # set by the realtime bus when events are shared with other processes
+        self.publisher: Optional[Callable[[str, Optional[int]], None]] = None
+        self.stats = {"broadcasts": 0, "dropped": 0, "cut_off": 0}
 
-    async def connect(self, websocket: WebSocket, conversation_id: int | None = None):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        conversation_id: int | None = None,
+        website: bool = False,
+        resume_after: int | None = None,
+        backlog: Optional[Iterable[tuple[int, str]]] = (),
+    ):
+        """
+        With `resume_after` the socket first gets the events it missed: `backlog` (loaded from the
+        database when the replay buffer did not cover the gap) followed by whatever is buffered
+        after it. `backlog=None` means the gap is too large to replay and the client is told to
+        reload the history instead.
+        """
         await websocket.accept()
         async with self._lock:
-            self._all_connections.add(websocket)
+            sender = self._senders[websocket] = WebSocketSender(websocket, self.max_queue, self.send_timeout)
+            if not website:
+                # website visitors only get events of their own conversation
+                self._all_connections.add(websocket)
             if conversation_id is not None:
                 self._conversation_connections[conversation_id].add(websocket)
+                if website:
+                    self._website_connections[conversation_id].add(websocket)
+                if resume_after is not None:
+                    # nothing awaits between registering and queueing the replay, so no live
+                    # event can slip in between or ahead of it
+                    self._replay(sender, conversation_id, resume_after, backlog)
+
+    def _replay(
+        self,
+        sender: WebSocketSender,
+        conversation_id: int,
+        resume_after: int,
+        backlog: Optional[Iterable[tuple[int, str]]],
+    ) -> None:
+        if backlog is None:
+            sender.offer(encode_event({"type": "session.resync_required", "conversation_id": conversation_id}))
+            return
+        replay = list(backlog)
+        replay += self.replay_buffer.since(conversation_id, replay[-1][0] if replay else resume_after)
+        for _, message in replay:
+            sender.offer(message)
+        sender.offer(
+            encode_event(
+                {
+                    "type": "session.resumed",
+                    "conversation_id": conversation_id,
+                    "last_seq": replay[-1][0] if replay else resume_after,
+                    "replayed": len(replay),
+                }
+            )
+        )
+
+    def _forget(self, websocket: WebSocket) -> Optional[WebSocketSender]:
+        self._all_connections.discard(websocket)
+        for connections in (self._conversation_connections, self._website_connections):
+            for key in list(connections.keys()):
+                connections[key].discard(websocket)
+                if not connections[key]:
+                    connections.pop(key, None)
+        return self._senders.pop(websocket, None)
 
     async def disconnect(self, websocket: WebSocket, conversation_id: int | None = None):
         async with self._lock:
-            self._all_connections.discard(websocket)
-            if conversation_id is not None and conversation_id in self._conversation_connections:
-                self._conversation_connections[conversation_id].discard(websocket)
-                if not self._conversation_connections[conversation_id]:
-                    self._conversation_connections.pop(conversation_id, None)
-            else:
-                for key in list(self._conversation_connections.keys()):
-                    self._conversation_connections[key].discard(websocket)
-                    if not self._conversation_connections[key]:
-                        self._conversation_connections.pop(key, None)
+            sender = self._forget(websocket)
+        if sender is not None:
+            await sender.stop()
+
+    def has_website_visitor(self, conversation_id: int) -> bool:
+        return bool(self._website_connections.get(conversation_id))
 
     async def broadcast(self, payload: dict, conversation_id: int | None = None):
+        """Queues the event for every target and returns without waiting for any socket"""
+        event_seq = payload.get("event_seq")
+        if (
+            self.publisher is None
+            and event_seq is None
+            and not self._all_connections
+            and conversation_id not in self._conversation_connections
+        ):
+            return
+        # serialized once for every socket
+        message = encode_event(payload)
+        if self.publisher is not None:
+            self.publisher(message, conversation_id)
+        self.deliver(message, conversation_id, payload.get("type") in DROPPABLE_EVENT_TYPES, event_seq)
+
+    def deliver(
+        self,
+        message: str,
+        conversation_id: int | None = None,
+        droppable: bool = False,
+        event_seq: int | None = None,
+    ) -> None:
+        """Fans an already serialized event out to the sockets of this process"""
+        if event_seq is not None and conversation_id is not None:
+            self.replay_buffer.record(conversation_id, event_seq, message)
         targets = set(self._all_connections)
         if conversation_id is not None:
             targets |= self._conversation_connections.get(conversation_id, set())
-        encoded_payload = jsonable_encoder(payload)
-        stale: list[WebSocket] = []
+        if not targets:
+            return
+        self.stats["broadcasts"] += 1
         for websocket in targets:
-            try:
-                await websocket.send_json(encoded_payload)
-            except Exception as exc:
-                print(f"CognilabsAI websocket broadcast error: {exc}")
-                stale.append(websocket)
-        for websocket in stale:
-            await self.disconnect(websocket)
+            sender = self._senders.get(websocket)
+            if sender is None:
+                continue
+            dropped_before = sender.dropped
+            if not sender.offer(message, droppable):
+                if sender.close_reason in ("overflow", "send_timeout"):
+                    self.stats["cut_off"] += 1
+                self._forget(websocket)
+            self.stats["dropped"] += sender.dropped - dropped_before
+
+    def snapshot(self) -> dict:
+        queued = [sender.queue.qsize() for sender in self._senders.values()]
+        return {
+            "connections": len(self._senders),
+            "queued_total": sum(queued),
+            "queued_max": max(queued, default=0),
+            "replay_conversations": len(self.replay_buffer),
+            **self.stats,
+        }
 
 
 manager = CognilabsAIConnectionManager()
@@ -0,0 +1,164 @@
+import asyncio
+import contextlib
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import delete, insert, select, text
+
+from database import async_session_maker
+
+from cognilabsai.realtime import DROPPABLE_EVENT_TYPES, CognilabsAIConnectionManager, manager
+from cognilabsai.tables import cognilabsai_realtime_event
+
+
+REALTIME_NOTIFY_CHANNEL = "cognilabsai_realtime"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more; bigger events go through the table
+NOTIFY_PAYLOAD_LIMIT = 7900
+PUBLISH_BATCH_SIZE = 200
+PUBLISH_QUEUE_SIZE = 10000
+SPILLOVER_RETENTION = timedelta(minutes=10)
+SPILLOVER_CLEANUP_SECONDS = 60.0
+
+
+class RealtimeBus:
+    """
+    Shares websocket events between app processes through Postgres LISTEN/NOTIFY.
+
+    The connection manager delivers every event to its own sockets immediately and hands the
+    serialized event to `publish`. One publisher task sends queued events in batches, one
+    transaction per batch, so other processes receive them in publish order. Notifications from
+    other origins are relayed to local sockets by a single task, again in order. Events larger
+    than a NOTIFY payload are stored in cognilabsai_realtime_event and only their id is sent.
+    """
+
+    def __init__(self, connections: CognilabsAIConnectionManager):
+        self.connections = connections
+        self.origin = uuid4().hex[:12]
+        self._own_prefix = f'{{"o":"{self.origin}"'
+        self._sequence = 0
+        self._outbox: Optional[asyncio.Queue[str]] = None
+        self._inbox: Optional[asyncio.Queue[str]] = None
+        self._tasks: list[asyncio.Task] = []
+        self._last_cleanup = 0.0
+        self.stats = {"published": 0, "spilled": 0, "relayed": 0, "dropped": 0, "errors": 0}
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    def publish(self, message: str, conversation_id: Optional[int]) -> None:
+        if self._outbox is None:
+            return
+        self._sequence += 1
+        # built around the already serialized event instead of encoding it a second time
+        envelope = (
+            f'{self._own_prefix},"n":{self._sequence},'
+            f'"c":{"null" if conversation_id is None else int(conversation_id)},"e":{message}}}'
+        )
+        try:
+            self._outbox.put_nowait(envelope)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+
+    def handle_notify(self, payload: str) -> None:
+        if self._inbox is None or payload.startswith(self._own_prefix):
+            return
+        self._inbox.put_nowait(payload)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._outbox = asyncio.Queue(maxsize=PUBLISH_QUEUE_SIZE)
+        self._inbox = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._publisher()), asyncio.create_task(self._relay())]
+        self.connections.publisher = self.publish
+
+    async def stop(self) -> None:
+        self.connections.publisher = None
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        self._outbox = None
+        self._inbox = None
+
+    async def _publisher(self) -> None:
+        while True:
+            batch = [await self._outbox.get()]
+            while len(batch) < PUBLISH_BATCH_SIZE and not self._outbox.empty():
+                batch.append(self._outbox.get_nowait())
+            try:
+                await self._send(batch)
+                self.stats["published"] += len(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.stats["errors"] += 1
+                print(f"[cognilabsai-realtime] publish error, {len(batch)} event(s) not shared: {exc}", flush=True)
+
+    async def _send(self, batch: list[str]) -> None:
+        payloads: list[str] = []
+        async with async_session_maker() as session:
+            for envelope in batch:
+                if len(envelope.encode("utf-8")) <= NOTIFY_PAYLOAD_LIMIT:
+                    payloads.append(envelope)
+                    continue
+                result = await session.execute(
+                    insert(cognilabsai_realtime_event)
+                    .values(envelope=envelope, created_at=datetime.utcnow())
+                    .returning(cognilabsai_realtime_event.c.id)
+                )
+                payloads.append(f'{self._own_prefix},"r":{result.scalar_one()}}}')
+                self.stats["spilled"] += 1
+            # delivered on commit, in array order
+            await session.execute(
+                text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+                {"channel": REALTIME_NOTIFY_CHANNEL, "payloads": payloads},
+            )
+            if time.monotonic() - self._last_cleanup >= SPILLOVER_CLEANUP_SECONDS:
+                self._last_cleanup = time.monotonic()
+                await session.execute(
+                    delete(cognilabsai_realtime_event).where(
+                        cognilabsai_realtime_event.c.created_at < datetime.utcnow() - SPILLOVER_RETENTION
+                    )
+                )
+            await session.commit()
+
+    async def _load_spilled(self, event_id: int) -> Optional[dict]:
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(cognilabsai_realtime_event.c.envelope).where(cognilabsai_realtime_event.c.id == event_id)
+            )
+            envelope = result.scalar()
+        return json.loads(envelope) if envelope else None
+
+    async def _relay(self) -> None:
+        while True:
+            payload = await self._inbox.get()
+            try:
+                envelope = json.loads(payload)
+                if "r" in envelope:
+                    envelope = await self._load_spilled(int(envelope["r"]))
+                    if envelope is None:
+                        continue
+                event = envelope["e"]
+                self.connections.deliver(
+                    json.dumps(event, separators=(",", ":"), ensure_ascii=False),
+                    envelope.get("c"),
+                    event.get("type") in DROPPABLE_EVENT_TYPES,
+                    event.get("event_seq"),
+                )
+                self.stats["relayed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.stats["errors"] += 1
+                print(f"[cognilabsai-realtime] relay error: {exc}", flush=True)
+
+
+realtime_bus = RealtimeBus(manager)
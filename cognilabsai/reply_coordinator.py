@@ -0,0 +1,87 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+
+ReplyRunner = Callable[[int, Callable[[], bool]], Awaitable[Optional[dict]]]
+
+
+class _ConversationReplyState:
+    __slots__ = ("timer", "running", "dirty", "waiters")
+
+    def __init__(self):
+        self.timer: Optional[asyncio.Task] = None
+        self.running = False
+        self.dirty = False
+        self.waiters: list[asyncio.Future] = []
+
+
+class AIReplyCoordinator:
+    """
+    Serializes AI replies per conversation.
+
+    Reply requests that arrive within `debounce_seconds` of each other are coalesced into one
+    generation. Only one generation runs per conversation at a time; if new client messages
+    arrive while it runs, its reply is treated as stale (the runner is told via `is_stale` and
+    should drop it) and a fresh generation is scheduled once the current one finishes.
+    """
+
+    def __init__(self, runner: ReplyRunner, debounce_seconds: float = 2.0):
+        self._runner = runner
+        self.debounce_seconds = debounce_seconds
+        self._states: dict[int, _ConversationReplyState] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"requests": 0, "generations": 0, "superseded": 0}
+
+    def request(self, conversation_id: int) -> asyncio.Future:
+        self.stats["requests"] += 1
+        state = self._states.get(conversation_id)
+        if state is None:
+            state = self._states[conversation_id] = _ConversationReplyState()
+        future = asyncio.get_running_loop().create_future()
+        state.waiters.append(future)
+        if state.running:
+            state.dirty = True
+        else:
+            self._arm(conversation_id, state)
+        return future
+
+    def _arm(self, conversation_id: int, state: _ConversationReplyState) -> None:
+        if state.timer is not None and not state.timer.done():
+            state.timer.cancel()
+        state.timer = asyncio.create_task(self._debounced_run(conversation_id, state))
+        self._tasks.add(state.timer)
+        state.timer.add_done_callback(self._tasks.discard)
+
+    async def _debounced_run(self, conversation_id: int, state: _ConversationReplyState) -> None:
+        await asyncio.sleep(self.debounce_seconds)
+        state.timer = None
+        state.running = True
+        state.dirty = False
+        waiters, state.waiters = state.waiters, []
+        self.stats["generations"] += 1
+        result = None
+        try:
+            result = await self._runner(conversation_id, lambda: state.dirty)
+        except Exception as exc:
+            print(f"[cognilabsai-reply] conversation {conversation_id} reply error: {exc}", flush=True)
+        finally:
+            state.running = False
+        if state.dirty:
+            self.stats["superseded"] += 1
+            state.waiters = waiters + state.waiters
+            self._arm(conversation_id, state)
+            return
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+        if not state.waiters and state.timer is None:
+            self._states.pop(conversation_id, None)
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        for state in self._states.values():
+            for waiter in state.waiters:
+                if not waiter.done():
+                    waiter.cancel()
+        self._states.clear()
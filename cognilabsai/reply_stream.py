@@ -0,0 +1,75 @@
+import time
+from typing import Optional
+from uuid import uuid4
+
+from cognilabsai.realtime import manager
+
+
+class AIReplyStreamBroadcaster:
+    """
+    Relays streamed AI reply text to /ws/chat and /ws/website as `message.delta` events.
+
+    Deltas are coalesced for FLUSH_INTERVAL_SECONDS so a fast model does not turn into one
+    websocket frame per token. The final `message.created` event carries the same `stream_id`, so
+    clients replace the draft with the persisted (sanitized) message; `message.stream_aborted`
+    tells them to drop the draft.
+    """
+
+    FLUSH_INTERVAL_SECONDS = 0.05
+
+    def __init__(self, conversation_id: int):
+        self.conversation_id = conversation_id
+        self.stream_id = uuid4().hex
+        self.sequence = 0
+        self.started_at = time.perf_counter()
+        self.first_delta_at: Optional[float] = None
+        self._buffer: list[str] = []
+        self._last_flush = 0.0
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_delta_at is None:
+            return None
+        return self.first_delta_at - self.started_at
+
+    async def push(self, delta: str) -> None:
+        if not delta:
+            return
+        now = time.perf_counter()
+        if self.first_delta_at is None:
+            self.first_delta_at = now
+        self._buffer.append(delta)
+        if self.sequence == 0 or now - self._last_flush >= self.FLUSH_INTERVAL_SECONDS:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        delta = "".join(self._buffer)
+        self._buffer.clear()
+        self._last_flush = time.perf_counter()
+        self.sequence += 1
+        await manager.broadcast(
+            {
+                "type": "message.delta",
+                "conversation_id": self.conversation_id,
+                "stream_id": self.stream_id,
+                "sequence": self.sequence,
+                "delta": delta,
+            },
+            conversation_id=self.conversation_id,
+        )
+
+    async def abort(self, reason: str) -> None:
+        self._buffer.clear()
+        if self.sequence == 0:
+            return
+        await manager.broadcast(
+            {
+                "type": "message.stream_aborted",
+                "conversation_id": self.conversation_id,
+                "stream_id": self.stream_id,
+                "reason": reason,
+            },
+            conversation_id=self.conversation_id,
+        )
@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, WebSocket, WebSocketDisconnect
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.responses import PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_async_session
+from utils.audit import client_ip
 
+from cognilabsai.follow_up_scheduler import follow_up_scheduler
 from cognilabsai.permissions import require_cognilabsai_chat, require_cognilabsai_integrations
-from cognilabsai.realtime import manager
+from cognilabsai.public_limits import RateLimited, public_chat_limiter
+from cognilabsai.realtime import OVERFLOW_CLOSE_CODE, manager
 from cognilabsai.schemas import (
     AIGlobalToggleRequest,
     ConversationItem,
     ConversationListResponse,
+    FAQAnswerApproveRequest,
+    FAQAnswerItem,
+    FAQAnswerListResponse,
     FollowUpConfigRequest,
     GenericMessageResponse,
     ImportConversationsRequest,
@@ -17,6 +25,7 @@ from cognilabsai.schemas import (
     IntegrationConfigPayload,
     IntegrationConfigResponse,
     MessageItem,
+    MessageSearchResponse,
     PauseConversationRequest,
     PauseUntilRequest,
     SendMessageRequest,
@@ -26,23 +35,31 @@ from cognilabsai.schemas import (
     WebsiteMessageRequest,
     WebsiteSessionInitRequest,
     WebsiteSessionResponse,
+    WebhookInboxReplayRequest,
 )
 from cognilabsai.service import (
+    approve_faq_answer,
     delete_conversation,
+    enqueue_instagram_webhook_payload,
+    evict_faq_answer,
     get_conversation,
     get_integration_config,
     get_messages,
     import_instagram_conversations,
     import_instagram_conversations_upload,
+    get_website_conversation_id,
     init_website_session,
+    load_website_resume_backlog,
     list_conversations,
+    list_faq_answers,
     mark_conversation_read,
-    maybe_send_ai_reply,
-    process_instagram_webhook_payload,
+    replay_instagram_webhook_inbox,
+    request_ai_reply,
     send_website_message,
     send_operator_message,
     search_telegram_peer,
     search_telegram_peers,
+    search_messages,
     set_conversation_pause,
     update_conversation_follow_up,
     update_global_ai_state,
@@ -52,11 +69,30 @@ from cognilabsai.service import (
 )
 
 
+def too_many_requests(exc: RateLimited) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many requests, please slow down",
+        headers={"Retry-After": exc.retry_after_header},
+    )
+
+
+def limit_public_request(request: Request) -> None:
+    try:
+        public_chat_limiter.check_request(client_ip(request))
+    except RateLimited as exc:
+        raise too_many_requests(exc) from exc
+
+
 router = APIRouter(prefix="/cognilabsai", tags=["CognilabsAI"])
 chat_router = APIRouter(prefix="/chat", tags=["CognilabsAI Chat"])
 integrations_router = APIRouter(prefix="/integrations", tags=["CognilabsAI Integrations"])
 webhook_router = APIRouter(prefix="/webhooks", tags=["CognilabsAI Webhooks"])
-public_router = APIRouter(prefix="/public", tags=["CognilabsAI Public"])
+public_router = APIRouter(
+    prefix="/public",
+    tags=["CognilabsAI Public"],
+    dependencies=[Depends(limit_public_request)],
+)
 
 
 @chat_router.get("/conversations", response_model=ConversationListResponse)
@@ -64,10 +100,14 @@ async def chat_conversations(
     channel: str | None = Query(default=None),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None, max_length=200),
     session: AsyncSession = Depends(get_async_session),
     current_user=Depends(require_cognilabsai_chat),
 ):
-    return await list_conversations(session, channel=channel, limit=limit, offset=offset)
+    try:
+        return await list_conversations(session, channel=channel, limit=limit, offset=offset, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
 @chat_router.get("/conversations/{conversation_id}", response_model=ConversationItem)
@@ -101,6 +141,33 @@ async def chat_messages(
     return await get_messages(session, conversation_id, limit=limit, offset=offset)
 
 
+@chat_router.get("/messages/search", response_model=MessageSearchResponse)
+async def chat_search_messages(
+    q: str = Query(..., min_length=2, max_length=200),
+    channel: str | None = Query(default=None),
+    conversation_id: int | None = Query(default=None),
+    date_from: datetime | None = Query(default=None),
+    date_to: datetime | None = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = Query(default=None, max_length=200),
+    session: AsyncSession = Depends(get_async_session),
+    current_user=Depends(require_cognilabsai_chat),
+):
+    try:
+        return await search_messages(
+            session,
+            q.strip(),
+            channel=channel,
+            conversation_id=conversation_id,
+            date_from=date_from,
+            date_to=date_to,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
 @chat_router.post("/send-message")
 async def chat_send_message(
     request: SendMessageRequest,
@@ -111,7 +178,13 @@ async def chat_send_message(
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     try:
-        return await send_operator_message(session, request.conversation_id, request.text, current_user)
+        return await send_operator_message(
+            session,
+            request.conversation_id,
+            request.text,
+            current_user,
+            client_message_id=request.client_message_id,
+        )
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
@@ -278,7 +351,7 @@ async def chat_retry_ai(
     conversation = await get_conversation(session, conversation_id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    await maybe_send_ai_reply(session, conversation_id)
+    request_ai_reply(conversation_id)
     return GenericMessageResponse(message="AI processing requested")
 
 
@@ -310,6 +383,70 @@ async def integrations_ai_toggle(
     return await update_global_ai_state(session, request.enabled)
 
 
+@integrations_router.post("/webhook-inbox/replay", response_model=GenericMessageResponse)
+async def integrations_webhook_inbox_replay(
+    request: WebhookInboxReplayRequest,
+    session: AsyncSession = Depends(get_async_session),
+    current_user=Depends(require_cognilabsai_integrations),
+):
+    count = await replay_instagram_webhook_inbox(
+        session,
+        ids=request.ids,
+        status=request.status,
+        limit=request.limit,
+    )
+    return GenericMessageResponse(message=f"{count} webhook payload(s) requeued")
+
+
+@integrations_router.get("/public-limits")
+async def integrations_public_limits(
+    current_user=Depends(require_cognilabsai_integrations),
+):
+    return public_chat_limiter.snapshot()
+
+
+@integrations_router.get("/follow-up-scheduler")
+async def integrations_follow_up_scheduler(
+    current_user=Depends(require_cognilabsai_integrations),
+):
+    return follow_up_scheduler.snapshot()
+
+
+@integrations_router.get("/faq-cache", response_model=FAQAnswerListResponse)
+async def integrations_faq_cache(
+    status: str | None = Query(default=None, pattern="^(pending|approved)$"),
+    limit: int = Query(default=50, ge=1, le=200),
+    offset: int = Query(default=0, ge=0),
+    session: AsyncSession = Depends(get_async_session),
+    current_user=Depends(require_cognilabsai_integrations),
+):
+    return await list_faq_answers(session, status=status, limit=limit, offset=offset)
+
+
+@integrations_router.post("/faq-cache/{faq_answer_id}/approve", response_model=FAQAnswerItem)
+async def integrations_faq_cache_approve(
+    faq_answer_id: int,
+    request: FAQAnswerApproveRequest,
+    session: AsyncSession = Depends(get_async_session),
+    current_user=Depends(require_cognilabsai_integrations),
+):
+    approved = await approve_faq_answer(session, faq_answer_id, current_user, answer_text=request.answer_text)
+    if not approved:
+        raise HTTPException(status_code=404, detail="FAQ answer not found")
+    return approved
+
+
+@integrations_router.delete("/faq-cache/{faq_answer_id}", response_model=GenericMessageResponse)
+async def integrations_faq_cache_evict(
+    faq_answer_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user=Depends(require_cognilabsai_integrations),
+):
+    if not await evict_faq_answer(session, faq_answer_id):
+        raise HTTPException(status_code=404, detail="FAQ answer not found")
+    return GenericMessageResponse(message="FAQ answer evicted")
+
+
 @webhook_router.get("/instagram")
 async def instagram_webhook_verify(
     hub_mode: str | None = Query(default=None, alias="hub.mode"),
@@ -328,7 +465,7 @@ async def instagram_webhook_receive(
     payload: dict,
     session: AsyncSession = Depends(get_async_session),
 ):
-    await process_instagram_webhook_payload(session, payload)
+    await enqueue_instagram_webhook_payload(session, payload)
     return GenericMessageResponse(message="received")
 
 
@@ -359,8 +496,14 @@ async def public_website_messages(
 @public_router.post("/website/send-message", response_model=WebsiteSessionResponse)
 async def public_website_send_message(
     request: WebsiteMessageRequest,
+    http_request: Request,
     session: AsyncSession = Depends(get_async_session),
 ):
+    # every accepted message costs DB writes and an LLM call
+    try:
+        public_chat_limiter.check_message(client_ip(http_request), request.session_id)
+    except RateLimited as exc:
+        raise too_many_requests(exc) from exc
     try:
         return await send_website_message(session, request.session_id, request.text)
     except Exception as exc:
@@ -394,13 +537,38 @@ async def cognilabsai_websocket(
 async def cognilabsai_website_websocket(
     websocket: WebSocket,
     session_id: str = Query(..., min_length=1),
+    last_seq: int | None = Query(default=None, ge=0),
 ):
+    ip_address = client_ip(websocket)
+    try:
+        public_chat_limiter.check_request(ip_address)
+        public_chat_limiter.open_socket(ip_address)
+    except RateLimited as exc:
+        # accepted first so the widget sees the close code and backs off
+        await websocket.accept()
+        await websocket.close(code=OVERFLOW_CLOSE_CODE, reason=exc.reason)
+        return
+    try:
+        await serve_website_websocket(websocket, session_id, last_seq)
+    finally:
+        public_chat_limiter.close_socket(ip_address)
+
+
+async def serve_website_websocket(websocket: WebSocket, session_id: str, last_seq: int | None) -> None:
     from database import async_session_maker
 
+    backlog = ()
     async with async_session_maker() as session:
-        website_session = await init_website_session(session, session_id)
-    conversation_id = website_session["conversation"]["id"]
-    await manager.connect(websocket, conversation_id=conversation_id)
+        conversation_id = await get_website_conversation_id(session, session_id)
+        if last_seq is not None and conversation_id:
+            backlog = await load_website_resume_backlog(session, conversation_id, last_seq)
+    await manager.connect(
+        websocket,
+        conversation_id=conversation_id,
+        website=True,
+        resume_after=last_seq if conversation_id else None,
+        backlog=backlog,
+    )
     try:
         while True:
             await websocket.receive_text()
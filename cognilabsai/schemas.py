@@ -3,6 +3,8 @@ from typing import Optional
 
 from pydantic import BaseModel, Field
 
+from config import COGNILABSAI_WEBSITE_MESSAGE_MAX_CHARS
+
 
 class IntegrationConfigPayload(BaseModel):
     openai_api_key: Optional[str] = None
@@ -72,20 +74,24 @@ class ConversationItem(BaseModel):
     default_follow_up_last_step: int = 0
     default_follow_up_due_at: Optional[datetime] = None
     default_follow_up_last_sent_at: Optional[datetime] = None
+    next_follow_up_at: Optional[datetime] = None
     last_message_at: Optional[datetime] = None
     last_message_preview: Optional[str] = None
     last_operator_user_id: Optional[int] = None
     last_operator_name: Optional[str] = None
     is_imported: bool
+    last_event_seq: int = 0
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
 
 class ConversationListResponse(BaseModel):
     items: list[ConversationItem]
-    total: int
+    # counted on the first page only; cursor pages skip it
+    total: Optional[int] = None
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
 
 
 class MessageItem(BaseModel):
@@ -103,21 +109,45 @@ class MessageItem(BaseModel):
     media_url: Optional[str] = None
     is_read: bool = False
     read_at: Optional[datetime] = None
+    event_seq: Optional[int] = None
+    delivery_status: Optional[str] = None
+    delivery_error: Optional[str] = None
     created_at: datetime
 
 
+class MessageSearchItem(BaseModel):
+    message_id: int
+    conversation_id: int
+    channel: str
+    sender_type: str
+    operator_name_snapshot: Optional[str] = None
+    client_display_name: str
+    # HTML-escaped message fragment, matches wrapped in <mark>
+    snippet: str
+    rank: float
+    created_at: Optional[datetime] = None
+
+
+class MessageSearchResponse(BaseModel):
+    query: str
+    items: list[MessageSearchItem]
+    next_cursor: Optional[str] = None
+
+
 class SendMessageRequest(BaseModel):
     conversation_id: int
     text: str = Field(min_length=1)
+    # generated by the client per message; a resubmitted request is not sent twice
+    client_message_id: Optional[str] = Field(default=None, max_length=100)
 
 
 class WebsiteSessionInitRequest(BaseModel):
-    session_id: Optional[str] = None
+    session_id: Optional[str] = Field(default=None, max_length=255)
 
 
 class WebsiteMessageRequest(BaseModel):
-    session_id: str = Field(min_length=1)
-    text: str = Field(min_length=1)
+    session_id: str = Field(min_length=1, max_length=255)
+    text: str = Field(min_length=1, max_length=COGNILABSAI_WEBSITE_MESSAGE_MAX_CHARS)
 
 
 class WebsiteSessionResponse(BaseModel):
@@ -193,5 +223,53 @@ class ImportConversationsResponse(BaseModel):
     source_type: Optional[str] = None
 
 
+class WebhookInboxReplayRequest(BaseModel):
+    ids: Optional[list[int]] = None
+    status: Optional[str] = "failed"
+    limit: int = Field(default=100, ge=1, le=1000)
+
+
 class GenericMessageResponse(BaseModel):
     message: str
+
+
+class FAQAnswerItem(BaseModel):
+    id: int
+    config_version: int
+    question_text: str
+    answer_text: str
+    status: str
+    source_conversation_id: Optional[int] = None
+    hit_count: int = 0
+    last_hit_at: Optional[datetime] = None
+    approved_by_user_id: Optional[int] = None
+    approved_by_name: Optional[str] = None
+    approved_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    is_current: bool = False
+
+
+class FAQCacheStats(BaseModel):
+    lookups: int
+    exact_hits: int
+    near_hits: int
+    misses: int
+    hit_rate: float
+    saved_seconds: float
+    average_generation_seconds: float
+    indexed_entries: int
+    rebuilds: int
+    config_version: Optional[int] = None
+
+
+class FAQAnswerListResponse(BaseModel):
+    items: list[FAQAnswerItem]
+    total: int
+    limit: int
+    offset: int
+    stats: FAQCacheStats
+
+
+class FAQAnswerApproveRequest(BaseModel):
+    answer_text: Optional[str] = None
@@ -1,41 +1,78 @@
 import asyncio
+import base64
 import contextlib
 import hashlib
+import html
 import io
 import json
 import os
 import re
+import time
 import zipfile
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from pathlib import Path
+from typing import Callable, Optional
 from uuid import uuid4
 
-import httpx
-from sqlalchemy import String, cast, delete, func, insert, select, text, update
+from sqlalchemy import String, case, cast, delete, func, insert, or_, select, text, true, tuple_, update
 from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from telegram import Bot
 from telegram.request import HTTPXRequest
 
-from database import async_session_maker
+from database import async_session_maker, release_session_connection
 from models.admin_models import app_page_table
 from models.user_models import user
+from utils.http_clients import http_clients
+from utils.circuit_breaker import CircuitOpenError
+from utils.llm_gateway import llm_telemetry, post_llm
+from utils.db_pool_monitor import pool_hold_monitor
 from utils.page_permissions import ensure_app_page_schema
 from schemes.crm_schemes import ConversationLanguageEnum, CustomerAPICreateRequest
 from routers.crm import create_customer_api_record
 
-from cognilabsai.realtime import manager
+from cognilabsai.config_cache import CONFIG_NOTIFY_CHANNEL, integration_config_cache
+from cognilabsai.faq_cache import (
+    FAQ_NOTIFY_CHANNEL,
+    faq_answer_index,
+    is_cacheable_question,
+    normalize_question,
+    question_key,
+)
+from cognilabsai.follow_up_scheduler import follow_up_scheduler
+from cognilabsai.llm_stream import DeltaCallback, LLMHTTPError, LLMStreamAborted, stream_chat_completion
+from cognilabsai.outbox import OutboundSendError, StubChannelSender, outbound_outbox
+from cognilabsai.pg_listener import pg_listener
+from cognilabsai.prompt_budget import estimate_prompt_tokens, fit_recent_messages
+from cognilabsai.realtime import encode_event, manager
+from cognilabsai.realtime_bus import REALTIME_NOTIFY_CHANNEL, realtime_bus
+from cognilabsai.reply_coordinator import AIReplyCoordinator
+from cognilabsai.reply_stream import AIReplyStreamBroadcaster
 from cognilabsai.tables import (
     COGNILABSAI_CHAT_PERMISSION,
     COGNILABSAI_INTEGRATIONS_PERMISSION,
     cognilabsai_conversation,
+    cognilabsai_conversation_summary,
+    cognilabsai_faq_answer,
     cognilabsai_global_integration,
     cognilabsai_import_log,
     cognilabsai_message,
+    cognilabsai_message_search_vector,
     cognilabsai_pause_event,
 )
-from cognilabsai.telegram_userbot import telegram_userbot_manager
+from cognilabsai.telegram_userbot import telegram_media_store, telegram_userbot_manager
+from cognilabsai.webhook_inbox import instagram_webhook_inbox, iter_instagram_messaging_events
 from config import (
+    COGNILABSAI_OUTBOX_INSTAGRAM_BURST,
+    COGNILABSAI_OUTBOX_INSTAGRAM_RATE,
+    COGNILABSAI_OUTBOX_MAX_ATTEMPTS,
+    COGNILABSAI_OUTBOX_SENDER,
+    COGNILABSAI_OUTBOX_TELEGRAM_BURST,
+    COGNILABSAI_OUTBOX_TELEGRAM_RATE,
+    COGNILABSAI_PROMPT_TOKEN_BUDGET,
+    COGNILABSAI_REALTIME_BACKEND,
+    COGNILABSAI_REPLY_DEBOUNCE_SECONDS,
     COGNILABS_CHANNEL_ID,
     COGNILABS_TELEGRAM_TOKEN,
     INSTAGRAM_ACCESS_TOKEN,
@@ -76,11 +113,56 @@ COGNILABSAI_BEHAVIOR_PROMPT = (
     "Do NOT restart the script, do NOT ask for name/phone/field again after lead is created."
 )
 
-FOLLOW_UP_POLL_INTERVAL_SECONDS = 60
-follow_up_scheduler_task: Optional[asyncio.Task] = None
 schema_ready = False
 schema_lock = asyncio.Lock()
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+# applied at startup by ensure_schema when missing from cognilabsai_schema_migration
+COGNILABSAI_MIGRATIONS = (
+    "007_cognilabsai_schema",
+    "008_cognilabsai_conversation_summary",
+    "009_cognilabsai_faq_answer",
+    "010_cognilabsai_realtime_event",
+    "011_cognilabsai_event_seq",
+    "012_cognilabsai_inbox_keyset",
+    "013_cognilabsai_message_search",
+    "014_cognilabsai_outbound_message",
+    "015_cognilabsai_follow_up_schedule",
+    "016_cognilabsai_outbound_retention",
+)
 FOLLOW_UPS_ENABLED = False
+# Missed messages a reconnecting website widget is sent from the database; beyond this it reloads the
+# history. Kept below the websocket send queue so the replay itself cannot overflow it
+WEBSITE_RESUME_MESSAGE_LIMIT = 200
+# A website reply keeps generating this long after the visitor's last socket closed
+WEBSITE_VISITOR_GRACE_SECONDS = 10.0
+# Private-use characters mark matches in ts_headline output until the snippet is HTML-escaped
+SEARCH_HIGHLIGHT_START = "\ue000"
+SEARCH_HIGHLIGHT_STOP = "\ue001"
+# Raw messages sent with an AI reply; anything older is covered by the rolling summary
+AI_RECENT_MESSAGE_LIMIT = 30
+# Folding into the summary starts once this many unsummarized messages pile up ...
+AI_SUMMARY_TRIGGER_MESSAGES = 24
+# ... and leaves the newest ones verbatim
+AI_SUMMARY_KEEP_RECENT = 12
+AI_SUMMARY_MAX_BATCH = 60
+COGNILABSAI_SUMMARY_PROMPT = (
+    "You maintain a running summary of a sales chat between a client and Cognilabs "
+    "(AI assistant and human operators). Merge the new messages into the existing summary. "
+    "Keep: client's name, phone, business field, services they asked about, prices or terms "
+    "already quoted, agreed call time, objections and open questions, and what was promised to them. "
+    "Drop greetings and small talk. Write in the client's language, at most 150 words, plain text."
+)
+FOLLOW_UP_RESET_VALUES = {
+    "follow_up_enabled": False,
+    "follow_up_mode": None,
+    "follow_up_delay_minutes": None,
+    "follow_up_message": None,
+    "follow_up_due_at": None,
+    "follow_up_sent_at": None,
+    "default_follow_up_last_step": 0,
+    "default_follow_up_due_at": None,
+    "default_follow_up_last_sent_at": None,
+}
 DEFAULT_INSTAGRAM_FOLLOWUP_STEP1_DELAY_MINUTES = 180
 DEFAULT_INSTAGRAM_FOLLOWUP_STEP2_DELAY_MINUTES = 360
 DEFAULT_INSTAGRAM_FOLLOWUP_STEP3_DELAY_MINUTES = 1200
@@ -127,6 +209,8 @@ FOLLOW_UP_STOP_PHRASES = (
 
 INSTAGRAM_RECIPIENT_NOT_FOUND_SUBCODE = 2534014
 INSTAGRAM_OUTSIDE_WINDOW_SUBCODE = 2534022
+# Graph API rate limit error codes; the send is retried later instead of failing
+INSTAGRAM_THROTTLING_ERROR_CODES = {4, 17, 32, 613}
 
 
 class InstagramSendError(Exception):
@@ -509,6 +593,24 @@ def build_telegram_search_rank(item: dict, normalized_query: str) -> tuple[int,
     )
 
 
+async def apply_pending_cognilabsai_migrations(session: AsyncSession) -> list[str]:
+    registry_exists = (await session.execute(text("SELECT to_regclass('cognilabsai_schema_migration') IS NOT NULL"))).scalar()
+    applied: set[str] = set()
+    if registry_exists:
+        applied = set((await session.execute(text("SELECT name FROM cognilabsai_schema_migration"))).scalars().all())
+    pending = [name for name in COGNILABSAI_MIGRATIONS if name not in applied]
+    if not pending:
+        return []
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    for name in pending:
+        script = (MIGRATIONS_DIR / f"{name}.sql").read_text(encoding="utf-8")
+        # multi-statement script: goes straight to asyncpg, inside the session's transaction
+        await raw_connection.driver_connection.execute(script)
+        print(f"[cognilabsai-schema] applied migration {name}", flush=True)
+    return pending
+
+
 async def ensure_schema(session: AsyncSession):
     global schema_ready
     if schema_ready:
@@ -516,328 +618,7 @@ async def ensure_schema(session: AsyncSession):
     async with schema_lock:
         if schema_ready:
             return
-        await session.execute(text("""
-            CREATE TABLE IF NOT EXISTS cognilabsai_global_integration (
-            id SERIAL PRIMARY KEY,
-            openai_api_key TEXT,
-            openai_model VARCHAR(255),
-            openai_base_url VARCHAR(500),
-            system_prompt TEXT,
-            instagram_access_token TEXT,
-            instagram_business_id VARCHAR(255),
-            instagram_verify_token VARCHAR(255),
-            telegram_api_id VARCHAR(100),
-            telegram_api_hash VARCHAR(255),
-            telegram_session TEXT,
-            cognilabs_telegram_token TEXT,
-            cognilabs_channel_id VARCHAR(255),
-            frontend_base_url VARCHAR(1000),
-            instagram_followup_enabled BOOLEAN NOT NULL DEFAULT FALSE,
-            instagram_followup_delay_minutes INTEGER NULL,
-            instagram_followup_message TEXT NULL,
-            telegram_followup_enabled BOOLEAN NOT NULL DEFAULT FALSE,
-            telegram_followup_delay_minutes INTEGER NULL,
-            telegram_followup_message TEXT NULL,
-            instagram_default_followup_enabled BOOLEAN NOT NULL DEFAULT TRUE,
-            instagram_default_followup_step1_enabled BOOLEAN NOT NULL DEFAULT TRUE,
-            instagram_default_followup_step1_delay_minutes INTEGER NULL,
-            instagram_default_followup_step1_message TEXT NULL,
-            instagram_default_followup_step2_enabled BOOLEAN NOT NULL DEFAULT TRUE,
-            instagram_default_followup_step2_delay_minutes INTEGER NULL,
-            instagram_default_followup_step2_message TEXT NULL,
-            instagram_default_followup_step3_enabled BOOLEAN NOT NULL DEFAULT TRUE,
-            instagram_default_followup_step3_delay_minutes INTEGER NULL,
-            instagram_default_followup_step3_message TEXT NULL,
-            ai_globally_enabled BOOLEAN NOT NULL DEFAULT TRUE,
-            ai_enabled_since TIMESTAMP NULL,
-            websocket_api_key VARCHAR(255),
-            created_at TIMESTAMP DEFAULT NOW(),
-            updated_at TIMESTAMP DEFAULT NOW()
-            )
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS cognilabs_telegram_token TEXT
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS cognilabs_channel_id VARCHAR(255)
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS frontend_base_url VARCHAR(1000)
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_followup_enabled BOOLEAN NOT NULL DEFAULT FALSE
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_followup_delay_minutes INTEGER NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_followup_message TEXT NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS telegram_followup_enabled BOOLEAN NOT NULL DEFAULT FALSE
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS telegram_followup_delay_minutes INTEGER NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS telegram_followup_message TEXT NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_default_followup_enabled BOOLEAN NOT NULL DEFAULT TRUE
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_default_followup_step1_enabled BOOLEAN NOT NULL DEFAULT TRUE
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_default_followup_step1_delay_minutes INTEGER NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_default_followup_step1_message TEXT NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_default_followup_step2_enabled BOOLEAN NOT NULL DEFAULT TRUE
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_default_followup_step2_delay_minutes INTEGER NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_default_followup_step2_message TEXT NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_default_followup_step3_enabled BOOLEAN NOT NULL DEFAULT TRUE
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_default_followup_step3_delay_minutes INTEGER NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS instagram_default_followup_step3_message TEXT NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS ai_globally_enabled BOOLEAN NOT NULL DEFAULT TRUE
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_global_integration
-            ADD COLUMN IF NOT EXISTS ai_enabled_since TIMESTAMP NULL
-        """))
-        await session.execute(text("""
-            CREATE TABLE IF NOT EXISTS cognilabsai_conversation (
-            id SERIAL PRIMARY KEY,
-            channel VARCHAR(32) NOT NULL,
-            client_external_id VARCHAR(255) NOT NULL,
-            client_username VARCHAR(255),
-            client_full_name VARCHAR(255),
-            client_avatar_url VARCHAR(1000),
-            instagram_business_id VARCHAR(255),
-            ai_enabled BOOLEAN NOT NULL DEFAULT TRUE,
-            lead_created BOOLEAN NOT NULL DEFAULT FALSE,
-            crm_customer_id INTEGER NULL,
-            lead_full_name VARCHAR(255) NULL,
-            lead_phone_number VARCHAR(64) NULL,
-            lead_business_field VARCHAR(255) NULL,
-            lead_scheduled_time VARCHAR(255) NULL,
-            last_lead_created_at TIMESTAMP NULL,
-            unread_count INTEGER NOT NULL DEFAULT 0,
-            pause_reason VARCHAR(64),
-            paused_until TIMESTAMP NULL,
-            follow_up_enabled BOOLEAN NOT NULL DEFAULT FALSE,
-            follow_up_mode VARCHAR(32) NULL,
-            follow_up_delay_minutes INTEGER NULL,
-            follow_up_message TEXT NULL,
-            follow_up_due_at TIMESTAMP NULL,
-            follow_up_sent_at TIMESTAMP NULL,
-            default_follow_up_last_step INTEGER NOT NULL DEFAULT 0,
-            default_follow_up_due_at TIMESTAMP NULL,
-            default_follow_up_last_sent_at TIMESTAMP NULL,
-            last_message_at TIMESTAMP NULL,
-            last_message_preview TEXT NULL,
-            last_operator_user_id INTEGER NULL,
-            last_operator_name VARCHAR(255) NULL,
-            is_imported BOOLEAN NOT NULL DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT NOW(),
-            updated_at TIMESTAMP DEFAULT NOW(),
-            CONSTRAINT uq_cognilabsai_conversation_channel_client UNIQUE (channel, client_external_id)
-            )
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS client_avatar_url VARCHAR(1000) NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS lead_created BOOLEAN NOT NULL DEFAULT FALSE
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS crm_customer_id INTEGER NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS lead_full_name VARCHAR(255) NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS lead_phone_number VARCHAR(64) NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS lead_business_field VARCHAR(255) NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS lead_scheduled_time VARCHAR(255) NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS last_lead_created_at TIMESTAMP NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS unread_count INTEGER NOT NULL DEFAULT 0
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS follow_up_enabled BOOLEAN NOT NULL DEFAULT FALSE
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS follow_up_mode VARCHAR(32) NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS follow_up_delay_minutes INTEGER NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS follow_up_message TEXT NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS follow_up_due_at TIMESTAMP NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS follow_up_sent_at TIMESTAMP NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS default_follow_up_last_step INTEGER NOT NULL DEFAULT 0
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS default_follow_up_due_at TIMESTAMP NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_conversation
-            ADD COLUMN IF NOT EXISTS default_follow_up_last_sent_at TIMESTAMP NULL
-        """))
-        await session.execute(text("""
-            UPDATE cognilabsai_conversation
-            SET last_lead_created_at = updated_at
-            WHERE lead_created = TRUE
-              AND last_lead_created_at IS NULL
-        """))
-        await session.execute(text("""
-            CREATE TABLE IF NOT EXISTS cognilabsai_message (
-            id SERIAL PRIMARY KEY,
-            conversation_id INTEGER NOT NULL,
-            channel VARCHAR(32) NOT NULL,
-            sender_type VARCHAR(32) NOT NULL,
-            operator_user_id INTEGER NULL,
-            operator_name_snapshot VARCHAR(255) NULL,
-            client_external_id VARCHAR(255) NULL,
-            instagram_message_id VARCHAR(255) NULL,
-            telegram_message_id VARCHAR(255) NULL,
-            text TEXT NOT NULL,
-            media_type VARCHAR(64) NULL,
-            media_url VARCHAR(1000) NULL,
-            is_read BOOLEAN NOT NULL DEFAULT FALSE,
-            read_at TIMESTAMP NULL,
-            created_at TIMESTAMP DEFAULT NOW()
-            )
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_message
-            ADD COLUMN IF NOT EXISTS is_read BOOLEAN NOT NULL DEFAULT FALSE
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_message
-            ADD COLUMN IF NOT EXISTS read_at TIMESTAMP NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_message
-            ADD COLUMN IF NOT EXISTS media_type VARCHAR(64) NULL
-        """))
-        await session.execute(text("""
-            ALTER TABLE cognilabsai_message
-            ADD COLUMN IF NOT EXISTS media_url VARCHAR(1000) NULL
-        """))
-        await session.execute(text("""
-            UPDATE cognilabsai_message
-            SET is_read = TRUE, read_at = COALESCE(read_at, created_at)
-            WHERE sender_type IN ('ai', 'operator', 'system')
-              AND is_read = FALSE
-        """))
-        await session.execute(text("""
-            UPDATE cognilabsai_conversation c
-            SET unread_count = COALESCE(sub.unread_count, 0)
-            FROM (
-                SELECT conversation_id, COUNT(*)::INTEGER AS unread_count
-                FROM cognilabsai_message
-                WHERE sender_type = 'client' AND is_read = FALSE
-                GROUP BY conversation_id
-            ) AS sub
-            WHERE c.id = sub.conversation_id
-        """))
-        await session.execute(text("""
-            UPDATE cognilabsai_conversation
-            SET unread_count = 0
-            WHERE id NOT IN (
-                SELECT DISTINCT conversation_id
-                FROM cognilabsai_message
-                WHERE sender_type = 'client' AND is_read = FALSE
-            )
-        """))
-        await session.execute(text("""
-            CREATE TABLE IF NOT EXISTS cognilabsai_pause_event (
-            id SERIAL PRIMARY KEY,
-            conversation_id INTEGER NOT NULL,
-            action VARCHAR(32) NOT NULL,
-            reason VARCHAR(64) NULL,
-            operator_user_id INTEGER NULL,
-            operator_name VARCHAR(255) NULL,
-            pause_until TIMESTAMP NULL,
-            created_at TIMESTAMP DEFAULT NOW()
-            )
-        """))
-        await session.execute(text("""
-            CREATE TABLE IF NOT EXISTS cognilabsai_import_log (
-            id SERIAL PRIMARY KEY,
-            source_file VARCHAR(500) NOT NULL,
-            source_hash VARCHAR(128) NOT NULL UNIQUE,
-            conversation_id INTEGER NULL,
-            imported_at TIMESTAMP DEFAULT NOW()
-            )
-        """))
+        await apply_pending_cognilabsai_migrations(session)
         await ensure_permission_pages(session)
         await ensure_global_integration_row(session)
         await session.commit()
@@ -932,7 +713,7 @@ def build_env_integration_defaults() -> dict:
     return values
 
 
-async def get_integration_config(session: AsyncSession) -> dict:
+async def load_integration_config(session: AsyncSession) -> dict:
     await ensure_schema(session)
     result = await session.execute(
         select(cognilabsai_global_integration)
@@ -957,6 +738,21 @@ async def get_integration_config(session: AsyncSession) -> dict:
     return config
 
 
+async def get_integration_config(session: AsyncSession) -> dict:
+    cached = integration_config_cache.peek()
+    if cached is not None:
+        return cached
+    return await integration_config_cache.load(lambda: load_integration_config(session))
+
+
+pg_listener.subscribe(CONFIG_NOTIFY_CHANNEL, integration_config_cache.handle_notify)
+pg_listener.on_reconnect(integration_config_cache.invalidate)
+pg_listener.subscribe(FAQ_NOTIFY_CHANNEL, faq_answer_index.mark_dirty)
+pg_listener.on_reconnect(faq_answer_index.mark_dirty)
+if COGNILABSAI_REALTIME_BACKEND == "postgres":
+    pg_listener.subscribe(REALTIME_NOTIFY_CHANNEL, realtime_bus.handle_notify)
+
+
 def apply_global_ai_toggle_to_payload(current_config: dict, payload: dict) -> dict:
     if "ai_enabled_since" in payload:
         payload.pop("ai_enabled_since", None)
@@ -976,12 +772,21 @@ async def update_integration_config(session: AsyncSession, payload: dict) -> dic
     current_config = await get_integration_config(session)
     payload = apply_global_ai_toggle_to_payload(current_config, payload)
     payload["updated_at"] = utcnow()
-    await session.execute(
+    payload["config_version"] = cognilabsai_global_integration.c.config_version + 1
+    result = await session.execute(
         update(cognilabsai_global_integration)
         .where(cognilabsai_global_integration.c.id == 1)
         .values(**payload)
+        .returning(cognilabsai_global_integration.c.config_version)
+    )
+    config_version = result.scalar_one()
+    # delivered to the other processes only once the transaction commits
+    await session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CONFIG_NOTIFY_CHANNEL, "payload": str(config_version)},
     )
     await session.commit()
+    integration_config_cache.invalidate()
     await refresh_global_follow_up_schedules(session)
     await refresh_default_instagram_follow_up_schedules(session)
     await telegram_userbot_manager.restart()
@@ -1003,47 +808,173 @@ async def verify_websocket_api_key(session: AsyncSession, api_key: str) -> bool:
     return bool(expected and api_key == expected)
 
 
+def as_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+async def persist_telegram_peer_snapshots(snapshots: dict[str, dict]) -> None:
+    now = utcnow()
+    async with async_session_maker() as session:
+        for peer, snapshot in snapshots.items():
+            await session.execute(
+                update(cognilabsai_conversation)
+                .where(
+                    cognilabsai_conversation.c.channel == "telegram",
+                    cognilabsai_conversation.c.client_external_id == peer,
+                )
+                .values(
+                    telegram_is_online=snapshot.get("is_online"),
+                    telegram_presence_status=(snapshot.get("presence_status") or "")[:32] or None,
+                    telegram_last_seen_at=as_utc_naive(snapshot.get("last_seen_at")),
+                    telegram_snapshot_at=now,
+                )
+            )
+        await session.commit()
+
+
+async def apply_telegram_peer_snapshots(items: list[dict]) -> None:
+    telegram_items = [item for item in items if item.get("channel") == "telegram" and item.get("client_external_id")]
+    if not telegram_items:
+        return
+    peer_cache = telegram_userbot_manager.peer_snapshots
+    now = utcnow()
+    for item in telegram_items:
+        snapshot_at = item.get("telegram_snapshot_at")
+        if snapshot_at is None:
+            continue
+        last_seen_at = item.get("telegram_last_seen_at")
+        peer_cache.seed(
+            item["client_external_id"],
+            {
+                "is_online": item.get("telegram_is_online"),
+                "presence_status": item.get("telegram_presence_status"),
+                "last_seen_at": last_seen_at.replace(tzinfo=timezone.utc) if last_seen_at else None,
+            },
+            age_seconds=(now - snapshot_at).total_seconds(),
+        )
+    snapshots = await peer_cache.get_many(item["client_external_id"] for item in telegram_items)
+    for item in telegram_items:
+        snapshot = snapshots.get(item["client_external_id"])
+        item.pop("telegram_snapshot_at", None)
+        if snapshot is None:
+            continue
+        item["telegram_is_online"] = snapshot.get("is_online")
+        item["telegram_presence_status"] = snapshot.get("presence_status")
+        item["telegram_last_seen_at"] = snapshot.get("last_seen_at")
+
+
+telegram_userbot_manager.peer_snapshots.set_persister(persist_telegram_peer_snapshots)
+
+
+def encode_cursor(values: dict) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def encode_inbox_cursor(conversation: dict) -> str:
+    last_message_at = conversation.get("last_message_at")
+    return encode_cursor({"t": last_message_at.isoformat() if last_message_at else None, "i": conversation["id"]})
+
+
+def decode_inbox_cursor(cursor: str) -> tuple[Optional[datetime], int]:
+    """ValueError for anything that is not a cursor issued by list_conversations"""
+    values = decode_cursor(cursor)
+    try:
+        last_message_at = datetime.fromisoformat(values["t"]) if values["t"] else None
+        return last_message_at, int(values["i"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+async def fetch_inbox_page(
+    session: AsyncSession,
+    filters: list,
+    limit: int,
+    after: Optional[tuple[Optional[datetime], int]] = None,
+) -> list[dict]:
+    """
+    Inbox rows after `after` in (last_message_at DESC NULLS LAST, id DESC) order. Conversations
+    with messages and the ones without are read separately so both are plain index range scans.
+    """
+    after_at, after_id = after if after else (None, None)
+    rows: list[dict] = []
+    if after is None or after_at is not None:
+        query = select(cognilabsai_conversation).where(*filters, cognilabsai_conversation.c.last_message_at.is_not(None))
+        if after_at is not None:
+            query = query.where(
+                tuple_(cognilabsai_conversation.c.last_message_at, cognilabsai_conversation.c.id) < tuple_(after_at, after_id)
+            )
+        result = await session.execute(
+            query.order_by(
+                cognilabsai_conversation.c.last_message_at.desc().nulls_last(),
+                cognilabsai_conversation.c.id.desc(),
+            ).limit(limit)
+        )
+        rows = [dict(row) for row in result.mappings().all()]
+    if len(rows) < limit:
+        query = select(cognilabsai_conversation).where(*filters, cognilabsai_conversation.c.last_message_at.is_(None))
+        if after is not None and after_at is None:
+            query = query.where(cognilabsai_conversation.c.id < after_id)
+        result = await session.execute(query.order_by(cognilabsai_conversation.c.id.desc()).limit(limit - len(rows)))
+        rows += [dict(row) for row in result.mappings().all()]
+    return rows
+
+
 async def list_conversations(
     session: AsyncSession,
     channel: Optional[str] = None,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> dict:
+    after = decode_inbox_cursor(cursor) if cursor else None
     await ensure_schema(session)
     await refresh_expired_pauses(session)
     filters = []
     if channel:
         filters.append(cognilabsai_conversation.c.channel == channel)
 
-    total_query = select(func.count()).select_from(cognilabsai_conversation)
-    if filters:
-        total_query = total_query.where(*filters)
-    total = int((await session.execute(total_query)).scalar() or 0)
-
-    query = select(cognilabsai_conversation).order_by(
-        cognilabsai_conversation.c.last_message_at.desc().nullslast(),
-        cognilabsai_conversation.c.updated_at.desc(),
-    ).limit(limit).offset(offset)
-    if filters:
-        query = query.where(*filters)
-    result = await session.execute(query)
-    items = [decorate_conversation_payload(dict(row)) for row in result.mappings().all()]
+    total = None
+    if after is None:
+        # only the first page (and legacy offset paging) pays for counting every conversation
+        total_query = select(func.count()).select_from(cognilabsai_conversation)
+        if filters:
+            total_query = total_query.where(*filters)
+        total = int((await session.execute(total_query)).scalar() or 0)
+
+    if after is None and offset:
+        query = select(cognilabsai_conversation).order_by(
+            cognilabsai_conversation.c.last_message_at.desc().nulls_last(),
+            cognilabsai_conversation.c.id.desc(),
+        ).limit(limit + 1).offset(offset)
+        if filters:
+            query = query.where(*filters)
+        result = await session.execute(query)
+        rows = [dict(row) for row in result.mappings().all()]
+    else:
+        rows = await fetch_inbox_page(session, filters, limit + 1, after)
+    next_cursor = encode_inbox_cursor(rows[limit - 1]) if len(rows) > limit else None
+    items = [decorate_conversation_payload(row) for row in rows[:limit]]
     await session.rollback()
-    for item in items:
-        if item.get("channel") != "telegram":
-            continue
-        try:
-            snapshot = await telegram_userbot_manager.resolve_peer_snapshot(item["client_external_id"])
-            item["telegram_is_online"] = snapshot.get("is_online")
-            item["telegram_presence_status"] = snapshot.get("presence_status")
-            item["telegram_last_seen_at"] = snapshot.get("last_seen_at")
-        except Exception:
-            pass
+    await apply_telegram_peer_snapshots(items)
     return {
         "items": items,
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
     }
 
 
@@ -1057,14 +988,7 @@ async def get_conversation(session: AsyncSession, conversation_id: int) -> Optio
         return None
     conversation = decorate_conversation_payload(dict(row))
     await session.rollback()
-    if conversation.get("channel") == "telegram":
-        try:
-            snapshot = await telegram_userbot_manager.resolve_peer_snapshot(conversation["client_external_id"])
-            conversation["telegram_is_online"] = snapshot.get("is_online")
-            conversation["telegram_presence_status"] = snapshot.get("presence_status")
-            conversation["telegram_last_seen_at"] = snapshot.get("last_seen_at")
-        except Exception:
-            pass
+    await apply_telegram_peer_snapshots([conversation])
     return conversation
 
 
@@ -1080,6 +1004,111 @@ async def get_messages(session: AsyncSession, conversation_id: int, limit: int =
     return [dict(row) for row in result.mappings().all()]
 
 
+async def search_messages(
+    session: AsyncSession,
+    query_text: str,
+    *,
+    channel: Optional[str] = None,
+    conversation_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> dict:
+    """
+    Messages matching a websearch-style query ("exact phrase", or, -exclude), best match first.
+    Pages continue from a (rank, id) cursor; snippets are computed only for the returned page.
+    """
+    after = None
+    if cursor:
+        values = decode_cursor(cursor)
+        try:
+            after = (float(values["r"]), int(values["i"]))
+        except (ValueError, KeyError, TypeError) as exc:
+            raise ValueError("Invalid cursor") from exc
+    await ensure_schema(session)
+    ts_query = func.websearch_to_tsquery("simple", query_text)
+    matches = select(
+        cognilabsai_message.c.id,
+        func.ts_rank_cd(cognilabsai_message_search_vector, ts_query).label("rank"),
+    ).where(cognilabsai_message_search_vector.op("@@")(ts_query))
+    if channel:
+        matches = matches.where(cognilabsai_message.c.channel == channel)
+    if conversation_id is not None:
+        matches = matches.where(cognilabsai_message.c.conversation_id == conversation_id)
+    if date_from is not None:
+        matches = matches.where(cognilabsai_message.c.created_at >= normalize_datetime(date_from))
+    if date_to is not None:
+        matches = matches.where(cognilabsai_message.c.created_at < normalize_datetime(date_to))
+    ranked = matches.cte("ranked_messages")
+    page = select(ranked.c.id, ranked.c.rank)
+    if after is not None:
+        page = page.where(tuple_(ranked.c.rank, ranked.c.id) < tuple_(*after))
+    page = page.order_by(ranked.c.rank.desc(), ranked.c.id.desc()).limit(limit + 1).subquery("page")
+    headline_options = (
+        f"StartSel={SEARCH_HIGHLIGHT_START}, StopSel={SEARCH_HIGHLIGHT_STOP}, "
+        'MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=" … "'
+    )
+    result = await session.execute(
+        select(
+            page.c.rank,
+            cognilabsai_message.c.id,
+            cognilabsai_message.c.conversation_id,
+            cognilabsai_message.c.channel,
+            cognilabsai_message.c.sender_type,
+            cognilabsai_message.c.operator_name_snapshot,
+            cognilabsai_message.c.created_at,
+            func.ts_headline("simple", cognilabsai_message.c.text, ts_query, headline_options).label("snippet"),
+            cognilabsai_conversation.c.client_external_id,
+            cognilabsai_conversation.c.client_username,
+            cognilabsai_conversation.c.client_full_name,
+        )
+        .select_from(
+            page.join(cognilabsai_message, cognilabsai_message.c.id == page.c.id).outerjoin(
+                cognilabsai_conversation, cognilabsai_conversation.c.id == cognilabsai_message.c.conversation_id
+            )
+        )
+        .order_by(page.c.rank.desc(), page.c.id.desc())
+    )
+    rows = [dict(row) for row in result.mappings().all()]
+    await session.rollback()
+    next_cursor = encode_cursor({"r": rows[limit - 1]["rank"], "i": rows[limit - 1]["id"]}) if len(rows) > limit else None
+    items = [
+        {
+            "message_id": row["id"],
+            "conversation_id": row["conversation_id"],
+            "channel": row["channel"],
+            "sender_type": row["sender_type"],
+            "operator_name_snapshot": row["operator_name_snapshot"],
+            "client_display_name": build_client_display_name(row),
+            # message text is escaped; only the match markers become markup
+            "snippet": html.escape(row["snippet"] or "")
+            .replace(SEARCH_HIGHLIGHT_START, "<mark>")
+            .replace(SEARCH_HIGHLIGHT_STOP, "</mark>"),
+            "rank": row["rank"],
+            "created_at": row["created_at"],
+        }
+        for row in rows[:limit]
+    ]
+    return {"query": query_text, "items": items, "next_cursor": next_cursor}
+
+
+async def get_recent_messages(
+    session: AsyncSession,
+    conversation_id: int,
+    limit: int,
+    after_message_id: Optional[int] = None,
+) -> list[dict]:
+    # newest `limit` messages, returned oldest first
+    query = select(cognilabsai_message).where(cognilabsai_message.c.conversation_id == conversation_id)
+    if after_message_id is not None:
+        query = query.where(cognilabsai_message.c.id > after_message_id)
+    result = await session.execute(query.order_by(cognilabsai_message.c.id.desc()).limit(limit))
+    rows = [dict(row) for row in result.mappings().all()]
+    rows.reverse()
+    return rows
+
+
 async def get_latest_client_message_text(session: AsyncSession, conversation_id: int) -> Optional[str]:
     result = await session.execute(
         select(cognilabsai_message.c.text)
@@ -1169,13 +1198,20 @@ async def should_disable_follow_up_from_client_reply(
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
+    await release_session_connection(session, commit=True)
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(f"{base_url}/chat/completions", headers=headers, json=payload)
-            if response.status_code >= 400:
-                print(f"Follow-up classifier error {response.status_code}: {response.text}", flush=True)
-                return should_disable_follow_up_from_client_reply_fallback(conversation, normalized)
-            data = response.json()
+        response = await post_llm(
+            "cognilabsai.follow_up_classifier",
+            model,
+            f"{base_url}/chat/completions",
+            headers=headers,
+            payload=payload,
+            timeout=30,
+        )
+        if response.status_code >= 400:
+            print(f"Follow-up classifier error {response.status_code}: {response.text}", flush=True)
+            return should_disable_follow_up_from_client_reply_fallback(conversation, normalized)
+        data = response.json()
     except Exception as exc:
         print(f"Follow-up classifier request error: {exc}", flush=True)
         return should_disable_follow_up_from_client_reply_fallback(conversation, normalized)
@@ -1198,6 +1234,14 @@ async def get_conversation_record(session: AsyncSession, conversation_id: int) -
     return dict(row) if row else None
 
 
+async def get_rescheduled_conversation(session: AsyncSession, conversation_id: int) -> Optional[dict]:
+    """Reads the conversation back after its follow-up schedule was committed and hands the new deadline to the scheduler"""
+    conversation = await get_conversation(session, conversation_id)
+    if conversation:
+        follow_up_scheduler.schedule(conversation_id, conversation.get("next_follow_up_at"))
+    return conversation
+
+
 async def recalculate_follow_up_schedule(session: AsyncSession, conversation_id: int, base_time: Optional[datetime] = None) -> Optional[dict]:
     conversation = await get_conversation_record(session, conversation_id)
     if not conversation:
@@ -1235,7 +1279,7 @@ async def recalculate_follow_up_schedule(session: AsyncSession, conversation_id:
         .values(**values)
     )
     await session.commit()
-    return await get_conversation(session, conversation_id)
+    return await get_rescheduled_conversation(session, conversation_id)
 
 
 async def recalculate_default_instagram_follow_up_schedule(
@@ -1294,13 +1338,24 @@ async def recalculate_default_instagram_follow_up_schedule(
         .values(**values)
     )
     await session.commit()
-    return await get_conversation(session, conversation_id)
+    return await get_rescheduled_conversation(session, conversation_id)
 
 
 async def refresh_global_follow_up_schedules(session: AsyncSession) -> None:
     if not FOLLOW_UPS_ENABLED:
         await session.execute(
-            update(cognilabsai_conversation).values(
+            update(cognilabsai_conversation)
+            .where(
+                or_(
+                    cognilabsai_conversation.c.follow_up_enabled == True,
+                    cognilabsai_conversation.c.follow_up_mode.is_not(None),
+                    cognilabsai_conversation.c.follow_up_delay_minutes.is_not(None),
+                    cognilabsai_conversation.c.follow_up_message.is_not(None),
+                    cognilabsai_conversation.c.follow_up_due_at.is_not(None),
+                    cognilabsai_conversation.c.follow_up_sent_at.is_not(None),
+                )
+            )
+            .values(
                 follow_up_enabled=False,
                 follow_up_mode=None,
                 follow_up_delay_minutes=None,
@@ -1326,7 +1381,15 @@ async def refresh_global_follow_up_schedules(session: AsyncSession) -> None:
 async def refresh_default_instagram_follow_up_schedules(session: AsyncSession) -> None:
     if not FOLLOW_UPS_ENABLED:
         await session.execute(
-            update(cognilabsai_conversation).values(
+            update(cognilabsai_conversation)
+            .where(
+                or_(
+                    cognilabsai_conversation.c.default_follow_up_last_step != 0,
+                    cognilabsai_conversation.c.default_follow_up_due_at.is_not(None),
+                    cognilabsai_conversation.c.default_follow_up_last_sent_at.is_not(None),
+                )
+            )
+            .values(
                 default_follow_up_last_step=0,
                 default_follow_up_due_at=None,
                 default_follow_up_last_sent_at=None,
@@ -1440,6 +1503,10 @@ async def delete_conversation(session: AsyncSession, conversation_id: int) -> bo
         delete(cognilabsai_message)
         .where(cognilabsai_message.c.conversation_id == conversation_id)
     )
+    await session.execute(
+        delete(cognilabsai_conversation_summary)
+        .where(cognilabsai_conversation_summary.c.conversation_id == conversation_id)
+    )
     await session.execute(
         delete(cognilabsai_conversation)
         .where(cognilabsai_conversation.c.id == conversation_id)
@@ -1658,6 +1725,7 @@ def build_virtual_website_conversation(session_id: str) -> dict:
             "last_operator_user_id": None,
             "last_operator_name": None,
             "is_imported": False,
+            "last_event_seq": 0,
             "created_at": None,
             "updated_at": None,
         }
@@ -1683,6 +1751,57 @@ async def init_website_session(session: AsyncSession, session_id: Optional[str])
     }
 
 
+async def get_website_conversation_id(session: AsyncSession, session_id: str) -> int:
+    """Conversation id of a widget session without loading its history; 0 before the first message"""
+    await ensure_schema(session)
+    result = await session.execute(
+        select(cognilabsai_conversation.c.id).where(
+            cognilabsai_conversation.c.channel == "website_ai",
+            cognilabsai_conversation.c.client_external_id == session_id.strip(),
+        )
+    )
+    return result.scalar() or 0
+
+
+async def load_website_resume_backlog(
+    session: AsyncSession,
+    conversation_id: int,
+    last_seq: int,
+) -> Optional[list[tuple[int, str]]]:
+    """
+    Missed message events as (event_seq, serialized event) for a widget resuming after `last_seq`.
+    Empty when the in-memory replay buffer covers the gap, None when too much was missed.
+    """
+    if manager.replay_buffer.covers(conversation_id, last_seq):
+        return []
+    result = await session.execute(
+        select(cognilabsai_message)
+        .where(
+            cognilabsai_message.c.conversation_id == conversation_id,
+            cognilabsai_message.c.event_seq > last_seq,
+        )
+        .order_by(cognilabsai_message.c.event_seq.asc())
+        .limit(WEBSITE_RESUME_MESSAGE_LIMIT + 1)
+    )
+    messages = [dict(row) for row in result.mappings().all()]
+    if len(messages) > WEBSITE_RESUME_MESSAGE_LIMIT:
+        return None
+    return [
+        (
+            message["event_seq"],
+            encode_event(
+                {
+                    "type": "message.created",
+                    "conversation_id": conversation_id,
+                    "event_seq": message["event_seq"],
+                    "message": message,
+                }
+            ),
+        )
+        for message in messages
+    ]
+
+
 async def send_website_message(session: AsyncSession, session_id: str, text_value: str) -> dict:
     normalized_session_id = (session_id or "").strip() or generate_website_session_id()
     conversation = await upsert_conversation(
@@ -1699,7 +1818,7 @@ async def send_website_message(session: AsyncSession, session_id: str, text_valu
         client_external_id=normalized_session_id,
     )
     try:
-        await maybe_send_ai_reply(session, conversation["id"])
+        await request_ai_reply(conversation["id"])
     except Exception as exc:
         print(f"Website AI reply error for conversation {conversation['id']}: {exc}", flush=True)
     return await init_website_session(session, normalized_session_id)
@@ -1720,27 +1839,48 @@ async def create_message(
     instagram_message_id: Optional[str] = None,
     telegram_message_id: Optional[str] = None,
     created_at: Optional[datetime] = None,
+    stream_id: Optional[str] = None,
+    outbox_key: Optional[str] = None,
 ) -> dict:
     ts = normalize_datetime(created_at) or utcnow()
     is_client_message = sender_type == "client"
-    conversation_before = await get_conversation_record(session, conversation_id)
     disable_follow_ups = False
-    if is_client_message:
+    if is_client_message and FOLLOW_UPS_ENABLED:
+        conversation_before = await get_conversation_record(session, conversation_id)
         disable_follow_ups = await should_disable_follow_up_from_client_reply(session, conversation_before, text_value)
-    previous_ai_text = None
-    if channel == "instagram" and sender_type == "client":
-        previous_result = await session.execute(
-            select(cognilabsai_message.c.text)
-            .where(
-                cognilabsai_message.c.conversation_id == conversation_id,
-                cognilabsai_message.c.sender_type == "ai",
-            )
-            .order_by(cognilabsai_message.c.created_at.desc(), cognilabsai_message.c.id.desc())
-            .limit(1)
-        )
-        previous_ai_text = previous_result.scalar_one_or_none()
-    result = await session.execute(
-        insert(cognilabsai_message).values(
+    is_instagram_client_message = channel == "instagram" and is_client_message
+    inferred_name = extract_client_name_from_text(text_value) if is_instagram_client_message else None
+
+    conversation_updates = {
+        # imported or late-delivered older messages must not move the conversation back in the inbox
+        "last_message_at": func.greatest(cognilabsai_conversation.c.last_message_at, ts),
+        "last_message_preview": case(
+            (
+                or_(cognilabsai_conversation.c.last_message_at.is_(None), cognilabsai_conversation.c.last_message_at <= ts),
+                text_value[:1000],
+            ),
+            else_=cognilabsai_conversation.c.last_message_preview,
+        ),
+        "unread_count": (cognilabsai_conversation.c.unread_count + 1) if is_client_message else cognilabsai_conversation.c.unread_count,
+        "updated_at": utcnow(),
+    }
+    # with follow-ups switched off the schedule reset that used to run after every message is folded in here
+    if disable_follow_ups or (not FOLLOW_UPS_ENABLED and sender_type != "system"):
+        conversation_updates.update(FOLLOW_UP_RESET_VALUES)
+    if inferred_name:
+        conversation_updates["client_full_name"] = func.coalesce(cognilabsai_conversation.c.client_full_name, inferred_name)
+
+    # one round-trip: insert the message and update the conversation aggregates in the same statement
+    conversation_update = (
+        update(cognilabsai_conversation)
+        .where(cognilabsai_conversation.c.id == conversation_id)
+        .values(**conversation_updates, last_event_seq=cognilabsai_conversation.c.last_event_seq + 1)
+        .returning(*cognilabsai_conversation.c)
+        .cte("updated_conversation")
+    )
+    inserted_message = (
+        insert(cognilabsai_message)
+        .values(
             conversation_id=conversation_id,
             channel=channel,
             sender_type=sender_type,
@@ -1754,40 +1894,41 @@ async def create_message(
             media_url=media_url,
             is_read=not is_client_message,
             read_at=None if is_client_message else ts,
+            # the conversation row lock orders concurrent writers, so sequences never repeat
+            event_seq=select(conversation_update.c.last_event_seq).scalar_subquery(),
+            delivery_status="pending" if outbox_key else None,
             created_at=ts,
-        ).returning(cognilabsai_message.c.id)
+        )
+        .returning(*cognilabsai_message.c)
+        .cte("inserted_message")
     )
-    message_id = result.scalar_one()
-    conversation_updates = {
-        "last_message_at": ts,
-        "last_message_preview": text_value[:1000],
-        "unread_count": (cognilabsai_conversation.c.unread_count + 1) if is_client_message else cognilabsai_conversation.c.unread_count,
-        "updated_at": utcnow(),
-    }
-    if disable_follow_ups:
-        conversation_updates.update(
-            {
-                "follow_up_enabled": False,
-                "follow_up_mode": None,
-                "follow_up_delay_minutes": None,
-                "follow_up_message": None,
-                "follow_up_due_at": None,
-                "follow_up_sent_at": None,
-                "default_follow_up_last_step": 0,
-                "default_follow_up_due_at": None,
-                "default_follow_up_last_sent_at": None,
-            }
+    columns = [inserted_message.c[column.name].label(f"m_{column.name}") for column in cognilabsai_message.c]
+    columns += [conversation_update.c[column.name].label(f"c_{column.name}") for column in cognilabsai_conversation.c]
+    if is_instagram_client_message and not inferred_name:
+        # statements in one WITH share a snapshot, so this sees the last AI reply before the new message
+        columns.append(
+            select(cognilabsai_message.c.text)
+            .where(
+                cognilabsai_message.c.conversation_id == conversation_id,
+                cognilabsai_message.c.sender_type == "ai",
+            )
+            .order_by(cognilabsai_message.c.created_at.desc(), cognilabsai_message.c.id.desc())
+            .limit(1)
+            .scalar_subquery()
+            .label("previous_ai_text")
         )
-    await session.execute(
-        update(cognilabsai_conversation)
-        .where(cognilabsai_conversation.c.id == conversation_id)
-        .values(**conversation_updates)
+    result = await session.execute(
+        select(*columns).select_from(inserted_message.outerjoin(conversation_update, true()))
     )
-    if channel == "instagram" and sender_type == "client":
-        inferred_name = extract_client_name_from_text(text_value)
-        if not inferred_name and previous_ai_text and is_name_request_text(previous_ai_text):
-            inferred_name = extract_name_from_name_reply(text_value)
-        if inferred_name:
+    row = result.mappings().one()
+    message = {column.name: row[f"m_{column.name}"] for column in cognilabsai_message.c}
+    conversation_row = None
+    if row["c_id"] is not None:
+        conversation_row = {column.name: row[f"c_{column.name}"] for column in cognilabsai_conversation.c}
+    previous_ai_text = row.get("previous_ai_text")
+    if previous_ai_text and conversation_row and not conversation_row.get("client_full_name") and is_name_request_text(previous_ai_text):
+        reply_name = extract_name_from_name_reply(text_value)
+        if reply_name:
             await session.execute(
                 update(cognilabsai_conversation)
                 .where(
@@ -1795,32 +1936,30 @@ async def create_message(
                     cognilabsai_conversation.c.client_full_name.is_(None),
                 )
                 .values(
-                    client_full_name=inferred_name,
+                    client_full_name=reply_name,
                     updated_at=utcnow(),
                 )
             )
+            conversation_row["client_full_name"] = reply_name
+    if outbox_key:
+        # same transaction as the message: a reply is never stored without its delivery
+        await outbound_outbox.enqueue(session, message, outbox_key)
     await session.commit()
-    message = await get_message_by_id(session, message_id)
-    await manager.broadcast(
-        {
-            "type": "message.created",
-            "conversation_id": conversation_id,
-            "message": message,
-        },
-        conversation_id=conversation_id,
-    )
-    if sender_type != "system":
-        if disable_follow_ups:
-            updated_conversation = await get_conversation(session, conversation_id)
-            if updated_conversation:
-                await manager.broadcast(
-                    {
-                        "type": "conversation.updated",
-                        "conversation": updated_conversation,
-                    },
-                    conversation_id=conversation_id,
-                )
-            return message
+    if outbox_key:
+        outbound_outbox.wake(channel)
+    created_event = {
+        "type": "message.created",
+        "conversation_id": conversation_id,
+        "event_seq": message.get("event_seq"),
+        "message": message,
+    }
+    if stream_id:
+        # Lets clients swap the streamed draft for the persisted message
+        created_event["stream_id"] = stream_id
+    await manager.broadcast(created_event, conversation_id=conversation_id)
+    if sender_type == "system":
+        return message
+    if FOLLOW_UPS_ENABLED and not disable_follow_ups:
         default_updated_conversation = await recalculate_default_instagram_follow_up_schedule(session, conversation_id, base_time=ts)
         if default_updated_conversation:
             await manager.broadcast(
@@ -1839,6 +1978,17 @@ async def create_message(
                 },
                 conversation_id=conversation_id,
             )
+        return message
+    if conversation_row:
+        conversation_payload = decorate_conversation_payload(conversation_row)
+        await apply_telegram_peer_snapshots([conversation_payload])
+        await manager.broadcast(
+            {
+                "type": "conversation.updated",
+                "conversation": conversation_payload,
+            },
+            conversation_id=conversation_id,
+        )
     return message
 
 
@@ -1910,7 +2060,7 @@ async def send_instagram_message(access_token: str, recipient_id: str, text_valu
         "message": {"text": text_value},
         "metadata": "by_bot",
     }
-    async with httpx.AsyncClient(timeout=30) as client:
+    async with http_clients.use("meta_graph") as client:
         response = await client.post(url, headers=headers, json=payload)
         if response.status_code >= 400:
             error_code = None
@@ -1935,40 +2085,127 @@ async def send_instagram_message(access_token: str, recipient_id: str, text_valu
         return data.get("message_id")
 
 
-async def send_operator_message(session: AsyncSession, conversation_id: int, text_value: str, current_user) -> dict:
+class InstagramOutboundSender:
+    async def send(self, row: dict) -> Optional[str]:
+        config = integration_config_cache.peek()
+        if config is None:
+            async with async_session_maker() as session:
+                config = await get_integration_config(session)
+        access_token = config.get("instagram_access_token")
+        if not access_token:
+            raise OutboundSendError("Instagram access token is not configured")
+        try:
+            return await send_instagram_message(access_token, row["recipient_id"], row["text"])
+        except InstagramSendError as exc:
+            throttled = exc.status_code == 429 or exc.error_code in INSTAGRAM_THROTTLING_ERROR_CODES
+            retryable = not exc.is_permanent and (throttled or exc.status_code >= 500 or exc.status_code == 401)
+            raise OutboundSendError(str(exc), retryable=retryable, retry_after=60.0 if throttled else None) from exc
+
+
+class TelegramOutboundSender:
+    async def send(self, row: dict) -> Optional[str]:
+        try:
+            return await telegram_userbot_manager.send_message(row["recipient_id"], row["text"])
+        except Exception as exc:
+            # Telethon FloodWaitError / SlowModeWaitError carry the wait in seconds
+            seconds = getattr(exc, "seconds", None)
+            if seconds is not None:
+                raise OutboundSendError(f"Telegram flood wait {seconds}s", retry_after=float(seconds)) from exc
+            # RPC errors such as an invalid peer, a blocked account or privacy settings will not pass on retry
+            if getattr(exc, "code", None) in (400, 403):
+                raise OutboundSendError(str(exc), retryable=False) from exc
+            raise
+
+
+def register_outbound_senders() -> None:
+    if COGNILABSAI_OUTBOX_SENDER == "stub":
+        instagram_sender, telegram_sender = StubChannelSender("instagram"), StubChannelSender("telegram")
+    else:
+        instagram_sender, telegram_sender = InstagramOutboundSender(), TelegramOutboundSender()
+    outbound_outbox.register(
+        "instagram",
+        instagram_sender,
+        rate=COGNILABSAI_OUTBOX_INSTAGRAM_RATE,
+        burst=COGNILABSAI_OUTBOX_INSTAGRAM_BURST,
+        max_attempts=COGNILABSAI_OUTBOX_MAX_ATTEMPTS,
+    )
+    outbound_outbox.register(
+        "telegram",
+        telegram_sender,
+        rate=COGNILABSAI_OUTBOX_TELEGRAM_RATE,
+        burst=COGNILABSAI_OUTBOX_TELEGRAM_BURST,
+        max_attempts=COGNILABSAI_OUTBOX_MAX_ATTEMPTS,
+    )
+
+
+register_outbound_senders()
+
+
+async def queue_outbound_message(
+    session: AsyncSession,
+    conversation: dict,
+    *,
+    sender_type: str,
+    text_value: str,
+    idempotency_key: str,
+    operator_user_id: Optional[int] = None,
+    operator_name_snapshot: Optional[str] = None,
+    stream_id: Optional[str] = None,
+) -> dict:
+    """
+    Stores an Instagram/Telegram reply as pending delivery; the channel outbox worker sends it.
+    A repeated idempotency key returns the message stored the first time instead of a duplicate.
+    """
+    existing = await outbound_outbox.find_message(session, idempotency_key)
+    if existing is not None:
+        return existing
+    try:
+        return await create_message(
+            session,
+            conversation_id=conversation["id"],
+            channel=conversation["channel"],
+            sender_type=sender_type,
+            text_value=text_value,
+            operator_user_id=operator_user_id,
+            operator_name_snapshot=operator_name_snapshot,
+            client_external_id=conversation["client_external_id"],
+            stream_id=stream_id,
+            outbox_key=idempotency_key,
+        )
+    except IntegrityError:
+        # a concurrent request with the same key won
+        await session.rollback()
+        existing = await outbound_outbox.find_message(session, idempotency_key)
+        if existing is None:
+            raise
+        return existing
+
+
+async def send_operator_message(
+    session: AsyncSession,
+    conversation_id: int,
+    text_value: str,
+    current_user,
+    client_message_id: Optional[str] = None,
+) -> dict:
     conversation = await get_conversation(session, conversation_id)
     if not conversation:
         raise ValueError("Conversation not found")
     operator_name = " ".join(value for value in [getattr(current_user, "name", None), getattr(current_user, "surname", None)] if value) or getattr(current_user, "email", None)
-    if conversation["channel"] == "instagram":
-        config = await get_integration_config(session)
-        access_token = config.get("instagram_access_token")
-        if not access_token:
-            raise RuntimeError("Instagram access token is not configured")
-        instagram_message_id = await send_instagram_message(access_token, conversation["client_external_id"], text_value)
-        message = await create_message(
+    if conversation["channel"] in ("instagram", "telegram"):
+        if conversation["channel"] == "instagram":
+            config = await get_integration_config(session)
+            if not config.get("instagram_access_token"):
+                raise RuntimeError("Instagram access token is not configured")
+        message = await queue_outbound_message(
             session,
-            conversation_id=conversation_id,
-            channel="instagram",
+            conversation,
             sender_type="operator",
             text_value=text_value,
+            # a resubmitted send (double click, client retry) maps to the same key
+            idempotency_key=f"operator:{conversation_id}:{client_message_id or uuid4().hex}",
             operator_user_id=current_user.id,
             operator_name_snapshot=operator_name,
-            client_external_id=conversation["client_external_id"],
-            instagram_message_id=instagram_message_id,
-        )
-    elif conversation["channel"] == "telegram":
-        telegram_message_id = await telegram_userbot_manager.send_message(conversation["client_external_id"], text_value)
-        message = await create_message(
-            session,
-            conversation_id=conversation_id,
-            channel="telegram",
-            sender_type="operator",
-            text_value=text_value,
-            operator_user_id=current_user.id,
-            operator_name_snapshot=operator_name,
-            client_external_id=conversation["client_external_id"],
-            telegram_message_id=telegram_message_id,
         )
     elif conversation["channel"] == "website_ai":
         message = await create_message(
@@ -2311,7 +2548,335 @@ async def save_lead_state(
         )
 
 
-async def generate_ai_reply(session: AsyncSession, conversation_id: int) -> Optional[str]:
+def build_ai_history_message(item: dict) -> dict:
+    role = "assistant" if item["sender_type"] in ("ai", "operator") else "user"
+    return {"role": role, "content": item["text"]}
+
+
+def build_summary_transcript_line(item: dict) -> str:
+    sender_type = item.get("sender_type")
+    if sender_type == "client":
+        role = "Client"
+    elif sender_type == "ai":
+        role = "AI"
+    elif sender_type == "system":
+        role = "Follow-up"
+    else:
+        role = "Operator"
+    return f"{role}: {(item.get('text') or '').strip()}"
+
+
+async def get_conversation_summary(session: AsyncSession, conversation_id: int) -> Optional[dict]:
+    result = await session.execute(
+        select(cognilabsai_conversation_summary)
+        .where(cognilabsai_conversation_summary.c.conversation_id == conversation_id)
+    )
+    row = result.mappings().first()
+    return dict(row) if row else None
+
+
+async def refresh_conversation_summary(session: AsyncSession, conversation_id: int) -> bool:
+    """
+    Fold the oldest unsummarized messages into the stored summary once enough of them have
+    piled up, keeping the newest AI_SUMMARY_KEEP_RECENT verbatim for the next prompt.
+    """
+    config = await get_integration_config(session)
+    api_key = (config.get("openai_api_key") or "").strip()
+    if not api_key:
+        return False
+    summary_row = await get_conversation_summary(session, conversation_id)
+    cursor = summary_row["last_message_id"] if summary_row else None
+    count_query = select(func.count()).select_from(cognilabsai_message).where(
+        cognilabsai_message.c.conversation_id == conversation_id
+    )
+    if cursor is not None:
+        count_query = count_query.where(cognilabsai_message.c.id > cursor)
+    unsummarized = int((await session.execute(count_query)).scalar() or 0)
+    if unsummarized < AI_SUMMARY_TRIGGER_MESSAGES:
+        await session.rollback()
+        return False
+
+    batch_query = select(cognilabsai_message).where(cognilabsai_message.c.conversation_id == conversation_id)
+    if cursor is not None:
+        batch_query = batch_query.where(cognilabsai_message.c.id > cursor)
+    batch_size = min(unsummarized - AI_SUMMARY_KEEP_RECENT, AI_SUMMARY_MAX_BATCH)
+    result = await session.execute(batch_query.order_by(cognilabsai_message.c.id.asc()).limit(batch_size))
+    batch = [dict(row) for row in result.mappings().all()]
+    # release the connection while the model works
+    await session.rollback()
+    if not batch:
+        return False
+
+    previous_summary = (summary_row or {}).get("summary") or "(none yet)"
+    transcript = "\n".join(build_summary_transcript_line(item) for item in batch)
+    base_url = (config.get("openai_base_url") or DEFAULT_OPENAI_BASE_URL).rstrip("/")
+    model = config.get("openai_model") or DEFAULT_OPENAI_MODEL
+    payload = apply_reasoning_defaults({
+        "model": model,
+        "messages": [
+            {"role": "system", "content": COGNILABSAI_SUMMARY_PROMPT},
+            {"role": "user", "content": f"Existing summary:\n{previous_summary}\n\nNew messages:\n{transcript}"},
+        ],
+        "max_completion_tokens": 600,
+    }, model)
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    try:
+        response = await post_llm(
+            "cognilabsai.summary",
+            model,
+            f"{base_url}/chat/completions",
+            headers=headers,
+            payload=payload,
+            timeout=60,
+        )
+    except CircuitOpenError:
+        # summary can wait for the next reply
+        return False
+    if response.status_code >= 400:
+        print(f"[cognilabsai-summary] OpenAI error {response.status_code}: {response.text[:300]}", flush=True)
+        return False
+    data = response.json()
+    choices = data.get("choices") or []
+    summary_text = extract_chat_message_text((choices[0].get("message") or {}) if choices else {})
+    if not summary_text:
+        return False
+
+    last_message_id = batch[-1]["id"]
+    summarized_count = int((summary_row or {}).get("summarized_count") or 0) + len(batch)
+    statement = pg_insert(cognilabsai_conversation_summary).values(
+        conversation_id=conversation_id,
+        summary=summary_text,
+        last_message_id=last_message_id,
+        summarized_count=summarized_count,
+        updated_at=utcnow(),
+    )
+    if cursor is None:
+        statement = statement.on_conflict_do_nothing(index_elements=["conversation_id"])
+    else:
+        # only advance from the cursor this summary was built on
+        statement = statement.on_conflict_do_update(
+            index_elements=["conversation_id"],
+            set_={
+                "summary": statement.excluded.summary,
+                "last_message_id": statement.excluded.last_message_id,
+                "summarized_count": statement.excluded.summarized_count,
+                "updated_at": statement.excluded.updated_at,
+            },
+            where=cognilabsai_conversation_summary.c.last_message_id == cursor,
+        )
+    await session.execute(statement)
+    await session.commit()
+    print(
+        f"[cognilabsai-summary] conversation {conversation_id} folded {len(batch)} messages "
+        f"(up to #{last_message_id}, {summarized_count} total)",
+        flush=True,
+    )
+    return True
+
+
+conversation_summary_tasks: dict[int, asyncio.Task] = {}
+
+
+async def run_conversation_summary(conversation_id: int) -> None:
+    try:
+        with pool_hold_monitor.label("cognilabsai.summary"):
+            async with async_session_maker() as session:
+                await refresh_conversation_summary(session, conversation_id)
+    except Exception as exc:
+        print(f"[cognilabsai-summary] conversation {conversation_id} error: {exc}", flush=True)
+    finally:
+        conversation_summary_tasks.pop(conversation_id, None)
+
+
+def schedule_conversation_summary(conversation_id: int) -> None:
+    if conversation_id in conversation_summary_tasks:
+        return
+    conversation_summary_tasks[conversation_id] = asyncio.create_task(run_conversation_summary(conversation_id))
+
+
+AI_UNAVAILABLE_REPLY = "😓 Uzr, operator hozir aloqada emas edi. Iltimos, keyinroq urinib ko'ring."
+FAQ_CACHE_CHANNELS = ("website_ai", "instagram")
+# never offered as FAQ candidates: fallbacks and the register_customer follow-up questions
+FAQ_UNCACHEABLE_PREFIXES = ("😓",)
+
+
+async def get_standalone_client_question(session: AsyncSession, conversation: dict) -> Optional[str]:
+    """
+    The latest client message, when it is a question that can be answered without the rest of
+    the thread: it is the only unanswered client message and it is not a greeting or a one-word
+    reply.
+    """
+    if conversation.get("channel") not in FAQ_CACHE_CHANNELS or conversation.get("lead_created"):
+        return None
+    latest = await get_recent_messages(session, conversation["id"], limit=2)
+    if not latest or latest[-1]["sender_type"] != "client" or latest[-1].get("media_type"):
+        return None
+    if len(latest) == 2 and latest[0]["sender_type"] == "client":
+        return None
+    question = (latest[-1].get("text") or "").strip()
+    return question if is_cacheable_question(normalize_question(question)) else None
+
+
+async def notify_faq_answers_changed(session: AsyncSession) -> None:
+    await session.execute(text("SELECT pg_notify(:channel, '')"), {"channel": FAQ_NOTIFY_CHANNEL})
+
+
+async def lookup_faq_answer(session: AsyncSession, question: str, config: dict) -> Optional[dict]:
+    version = config.get("config_version")
+    if faq_answer_index.needs_rebuild(version):
+        result = await session.execute(
+            select(cognilabsai_faq_answer).where(
+                cognilabsai_faq_answer.c.status == "approved",
+                cognilabsai_faq_answer.c.config_version == version,
+            )
+        )
+        faq_answer_index.rebuild([dict(row) for row in result.mappings().all()], version)
+    match = faq_answer_index.lookup(question)
+    faq_answer_index.record_lookup(match[2] if match else None)
+    if match is None:
+        return None
+    entry, score, kind = match
+    await session.execute(
+        update(cognilabsai_faq_answer)
+        .where(cognilabsai_faq_answer.c.id == entry["id"])
+        .values(hit_count=cognilabsai_faq_answer.c.hit_count + 1, last_hit_at=utcnow())
+    )
+    print(f"[cognilabsai-faq] {kind} hit #{entry['id']} score={score:.2f}", flush=True)
+    return entry
+
+
+async def record_faq_candidate(
+    session: AsyncSession,
+    config: dict,
+    conversation_id: int,
+    question: str,
+    answer: str,
+) -> None:
+    if not answer or answer.startswith(FAQ_UNCACHEABLE_PREFIXES) or config.get("config_version") is None:
+        return
+    normalized = normalize_question(question)
+    await session.execute(
+        pg_insert(cognilabsai_faq_answer)
+        .values(
+            config_version=config["config_version"],
+            question_key=question_key(normalized),
+            question_text=question[:1000],
+            answer_text=answer,
+            status="pending",
+            source_conversation_id=conversation_id,
+            hit_count=0,
+            created_at=utcnow(),
+            updated_at=utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=["config_version", "question_key"])
+    )
+    await session.commit()
+
+
+async def list_faq_answers(
+    session: AsyncSession,
+    status: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> dict:
+    await ensure_schema(session)
+    config = await get_integration_config(session)
+    filters = []
+    if status:
+        filters.append(cognilabsai_faq_answer.c.status == status)
+    total_query = select(func.count()).select_from(cognilabsai_faq_answer)
+    query = select(cognilabsai_faq_answer).order_by(
+        cognilabsai_faq_answer.c.hit_count.desc(),
+        cognilabsai_faq_answer.c.id.desc(),
+    ).limit(limit).offset(offset)
+    if filters:
+        total_query = total_query.where(*filters)
+        query = query.where(*filters)
+    total = int((await session.execute(total_query)).scalar() or 0)
+    items = []
+    for row in (await session.execute(query)).mappings().all():
+        item = dict(row)
+        item["is_current"] = item["config_version"] == config.get("config_version")
+        items.append(item)
+    await session.rollback()
+    return {
+        "items": items,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "stats": faq_answer_index.snapshot(),
+    }
+
+
+async def approve_faq_answer(
+    session: AsyncSession,
+    faq_answer_id: int,
+    current_user,
+    answer_text: Optional[str] = None,
+) -> Optional[dict]:
+    """Approve an entry (optionally with an edited answer) for the current config version."""
+    config = await get_integration_config(session)
+    version = config.get("config_version")
+    result = await session.execute(select(cognilabsai_faq_answer).where(cognilabsai_faq_answer.c.id == faq_answer_id))
+    row = result.mappings().first()
+    if not row:
+        return None
+    # re-approving an answer from an older config version replaces any entry for the same question
+    await session.execute(
+        delete(cognilabsai_faq_answer).where(
+            cognilabsai_faq_answer.c.config_version == version,
+            cognilabsai_faq_answer.c.question_key == row["question_key"],
+            cognilabsai_faq_answer.c.id != faq_answer_id,
+        )
+    )
+    operator_name = " ".join(value for value in [getattr(current_user, "name", None), getattr(current_user, "surname", None)] if value) or getattr(current_user, "email", None)
+    values = {
+        "status": "approved",
+        "config_version": version,
+        "approved_by_user_id": current_user.id,
+        "approved_by_name": operator_name,
+        "approved_at": utcnow(),
+        "updated_at": utcnow(),
+    }
+    if answer_text and answer_text.strip():
+        values["answer_text"] = answer_text.strip()
+    result = await session.execute(
+        update(cognilabsai_faq_answer)
+        .where(cognilabsai_faq_answer.c.id == faq_answer_id)
+        .values(**values)
+        .returning(*cognilabsai_faq_answer.c)
+    )
+    approved = dict(result.mappings().one())
+    await notify_faq_answers_changed(session)
+    await session.commit()
+    faq_answer_index.mark_dirty()
+    approved["is_current"] = True
+    return approved
+
+
+async def evict_faq_answer(session: AsyncSession, faq_answer_id: int) -> bool:
+    result = await session.execute(
+        delete(cognilabsai_faq_answer)
+        .where(cognilabsai_faq_answer.c.id == faq_answer_id)
+        .returning(cognilabsai_faq_answer.c.id)
+    )
+    deleted = result.scalar() is not None
+    if deleted:
+        await notify_faq_answers_changed(session)
+    await session.commit()
+    faq_answer_index.mark_dirty()
+    return deleted
+
+
+async def generate_ai_reply(
+    session: AsyncSession,
+    conversation_id: int,
+    on_delta: Optional[DeltaCallback] = None,
+    should_abort: Optional[Callable[[], bool]] = None,
+) -> Optional[str]:
     try:
         conversation = await get_conversation(session, conversation_id)
         config = await get_integration_config(session)
@@ -2323,11 +2888,25 @@ async def generate_ai_reply(session: AsyncSession, conversation_id: int) -> Opti
         prompt = config.get("system_prompt") or "You are Cognilabs company's AI sales bot"
         lead_created = bool(conversation and conversation.get("lead_created"))
 
-        history = await get_messages(session, conversation_id, limit=30, offset=0)
+        summary_row = await get_conversation_summary(session, conversation_id)
+        history = await get_recent_messages(
+            session,
+            conversation_id,
+            limit=AI_RECENT_MESSAGE_LIMIT,
+            after_message_id=summary_row["last_message_id"] if summary_row else None,
+        )
         messages = [
             {"role": "system", "content": prompt},
             {"role": "system", "content": COGNILABSAI_BEHAVIOR_PROMPT},
         ]
+        if summary_row:
+            messages.append({
+                "role": "system",
+                "content": (
+                    "Summary of the earlier part of this conversation (those messages are not shown below):\n"
+                    f"{summary_row['summary']}"
+                ),
+            })
         if is_lead_cooldown_active(conversation):
             # Cooldown aktiv — lead yaratilgan va hali vaqt o'tmagan
             messages.append({
@@ -2361,9 +2940,17 @@ async def generate_ai_reply(session: AsyncSession, conversation_id: int) -> Opti
                     "scheduled_time=<new time from client>, and updated service interest in the notes if possible."
                 ),
             })
-        for item in history:
-            role = "assistant" if item["sender_type"] in ("ai", "operator") else "user"
-            messages.append({"role": role, "content": item["text"]})
+        history_messages = [build_ai_history_message(item) for item in history]
+        recent_messages = fit_recent_messages(
+            history_messages,
+            COGNILABSAI_PROMPT_TOKEN_BUDGET - estimate_prompt_tokens(messages),
+        )
+        messages.extend(recent_messages)
+        print(
+            f"[cognilabsai-prompt] conversation {conversation_id} ~{estimate_prompt_tokens(messages)} tokens "
+            f"({len(recent_messages)}/{len(history)} recent messages, summary={'yes' if summary_row else 'no'})",
+            flush=True,
+        )
 
         if lead_created:
             payload = apply_reasoning_defaults({
@@ -2403,16 +2990,53 @@ async def generate_ai_reply(session: AsyncSession, conversation_id: int) -> Opti
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
         }
-        async with httpx.AsyncClient(timeout=90) as client:
-            response = await client.post(f"{base_url}/chat/completions", headers=headers, json=payload)
+        # Reads are done: give the pool connection back while the model generates
+        await release_session_connection(session)
+        if on_delta is not None:
+            try:
+                async with http_clients.use("llm") as client, llm_telemetry.track(
+                    "cognilabsai.reply", model, f"{base_url}/chat/completions"
+                ) as call:
+                    streamed = await stream_chat_completion(
+                        client,
+                        f"{base_url}/chat/completions",
+                        headers=headers,
+                        payload=payload,
+                        on_delta=on_delta,
+                        should_abort=should_abort,
+                        timeout=90,
+                    )
+                    call.status_code = 200
+                    call.first_token_seconds = streamed["first_token_seconds"]
+                    call.set_usage(streamed["usage"])
+            except LLMHTTPError as http_exc:
+                print(f"OpenAI error {http_exc.status_code}: {http_exc.body}")
+                return None
+            message = streamed["message"]
+            first_token_seconds = streamed["first_token_seconds"]
+            print(
+                f"[cognilabsai-stream] conversation {conversation_id} "
+                f"ttft={first_token_seconds if first_token_seconds is None else round(first_token_seconds, 3)}s "
+                f"total={streamed['total_seconds']:.3f}s",
+                flush=True,
+            )
+        else:
+            response = await post_llm(
+                "cognilabsai.reply",
+                model,
+                f"{base_url}/chat/completions",
+                headers=headers,
+                payload=payload,
+                timeout=90,
+            )
             if response.status_code >= 400:
                 print(f"OpenAI error {response.status_code}: {response.text}")
                 return None
             data = response.json()
-        choices = data.get("choices") or []
-        if not choices:
-            return None
-        message = choices[0].get("message") or {}
+            choices = data.get("choices") or []
+            if not choices:
+                return None
+            message = choices[0].get("message") or {}
         print("GPT Message Structure:", json.dumps(message, indent=2, ensure_ascii=False), flush=True)
 
         tool_data = extract_register_customer_arguments(message)
@@ -2471,14 +3095,24 @@ async def generate_ai_reply(session: AsyncSession, conversation_id: int) -> Opti
         if reply_text:
             return reply_text
         return "😓 Botdan javob olinmadi. Iltimos, operatorga yozing."
+    except LLMStreamAborted:
+        raise
+    except CircuitOpenError as exc:
+        # upstream is failing: answer right away instead of waiting out the timeout
+        print(f"[cognilabsai] AI reply skipped (conversation {conversation_id}): {exc}", flush=True)
+        return AI_UNAVAILABLE_REPLY
     except Exception as exc:
         import traceback
         print(f"[cognilabsai] Error in generate_ai_reply (conversation {conversation_id}): {exc}", flush=True)
         traceback.print_exc()
-        return "😓 Uzr, operator hozir aloqada emas edi. Iltimos, keyinroq urinib ko'ring."
+        return AI_UNAVAILABLE_REPLY
 
 
-async def maybe_send_ai_reply(session: AsyncSession, conversation_id: int):
+async def maybe_send_ai_reply(
+    session: AsyncSession,
+    conversation_id: int,
+    is_stale: Optional[Callable[[], bool]] = None,
+):
     conversation = await get_conversation(session, conversation_id)
     if not conversation:
         return None
@@ -2504,33 +3138,65 @@ async def maybe_send_ai_reply(session: AsyncSession, conversation_id: int):
             )
         else:
             return None
-    reply_text = await generate_ai_reply(session, conversation_id)
+    faq_question = await get_standalone_client_question(session, conversation)
+    faq_entry = await lookup_faq_answer(session, faq_question, config) if faq_question else None
+    # Commit the hit counter now rather than holding it (and the connection) across the send below
+    await release_session_connection(session, commit=True)
+    stream = AIReplyStreamBroadcaster(conversation_id)
+    # Website replies are only worth generating while the visitor is still on the page
+    watch_visitor = conversation["channel"] == "website_ai" and manager.has_website_visitor(conversation_id)
+    visitor_gone_since: Optional[float] = None
+
+    def should_abort() -> bool:
+        nonlocal visitor_gone_since
+        if is_stale is not None and is_stale():
+            return True
+        if not watch_visitor:
+            return False
+        if manager.has_website_visitor(conversation_id):
+            visitor_gone_since = None
+            return False
+        # A dropped socket usually reconnects; a reply finished meanwhile is saved and replayed on resume
+        if visitor_gone_since is None:
+            visitor_gone_since = time.monotonic()
+        return time.monotonic() - visitor_gone_since >= WEBSITE_VISITOR_GRACE_SECONDS
+
+    if faq_entry is not None:
+        reply_text = faq_entry["answer_text"]
+    else:
+        generation_started = time.perf_counter()
+        try:
+            reply_text = await generate_ai_reply(session, conversation_id, on_delta=stream.push, should_abort=should_abort)
+        except LLMStreamAborted:
+            await stream.abort("superseded" if is_stale is not None and is_stale() else "visitor_disconnected")
+            return None
+        await stream.flush()
+        faq_answer_index.record_generation(time.perf_counter() - generation_started)
+        if faq_question and reply_text and not (is_stale is not None and is_stale()):
+            try:
+                await record_faq_candidate(session, config, conversation_id, faq_question, reply_text)
+            except Exception as exc:
+                await session.rollback()
+                print(f"[cognilabsai-faq] candidate error (conversation {conversation_id}): {exc}", flush=True)
     if not reply_text:
+        await stream.abort("empty")
         return None
-    if conversation["channel"] == "instagram":
-        access_token = config.get("instagram_access_token")
-        if not access_token:
+    if is_stale is not None and is_stale():
+        # Newer client messages arrived while generating; the coordinator will run a fresh reply
+        await stream.abort("superseded")
+        return None
+    await release_session_connection(session, commit=True)
+    if conversation["channel"] in ("instagram", "telegram"):
+        if conversation["channel"] == "instagram" and not config.get("instagram_access_token"):
+            await stream.abort("not_sent")
             return None
-        instagram_message_id = await send_instagram_message(access_token, conversation["client_external_id"], reply_text)
-        return await create_message(
+        return await queue_outbound_message(
             session,
-            conversation_id=conversation_id,
-            channel="instagram",
+            conversation,
             sender_type="ai",
             text_value=reply_text,
-            client_external_id=conversation["client_external_id"],
-            instagram_message_id=instagram_message_id,
-        )
-    if conversation["channel"] == "telegram":
-        telegram_message_id = await telegram_userbot_manager.send_message(conversation["client_external_id"], reply_text)
-        return await create_message(
-            session,
-            conversation_id=conversation_id,
-            channel="telegram",
-            sender_type="ai",
-            text_value=reply_text,
-            client_external_id=conversation["client_external_id"],
-            telegram_message_id=telegram_message_id,
+            idempotency_key=f"ai:{stream.stream_id}",
+            stream_id=stream.stream_id,
         )
     if conversation["channel"] == "website_ai":
         return await create_message(
@@ -2540,45 +3206,92 @@ async def maybe_send_ai_reply(session: AsyncSession, conversation_id: int):
             sender_type="ai",
             text_value=reply_text,
             client_external_id=conversation["client_external_id"],
+            stream_id=stream.stream_id,
         )
     return None
 
 
+async def instagram_message_exists(session: AsyncSession, instagram_message_id: str) -> bool:
+    result = await session.execute(
+        select(cognilabsai_message.c.id)
+        .where(cognilabsai_message.c.instagram_message_id == instagram_message_id)
+        .limit(1)
+    )
+    return result.scalar() is not None
+
+
+async def run_coordinated_ai_reply(conversation_id: int, is_stale: Callable[[], bool]) -> Optional[dict]:
+    with pool_hold_monitor.label("cognilabsai.ai_reply"):
+        async with async_session_maker() as session:
+            created = await maybe_send_ai_reply(session, conversation_id, is_stale=is_stale)
+    if created is not None:
+        # off the reply path: the visitor already has the answer
+        schedule_conversation_summary(conversation_id)
+    return created
+
+
+ai_reply_coordinator = AIReplyCoordinator(
+    run_coordinated_ai_reply,
+    debounce_seconds=COGNILABSAI_REPLY_DEBOUNCE_SECONDS,
+)
+
+
+def request_ai_reply(conversation_id: int) -> asyncio.Future:
+    return ai_reply_coordinator.request(conversation_id)
+
+
+async def process_instagram_messaging_event(session: AsyncSession, item: dict):
+    message_data = item.get("message") or {}
+    if item.get("sender", {}).get("id") == item.get("recipient", {}).get("id"):
+        return
+    if message_data.get("is_echo"):
+        return
+    text_value = message_data.get("text")
+    if not text_value:
+        return
+    instagram_message_id = message_data.get("mid")
+    if instagram_message_id and await instagram_message_exists(session, instagram_message_id):
+        return
+    sender_id = str(item["sender"]["id"])
+    recipient_id = str(item["recipient"]["id"])
+    conversation = await upsert_conversation(
+        session,
+        channel="instagram",
+        client_external_id=sender_id,
+        instagram_business_id=recipient_id,
+    )
+    await create_message(
+        session,
+        conversation_id=conversation["id"],
+        channel="instagram",
+        sender_type="client",
+        text_value=text_value,
+        client_external_id=sender_id,
+        instagram_message_id=instagram_message_id,
+    )
+    request_ai_reply(conversation["id"])
+
+
 async def process_instagram_webhook_payload(session: AsyncSession, payload: dict):
     await ensure_schema(session)
-    entries = payload.get("entry") or []
-    for entry in entries:
-        messaging_items = entry.get("messaging") or []
-        for item in messaging_items:
-            message_data = item.get("message") or {}
-            if item.get("sender", {}).get("id") == item.get("recipient", {}).get("id"):
-                continue
-            if message_data.get("is_echo"):
-                continue
-            text_value = message_data.get("text")
-            if not text_value:
-                continue
-            sender_id = str(item["sender"]["id"])
-            recipient_id = str(item["recipient"]["id"])
-            conversation = await upsert_conversation(
-                session,
-                channel="instagram",
-                client_external_id=sender_id,
-                instagram_business_id=recipient_id,
-            )
-            await create_message(
-                session,
-                conversation_id=conversation["id"],
-                channel="instagram",
-                sender_type="client",
-                text_value=text_value,
-                client_external_id=sender_id,
-                instagram_message_id=message_data.get("mid"),
-            )
-            try:
-                await maybe_send_ai_reply(session, conversation["id"])
-            except Exception as exc:
-                print(f"Instagram AI reply error for conversation {conversation['id']}: {exc}")
+    for item in iter_instagram_messaging_events(payload):
+        await process_instagram_messaging_event(session, item)
+
+
+async def enqueue_instagram_webhook_payload(session: AsyncSession, payload: dict) -> int:
+    await ensure_schema(session)
+    return await instagram_webhook_inbox.enqueue(session, payload)
+
+
+async def replay_instagram_webhook_inbox(
+    session: AsyncSession,
+    *,
+    ids: Optional[list[int]] = None,
+    status: Optional[str] = None,
+    limit: int = 100,
+) -> int:
+    await ensure_schema(session)
+    return await instagram_webhook_inbox.replay(ids=ids, status=status, limit=limit)
 
 
 async def process_telegram_userbot_message(
@@ -2593,7 +3306,7 @@ async def process_telegram_userbot_message(
     avatar_url: Optional[str],
 ):
     if not text and not media_url:
-        return
+        return None
     async with async_session_maker() as session:
         await ensure_schema(session)
         conversation = await upsert_conversation(
@@ -2604,7 +3317,7 @@ async def process_telegram_userbot_message(
             client_full_name=full_name,
             client_avatar_url=avatar_url,
         )
-        await create_message(
+        return await create_message(
             session,
             conversation_id=conversation["id"],
             channel="telegram",
@@ -2616,6 +3329,31 @@ async def process_telegram_userbot_message(
         )
 
 
+async def attach_message_media(conversation_id: int, message_id: int, media_url: str) -> None:
+    """Sets the media URL of a message saved before its file was downloaded"""
+    async with async_session_maker() as session:
+        result = await session.execute(
+            update(cognilabsai_message)
+            .where(
+                cognilabsai_message.c.id == message_id,
+                cognilabsai_message.c.media_url.is_(None),
+            )
+            .values(media_url=media_url)
+            .returning(*cognilabsai_message.c)
+        )
+        message = result.mappings().first()
+        await session.commit()
+    if message is not None:
+        await manager.broadcast(
+            {
+                "type": "message.updated",
+                "conversation_id": conversation_id,
+                "message": dict(message),
+            },
+            conversation_id=conversation_id,
+        )
+
+
 async def start_telegram_outbound_conversation(session: AsyncSession, peer: str, text_value: str, current_user) -> dict:
     snapshot = await telegram_userbot_manager.resolve_peer_snapshot(peer)
     conversation = await upsert_conversation(
@@ -2627,17 +3365,15 @@ async def start_telegram_outbound_conversation(session: AsyncSession, peer: str,
         client_avatar_url=snapshot.get("avatar_url"),
     )
     operator_name = " ".join(value for value in [getattr(current_user, "name", None), getattr(current_user, "surname", None)] if value) or getattr(current_user, "email", None)
-    telegram_message_id = await telegram_userbot_manager.send_message(peer, text_value)
-    message = await create_message(
+    # resolving the peer above put it in the userbot's entity cache, so the worker can send by id
+    message = await queue_outbound_message(
         session,
-        conversation_id=conversation["id"],
-        channel="telegram",
+        conversation,
         sender_type="operator",
         text_value=text_value,
+        idempotency_key=f"operator:{conversation['id']}:{uuid4().hex}",
         operator_user_id=current_user.id,
         operator_name_snapshot=operator_name,
-        client_external_id=snapshot["external_id"],
-        telegram_message_id=telegram_message_id,
     )
     updated_conversation = await set_conversation_pause(
         session,
@@ -2881,58 +3617,21 @@ async def send_default_instagram_follow_up_message(session: AsyncSession, conver
     return True
 
 
-async def process_pending_follow_ups():
+async def dispatch_due_follow_up(conversation_id: int) -> None:
+    """Sends the follow-up the scheduler found due, the manual one when enabled, otherwise the default Instagram step"""
     if not FOLLOW_UPS_ENABLED:
         return
     async with async_session_maker() as session:
-        now = utcnow()
-        manual_result = await session.execute(
-            select(cognilabsai_conversation.c.id)
-            .where(
-                cognilabsai_conversation.c.follow_up_enabled == True,
-                cognilabsai_conversation.c.follow_up_due_at.is_not(None),
-                cognilabsai_conversation.c.follow_up_due_at <= now,
-            )
-            .order_by(cognilabsai_conversation.c.follow_up_due_at.asc())
-        )
-        manual_conversation_ids = [row[0] for row in manual_result.all()]
-        default_result = await session.execute(
-            select(cognilabsai_conversation.c.id)
-            .where(
-                cognilabsai_conversation.c.channel == "instagram",
-                cognilabsai_conversation.c.crm_customer_id.is_(None),
-                cognilabsai_conversation.c.follow_up_enabled == False,
-                cognilabsai_conversation.c.default_follow_up_due_at.is_not(None),
-                cognilabsai_conversation.c.default_follow_up_due_at <= now,
-            )
-            .order_by(cognilabsai_conversation.c.default_follow_up_due_at.asc())
-        )
-        default_conversation_ids = [row[0] for row in default_result.all()]
-    for conversation_id in manual_conversation_ids:
-        try:
-            async with async_session_maker() as session:
-                await send_follow_up_message(session, conversation_id)
-        except Exception as exc:
-            print(f"Follow-up send error for conversation {conversation_id}: {exc}", flush=True)
-    for conversation_id in default_conversation_ids:
-        try:
-            async with async_session_maker() as session:
-                await send_default_instagram_follow_up_message(session, conversation_id)
-        except Exception as exc:
-            print(f"Default follow-up send error for conversation {conversation_id}: {exc}", flush=True)
+        conversation = await get_conversation_record(session, conversation_id)
+        if not conversation:
+            return
+        if conversation.get("follow_up_enabled"):
+            await send_follow_up_message(session, conversation_id)
+        else:
+            await send_default_instagram_follow_up_message(session, conversation_id)
 
 
-async def follow_up_scheduler_loop():
-    if not FOLLOW_UPS_ENABLED:
-        return
-    while True:
-        try:
-            await process_pending_follow_ups()
-        except asyncio.CancelledError:
-            raise
-        except Exception as exc:
-            print(f"Follow-up scheduler error: {exc}", flush=True)
-        await asyncio.sleep(FOLLOW_UP_POLL_INTERVAL_SECONDS)
+follow_up_scheduler.dispatch = dispatch_due_follow_up
 
 
 def parse_conversation_line(line: str):
@@ -3083,23 +3782,37 @@ async def import_instagram_conversations_upload(
 
 
 async def startup_cognilabsai():
-    global follow_up_scheduler_task
     async with async_session_maker() as session:
         await ensure_schema(session)
         await get_integration_config(session)
         await backfill_instagram_client_names(session)
-        await refresh_global_follow_up_schedules(session)
-        await refresh_default_instagram_follow_up_schedules(session)
+        if not FOLLOW_UPS_ENABLED:
+            # clears whatever a deploy with follow-ups left scheduled; with follow-ups on the
+            # schedules are already current and the scheduler reads them from the index
+            await refresh_global_follow_up_schedules(session)
+            await refresh_default_instagram_follow_up_schedules(session)
+    await pg_listener.start()
+    if COGNILABSAI_REALTIME_BACKEND == "postgres":
+        await realtime_bus.start()
+    await telegram_media_store.start()
     await telegram_userbot_manager.start()
-    if FOLLOW_UPS_ENABLED and (follow_up_scheduler_task is None or follow_up_scheduler_task.done()):
-        follow_up_scheduler_task = asyncio.create_task(follow_up_scheduler_loop())
+    await instagram_webhook_inbox.start()
+    await outbound_outbox.start()
+    if FOLLOW_UPS_ENABLED:
+        await follow_up_scheduler.start()
 
 
 async def shutdown_cognilabsai():
-    global follow_up_scheduler_task
-    if follow_up_scheduler_task is not None:
-        follow_up_scheduler_task.cancel()
-        with contextlib.suppress(asyncio.CancelledError):
-            await follow_up_scheduler_task
-        follow_up_scheduler_task = None
+    await follow_up_scheduler.stop()
+    await instagram_webhook_inbox.stop()
+    await ai_reply_coordinator.stop()
+    await outbound_outbox.stop()
+    summary_tasks = list(conversation_summary_tasks.values())
+    for task in summary_tasks:
+        task.cancel()
+    if summary_tasks:
+        await asyncio.gather(*summary_tasks, return_exceptions=True)
     await telegram_userbot_manager.stop()
+    await telegram_media_store.stop()
+    await realtime_bus.stop()
+    await pg_listener.stop()
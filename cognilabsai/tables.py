@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, Text, UniqueConstraint
+from sqlalchemy import BigInteger, Boolean, Column, Computed, DateTime, Index, Integer, MetaData, String, Table, Text, UniqueConstraint, literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 from models.admin_models import metadata
 
@@ -45,6 +46,7 @@ cognilabsai_global_integration = Table(
     Column("ai_globally_enabled", Boolean, nullable=False, default=True),
     Column("ai_enabled_since", DateTime, nullable=True),
     Column("websocket_api_key", String(255), nullable=True),
+    Column("config_version", BigInteger, nullable=False, default=0),
     Column("created_at", DateTime, default=datetime.utcnow),
     Column("updated_at", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow),
     extend_existing=True,
@@ -81,17 +83,56 @@ cognilabsai_conversation = Table(
     Column("default_follow_up_last_step", Integer, nullable=False, default=0),
     Column("default_follow_up_due_at", DateTime, nullable=True),
     Column("default_follow_up_last_sent_at", DateTime, nullable=True),
+    Column(
+        "next_follow_up_at",
+        DateTime,
+        Computed(
+            "CASE WHEN follow_up_enabled THEN follow_up_due_at "
+            "WHEN channel = 'instagram' AND crm_customer_id IS NULL THEN default_follow_up_due_at END",
+            persisted=True,
+        ),
+        nullable=True,
+    ),
+    Column("follow_up_claimed_until", DateTime, nullable=True),
     Column("last_message_at", DateTime, nullable=True),
     Column("last_message_preview", Text, nullable=True),
     Column("last_operator_user_id", Integer, nullable=True),
     Column("last_operator_name", String(255), nullable=True),
     Column("is_imported", Boolean, nullable=False, default=False),
+    Column("telegram_is_online", Boolean, nullable=True),
+    Column("telegram_presence_status", String(32), nullable=True),
+    Column("telegram_last_seen_at", DateTime, nullable=True),
+    Column("telegram_snapshot_at", DateTime, nullable=True),
+    Column("last_event_seq", BigInteger, nullable=False, default=0),
     Column("created_at", DateTime, default=datetime.utcnow),
     Column("updated_at", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow),
     UniqueConstraint("channel", "client_external_id", name="uq_cognilabsai_conversation_channel_client"),
     extend_existing=True,
 )
 
+Index(
+    "ix_cognilabsai_conversation_inbox",
+    cognilabsai_conversation.c.last_message_at.desc().nulls_last(),
+    cognilabsai_conversation.c.id.desc(),
+)
+Index(
+    "ix_cognilabsai_conversation_channel_inbox",
+    cognilabsai_conversation.c.channel,
+    cognilabsai_conversation.c.last_message_at.desc().nulls_last(),
+    cognilabsai_conversation.c.id.desc(),
+)
+Index(
+    "ix_cognilabsai_conversation_timed_pause",
+    cognilabsai_conversation.c.paused_until,
+    postgresql_where=(cognilabsai_conversation.c.pause_reason == "timed") & (cognilabsai_conversation.c.ai_enabled == False),
+)
+Index(
+    "ix_cognilabsai_conversation_next_follow_up",
+    cognilabsai_conversation.c.next_follow_up_at,
+    cognilabsai_conversation.c.id,
+    postgresql_where=cognilabsai_conversation.c.next_follow_up_at.isnot(None),
+)
+
 
 cognilabsai_message = Table(
     "cognilabsai_message",
@@ -110,10 +151,46 @@ cognilabsai_message = Table(
     Column("media_url", String(1000), nullable=True),
     Column("is_read", Boolean, nullable=False, default=False),
     Column("read_at", DateTime, nullable=True),
+    Column("event_seq", BigInteger, nullable=True),
+    # pending / sent / failed for replies sent through the outbox, NULL otherwise
+    Column("delivery_status", String(16), nullable=True),
+    Column("delivery_error", Text, nullable=True),
     Column("created_at", DateTime, default=datetime.utcnow),
     extend_existing=True,
 )
 
+Index(
+    "ix_cognilabsai_message_conversation_created",
+    cognilabsai_message.c.conversation_id,
+    cognilabsai_message.c.created_at,
+    cognilabsai_message.c.id,
+)
+Index(
+    "ix_cognilabsai_message_conversation_event_seq",
+    cognilabsai_message.c.conversation_id,
+    cognilabsai_message.c.event_seq,
+)
+Index(
+    "ix_cognilabsai_message_unread_client",
+    cognilabsai_message.c.conversation_id,
+    postgresql_where=(cognilabsai_message.c.sender_type == "client") & (cognilabsai_message.c.is_read == False),
+)
+Index(
+    "ix_cognilabsai_message_instagram_message_id",
+    cognilabsai_message.c.instagram_message_id,
+    postgresql_where=cognilabsai_message.c.instagram_message_id.isnot(None),
+)
+Index(
+    "ix_cognilabsai_message_telegram_message_id",
+    cognilabsai_message.c.conversation_id,
+    cognilabsai_message.c.telegram_message_id,
+    postgresql_where=cognilabsai_message.c.telegram_message_id.isnot(None),
+)
+
+# Generated to_tsvector('simple', text) column with a GIN index (migration 013). Left out of the
+# table so rows loaded with select(cognilabsai_message) and message events do not carry it.
+cognilabsai_message_search_vector = literal_column("cognilabsai_message.search_vector", TSVECTOR)
+
 
 cognilabsai_pause_event = Table(
     "cognilabsai_pause_event",
@@ -129,6 +206,12 @@ cognilabsai_pause_event = Table(
     extend_existing=True,
 )
 
+Index(
+    "ix_cognilabsai_pause_event_conversation_created",
+    cognilabsai_pause_event.c.conversation_id,
+    cognilabsai_pause_event.c.created_at,
+)
+
 
 cognilabsai_import_log = Table(
     "cognilabsai_import_log",
@@ -141,3 +224,123 @@ cognilabsai_import_log = Table(
     UniqueConstraint("source_hash", name="uq_cognilabsai_import_log_hash"),
     extend_existing=True,
 )
+
+
+cognilabsai_webhook_inbox = Table(
+    "cognilabsai_webhook_inbox",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("source", String(32), nullable=False),
+    Column("dedupe_key", String(255), nullable=False),
+    Column("conversation_key", String(255), nullable=True),
+    Column("payload", Text, nullable=False),
+    Column("status", String(16), nullable=False, default="pending"),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("last_error", Text, nullable=True),
+    Column("received_at", DateTime, default=datetime.utcnow),
+    Column("processed_at", DateTime, nullable=True),
+    UniqueConstraint("source", "dedupe_key", name="uq_cognilabsai_webhook_inbox_dedupe"),
+    extend_existing=True,
+)
+
+Index("ix_cognilabsai_webhook_inbox_status_id", cognilabsai_webhook_inbox.c.status, cognilabsai_webhook_inbox.c.id)
+
+
+cognilabsai_conversation_summary = Table(
+    "cognilabsai_conversation_summary",
+    metadata,
+    Column("conversation_id", Integer, primary_key=True),
+    Column("summary", Text, nullable=False),
+    Column("last_message_id", Integer, nullable=False),
+    Column("summarized_count", Integer, nullable=False, default=0),
+    Column("updated_at", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow),
+    extend_existing=True,
+)
+
+
+cognilabsai_faq_answer = Table(
+    "cognilabsai_faq_answer",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("config_version", BigInteger, nullable=False),
+    Column("question_key", String(64), nullable=False),
+    Column("question_text", Text, nullable=False),
+    Column("answer_text", Text, nullable=False),
+    Column("status", String(16), nullable=False, default="pending"),
+    Column("source_conversation_id", Integer, nullable=True),
+    Column("hit_count", Integer, nullable=False, default=0),
+    Column("last_hit_at", DateTime, nullable=True),
+    Column("approved_by_user_id", Integer, nullable=True),
+    Column("approved_by_name", String(255), nullable=True),
+    Column("approved_at", DateTime, nullable=True),
+    Column("created_at", DateTime, default=datetime.utcnow),
+    Column("updated_at", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow),
+    UniqueConstraint("config_version", "question_key", name="uq_cognilabsai_faq_answer_version_key"),
+    extend_existing=True,
+)
+
+Index(
+    "ix_cognilabsai_faq_answer_status_version",
+    cognilabsai_faq_answer.c.status,
+    cognilabsai_faq_answer.c.config_version,
+)
+
+
+cognilabsai_realtime_event = Table(
+    "cognilabsai_realtime_event",
+    metadata,
+    Column("id", BigInteger, primary_key=True),
+    Column("envelope", Text, nullable=False),
+    Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
+    extend_existing=True,
+)
+
+Index(
+    "ix_cognilabsai_realtime_event_created_at",
+    cognilabsai_realtime_event.c.created_at,
+)
+
+
+cognilabsai_outbound_message = Table(
+    "cognilabsai_outbound_message",
+    metadata,
+    Column("id", BigInteger, primary_key=True),
+    Column("idempotency_key", String(255), nullable=False),
+    Column("message_id", Integer, nullable=False),
+    Column("conversation_id", Integer, nullable=False),
+    Column("channel", String(32), nullable=False),
+    Column("recipient_id", String(255), nullable=False),
+    Column("text", Text, nullable=False),
+    Column("status", String(16), nullable=False, default="pending"),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("next_attempt_at", DateTime, nullable=False, default=datetime.utcnow),
+    Column("last_error", Text, nullable=True),
+    Column("remote_message_id", String(255), nullable=True),
+    Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
+    Column("sent_at", DateTime, nullable=True),
+    UniqueConstraint("idempotency_key", name="uq_cognilabsai_outbound_message_idempotency"),
+    extend_existing=True,
+)
+
+Index(
+    "ix_cognilabsai_outbound_message_due",
+    cognilabsai_outbound_message.c.channel,
+    cognilabsai_outbound_message.c.next_attempt_at,
+    postgresql_where=cognilabsai_outbound_message.c.status.in_(("pending", "sending")),
+)
+Index(
+    "ix_cognilabsai_outbound_message_conversation_open",
+    cognilabsai_outbound_message.c.conversation_id,
+    cognilabsai_outbound_message.c.id,
+    postgresql_where=cognilabsai_outbound_message.c.status.in_(("pending", "sending")),
+)
+Index(
+    "ix_cognilabsai_outbound_message_message",
+    cognilabsai_outbound_message.c.message_id,
+)
+Index(
+    "ix_cognilabsai_outbound_message_sent",
+    cognilabsai_outbound_message.c.channel,
+    cognilabsai_outbound_message.c.sent_at,
+    postgresql_where=cognilabsai_outbound_message.c.status == "sent",
+)
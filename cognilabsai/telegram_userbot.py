@@ -1,7 +1,5 @@
 import asyncio
 from datetime import datetime, timezone
-import gzip
-from pathlib import Path
 from typing import Optional
 import uuid
 import re
@@ -10,14 +8,21 @@ from sqlalchemy import select
 
 from database import async_session_maker
 
+from cognilabsai.media_store import TelegramMediaStore, gunzip_if_needed
+from cognilabsai.peer_cache import PeerSnapshotCache
 from cognilabsai.tables import cognilabsai_conversation, cognilabsai_global_integration
-from utils.file_storage import PROFILE_IMAGES_DIR, TELEGRAM_STICKERS_DIR
+
+
+# a sticker preview still downloading after this stays off its message until the sticker is sent again
+STICKER_PREVIEW_TIMEOUT_SECONDS = 60.0
 
 
 class TelegramUserbotManager:
     def __init__(self):
         self.client = None
         self._lock = asyncio.Lock()
+        self.peer_snapshots = PeerSnapshotCache(self.resolve_peer_snapshot)
+        self._preview_tasks: set[asyncio.Task] = set()
 
     async def start(self):
         async with self._lock:
@@ -56,6 +61,7 @@ class TelegramUserbotManager:
             return True
 
     async def stop(self):
+        await self.peer_snapshots.stop()
         async with self._lock:
             if self.client is not None:
                 await self.client.disconnect()
@@ -104,9 +110,11 @@ class TelegramUserbotManager:
                 "full_name": None,
                 "avatar_url": None,
             }
-            text_value, media_type, media_url = await self._build_incoming_payload(event)
+            if sender is not None:
+                self.peer_snapshots.seed(snapshot["external_id"], snapshot, age_seconds=0)
+            text_value, media_type, media_url, preview_job = self._build_incoming_payload(event)
 
-            await process_telegram_userbot_message(
+            message = await process_telegram_userbot_message(
                 peer_id=snapshot["external_id"],
                 sender_id=str(event.sender_id) if event.sender_id else None,
                 text=text_value,
@@ -116,19 +124,24 @@ class TelegramUserbotManager:
                 full_name=snapshot.get("full_name"),
                 avatar_url=snapshot.get("avatar_url"),
             )
+            if message is not None and preview_job is not None:
+                # the message is already saved and answered; its preview is attached once on disk
+                task = asyncio.create_task(self._attach_sticker_preview(message, preview_job))
+                self._preview_tasks.add(task)
+                task.add_done_callback(self._preview_tasks.discard)
 
-    async def _build_incoming_payload(self, event) -> tuple[str, Optional[str], Optional[str]]:
+    def _build_incoming_payload(self, event) -> tuple[str, Optional[str], Optional[str], Optional[tuple]]:
         text_value = (getattr(event, "raw_text", None) or "").strip()
         if text_value:
-            return text_value, None, None
+            return text_value, None, None, None
         message = getattr(event, "message", None)
         if message is None:
-            return "", None, None
+            return "", None, None, None
         if getattr(message, "sticker", False):
-            return await self._build_sticker_payload(message)
-        return "", None, None
+            return self._build_sticker_payload(message)
+        return "", None, None, None
 
-    async def _build_sticker_payload(self, message) -> tuple[str, Optional[str], Optional[str]]:
+    def _build_sticker_payload(self, message) -> tuple[str, Optional[str], Optional[str], Optional[tuple]]:
         file_obj = getattr(message, "file", None)
         emoji = getattr(file_obj, "emoji", None) if file_obj is not None else None
         mime_type = (getattr(file_obj, "mime_type", None) or "").lower() if file_obj is not None else ""
@@ -140,46 +153,68 @@ class TelegramUserbotManager:
         elif mime_type == "video/webm":
             label = "Video Sticker"
             media_type = "video_sticker"
-        media_url = await self._download_sticker_preview(message, media_type, mime_type)
-        return f"[{label}{f' {emoji}' if emoji else ''}]", media_type, media_url
-
-    async def _download_sticker_preview(self, message, media_type: str, mime_type: str) -> Optional[str]:
+        text_value = f"[{label}{f' {emoji}' if emoji else ''}]"
+        preview_job = self._sticker_preview_job(message, media_type, mime_type)
+        if preview_job is None:
+            return text_value, media_type, None, None
+        media_url = telegram_media_store.stored_url(preview_job[0])
+        if media_url is not None:
+            return text_value, media_type, media_url, None
+        return text_value, media_type, None, preview_job
+
+    def _sticker_preview_job(self, message, media_type: str, mime_type: str) -> Optional[tuple]:
+        """(stem, fetch, detect_suffix, transform) for the sticker's preview file"""
         client = self.client
         if client is None:
             return None
-        TELEGRAM_STICKERS_DIR.mkdir(parents=True, exist_ok=True)
-        payload = None
-        try:
-            if media_type in {"sticker", "animated_sticker"}:
-                payload = await client.download_media(message, file=bytes)
-            else:
-                try:
-                    payload = await client.download_media(message, file=bytes, thumb=-1)
-                except Exception:
-                    payload = await client.download_media(message, file=bytes, thumb=0)
-        except Exception:
-            payload = None
-        if not isinstance(payload, (bytes, bytearray)) or not payload:
+        document = getattr(message, "document", None)
+        document_id = getattr(document, "id", None)
+        if not document_id:
             return None
         if media_type == "animated_sticker":
-            return self._save_animated_sticker_json(bytes(payload), message)
-        suffix = self._detect_sticker_suffix(bytes(payload), mime_type, media_type)
-        file_name = f"cognilabsai_telegram_sticker_{getattr(message, 'id', uuid.uuid4().hex)}_{uuid.uuid4().hex}{suffix}"
-        destination = TELEGRAM_STICKERS_DIR / file_name
-        destination.write_bytes(bytes(payload))
-        return f"/images/telegram_stickers/{destination.name}"
-
-    def _save_animated_sticker_json(self, payload: bytes, message) -> Optional[str]:
+            return (
+                f"sticker_{document_id}",
+                lambda: client.download_media(document, file=bytes),
+                lambda payload: ".json",
+                gunzip_if_needed,
+            )
+        if media_type == "sticker":
+            return (
+                f"sticker_{document_id}",
+                lambda: client.download_media(document, file=bytes),
+                lambda payload: self._detect_sticker_suffix(payload, mime_type, media_type),
+                None,
+            )
+
+        async def fetch_video_sticker_thumb():
+            try:
+                return await client.download_media(document, file=bytes, thumb=-1)
+            except Exception:
+                return await client.download_media(document, file=bytes, thumb=0)
+
+        return (
+            f"sticker_{document_id}_thumb",
+            fetch_video_sticker_thumb,
+            # video sticker thumbnails are usually JPEG, not the sticker's own format
+            lambda payload: self._detect_sticker_suffix(payload, "", media_type),
+            None,
+        )
+
+    async def _attach_sticker_preview(self, message: dict, preview_job: tuple) -> None:
+        from cognilabsai.service import attach_message_media
+        stem, fetch, detect_suffix, transform = preview_job
         try:
-            json_bytes = gzip.decompress(payload)
-        except Exception:
-            json_bytes = payload
-        if not json_bytes:
-            return None
-        file_name = f"cognilabsai_telegram_sticker_{getattr(message, 'id', uuid.uuid4().hex)}_{uuid.uuid4().hex}.json"
-        destination = TELEGRAM_STICKERS_DIR / file_name
-        destination.write_bytes(json_bytes)
-        return f"/images/telegram_stickers/{destination.name}"
+            media_url = await telegram_media_store.resolve(
+                stem,
+                fetch,
+                detect_suffix,
+                transform=transform,
+                timeout=STICKER_PREVIEW_TIMEOUT_SECONDS,
+            )
+            if media_url is not None:
+                await attach_message_media(message["conversation_id"], message["id"], media_url)
+        except Exception as exc:
+            print(f"[cognilabsai-media] message {message['id']} sticker preview error: {exc}", flush=True)
 
     def _detect_sticker_suffix(self, payload: bytes, mime_type: str, media_type: str) -> str:
         if payload.startswith(b"\xff\xd8\xff"):
@@ -373,7 +408,7 @@ class TelegramUserbotManager:
     async def _build_snapshot(self, entity, fallback_external_id: str) -> dict:
         full_name = self._extract_full_name(entity)
         try:
-            avatar_url = await self._download_avatar(entity)
+            avatar_url = self._download_avatar(entity)
         except Exception:
             avatar_url = None
         return {
@@ -431,23 +466,19 @@ class TelegramUserbotManager:
                 except Exception:
                     pass
 
-    async def _download_avatar(self, entity) -> Optional[str]:
+    def _download_avatar(self, entity) -> Optional[str]:
         client = self.client
         if client is None:
             return None
-        PROFILE_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
         entity_id = getattr(entity, "id", None)
-        if not entity_id:
+        photo_id = getattr(getattr(entity, "photo", None), "photo_id", None)
+        if not entity_id or not photo_id:
             return None
-        base_path = PROFILE_IMAGES_DIR / f"cognilabsai_telegram_{entity_id}"
-        for existing in PROFILE_IMAGES_DIR.glob(f"{base_path.name}.*"):
-            if existing.is_file():
-                existing.unlink()
-        downloaded = await client.download_profile_photo(entity, file=str(base_path))
-        if not downloaded:
-            return None
-        downloaded_path = Path(downloaded)
-        return f"/images/profil_images/{downloaded_path.name}"
-
+        # a new profile photo gets a new photo_id, so the old file never has to be replaced
+        return telegram_media_store.ensure(
+            f"avatar_{entity_id}_{photo_id}.jpg",
+            lambda: client.download_profile_photo(entity, file=bytes),
+        )
 
+telegram_media_store = TelegramMediaStore()
 telegram_userbot_manager = TelegramUserbotManager()
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import zlib
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import async_session_maker
+
+from cognilabsai.tables import cognilabsai_webhook_inbox
+
+
+WEBHOOK_INBOX_WORKERS = 4
+
+
+def iter_instagram_messaging_events(payload: dict):
+    for entry in payload.get("entry") or []:
+        for item in entry.get("messaging") or []:
+            yield item
+
+
+def build_instagram_inbox_rows(payload: dict) -> list[dict]:
+    rows: list[dict] = []
+    now = datetime.utcnow()
+    for item in iter_instagram_messaging_events(payload):
+        encoded = json.dumps(item, ensure_ascii=False, sort_keys=True)
+        instagram_message_id = (item.get("message") or {}).get("mid")
+        rows.append(
+            {
+                "source": "instagram",
+                "dedupe_key": instagram_message_id or hashlib.sha256(encoded.encode()).hexdigest(),
+                "conversation_key": str((item.get("sender") or {}).get("id") or ""),
+                "payload": encoded,
+                "status": "pending",
+                "attempts": 0,
+                "received_at": now,
+            }
+        )
+    return rows
+
+
+class WebhookInbox:
+    """
+    Persists raw webhook events and processes them with a fixed worker pool.
+    Events are sharded by conversation key, so one conversation is always handled
+    by the same worker in arrival order while different conversations run in parallel.
+    """
+
+    def __init__(self, worker_count: int = WEBHOOK_INBOX_WORKERS):
+        self.worker_count = worker_count
+        self._queues: list[asyncio.Queue] = []
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    def _dispatch(self, row_id: int, conversation_key: Optional[str]) -> None:
+        if not self._queues:
+            return
+        shard = zlib.crc32((conversation_key or "").encode()) % len(self._queues)
+        self._queues[shard].put_nowait(row_id)
+
+    async def enqueue(self, session: AsyncSession, payload: dict) -> int:
+        rows = build_instagram_inbox_rows(payload)
+        if not rows:
+            return 0
+        result = await session.execute(
+            pg_insert(cognilabsai_webhook_inbox)
+            .values(rows)
+            .on_conflict_do_nothing(constraint="uq_cognilabsai_webhook_inbox_dedupe")
+            .returning(cognilabsai_webhook_inbox.c.id, cognilabsai_webhook_inbox.c.conversation_key)
+        )
+        inserted = result.all()
+        await session.commit()
+        for row_id, conversation_key in inserted:
+            self._dispatch(row_id, conversation_key)
+        return len(inserted)
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queues = [asyncio.Queue() for _ in range(self.worker_count)]
+        self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(cognilabsai_webhook_inbox.c.id, cognilabsai_webhook_inbox.c.conversation_key)
+                .where(cognilabsai_webhook_inbox.c.status.in_(("pending", "processing")))
+                .order_by(cognilabsai_webhook_inbox.c.id.asc())
+            )
+            for row_id, conversation_key in result.all():
+                self._dispatch(row_id, conversation_key)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        self._queues = []
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            row_id = await queue.get()
+            try:
+                await self.process_row(row_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[cognilabsai-inbox] row {row_id} worker error: {exc}", flush=True)
+            finally:
+                queue.task_done()
+
+    async def process_row(self, row_id: int, force: bool = False) -> bool:
+        from cognilabsai.service import process_instagram_messaging_event
+
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(cognilabsai_webhook_inbox).where(cognilabsai_webhook_inbox.c.id == row_id)
+            )
+            row = result.mappings().first()
+            if not row or (row["status"] == "done" and not force):
+                return False
+            await session.execute(
+                update(cognilabsai_webhook_inbox)
+                .where(cognilabsai_webhook_inbox.c.id == row_id)
+                .values(status="processing", attempts=cognilabsai_webhook_inbox.c.attempts + 1)
+            )
+            await session.commit()
+            try:
+                await process_instagram_messaging_event(session, json.loads(row["payload"]))
+                values = {"status": "done", "processed_at": datetime.utcnow(), "last_error": None}
+            except Exception as exc:
+                await session.rollback()
+                print(f"[cognilabsai-inbox] row {row_id} processing error: {exc}", flush=True)
+                values = {"status": "failed", "last_error": str(exc)[:2000]}
+            await session.execute(
+                update(cognilabsai_webhook_inbox)
+                .where(cognilabsai_webhook_inbox.c.id == row_id)
+                .values(**values)
+            )
+            await session.commit()
+            return values["status"] == "done"
+
+    async def replay(
+        self,
+        *,
+        ids: Optional[list[int]] = None,
+        status: Optional[str] = None,
+        limit: int = 100,
+        inline: bool = False,
+    ) -> int:
+        query = select(cognilabsai_webhook_inbox.c.id, cognilabsai_webhook_inbox.c.conversation_key)
+        if ids:
+            query = query.where(cognilabsai_webhook_inbox.c.id.in_(ids))
+        if status:
+            query = query.where(cognilabsai_webhook_inbox.c.status == status)
+        query = query.order_by(cognilabsai_webhook_inbox.c.id.asc()).limit(limit)
+        async with async_session_maker() as session:
+            rows = (await session.execute(query)).all()
+            if not rows:
+                return 0
+            await session.execute(
+                update(cognilabsai_webhook_inbox)
+                .where(cognilabsai_webhook_inbox.c.id.in_([row_id for row_id, _ in rows]))
+                .values(status="pending")
+            )
+            await session.commit()
+        if inline or not self.is_running:
+            for row_id, _ in rows:
+                await self.process_row(row_id)
+        else:
+            for row_id, conversation_key in rows:
+                self._dispatch(row_id, conversation_key)
+        return len(rows)
+
+
+instagram_webhook_inbox = WebhookInbox()
+
+
+async def _replay_main(args: argparse.Namespace) -> None:
+    count = await instagram_webhook_inbox.replay(
+        ids=args.id or None,
+        status=args.status,
+        limit=args.limit,
+        inline=True,
+    )
+    print(f"[cognilabsai-inbox] replayed {count} stored payload(s)")
+
+
+if __name__ == "__main__":
+    # python -m cognilabsai.webhook_inbox --status failed --limit 50
+    parser = argparse.ArgumentParser(description="Replay stored Instagram webhook payloads")
+    parser.add_argument("--id", type=int, action="append", help="Inbox row id (repeatable)")
+    parser.add_argument("--status", default=None, help="Only rows with this status (pending/processing/failed/done)")
+    parser.add_argument("--limit", type=int, default=100)
+    asyncio.run(_replay_main(parser.parse_args()))
@@ -33,10 +33,21 @@ SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
 SMTP_USERNAME = os.environ.get('SMTP_USERNAME')
 SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
 
+# Email outbox: "brevo" - haqiqiy yuborish, "stub" - offline/test uchun (faqat log qiladi).
+# Stub faqat EMAIL_PROVIDER=stub aniq berilganda ishlatiladi, aks holda ilova ishga tushmaydi
+EMAIL_PROVIDER = os.environ.get("EMAIL_PROVIDER", "brevo")
+EMAIL_OUTBOX_RATE_PER_MINUTE = int(os.environ.get("EMAIL_OUTBOX_RATE_PER_MINUTE", 60))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 5))
+
 
 
 VERIFICATION_CODE_EXPIRE_MINUTES = 30
 PASSWORD_RESET_EXPIRE_MINUTES = 30
+VERIFICATION_CODE_MAX_ATTEMPTS = int(os.environ.get("VERIFICATION_CODE_MAX_ATTEMPTS", 5))
+# Kod qayta yuborish limitlari (xotirada, har bir email / IP uchun)
+CODE_RESEND_EMAIL_LIMIT = int(os.environ.get("CODE_RESEND_EMAIL_LIMIT", 3))
+CODE_RESEND_IP_LIMIT = int(os.environ.get("CODE_RESEND_IP_LIMIT", 10))
+CODE_RESEND_WINDOW_SECONDS = int(os.environ.get("CODE_RESEND_WINDOW_SECONDS", 600))
 
 
 
@@ -101,3 +112,41 @@ GOOGLE_CALENDAR_EVENT_COLOR_ID = os.environ.get("GOOGLE_CALENDAR_EVENT_COLOR_ID"
 GOOGLE_SERVICE_ACCOUNT_JSON = os.environ.get("GOOGLE_SERVICE_ACCOUNT_JSON")
 GOOGLE_SERVICE_ACCOUNT_FILE = os.environ.get("GOOGLE_SERVICE_ACCOUNT_FILE")
 GOOGLE_SERVICE_ACCOUNT_SUBJECT = os.environ.get("GOOGLE_SERVICE_ACCOUNT_SUBJECT")
+
+
+# CognilabsAI
+# Shu oraliqda kelgan ketma-ket xabarlarga bitta AI javob (sekundlarda)
+COGNILABSAI_REPLY_DEBOUNCE_SECONDS = float(os.environ.get("COGNILABSAI_REPLY_DEBOUNCE_SECONDS", 2.0))
+# AI javob promptining taxminiy token chegarasi (system + xulosa + oxirgi xabarlar)
+COGNILABSAI_PROMPT_TOKEN_BUDGET = int(os.environ.get("COGNILABSAI_PROMPT_TOKEN_BUDGET", 3000))
+# Har bir websocket uchun navbatdagi yuborilmagan eventlar chegarasi; oshsa klient uziladi
+COGNILABSAI_WS_SEND_QUEUE_SIZE = int(os.environ.get("COGNILABSAI_WS_SEND_QUEUE_SIZE", 256))
+# Bitta eventni yuborish shundan uzoq cho'zilsa klient o'lik deb hisoblanadi (sekundlarda)
+COGNILABSAI_WS_SEND_TIMEOUT_SECONDS = float(os.environ.get("COGNILABSAI_WS_SEND_TIMEOUT_SECONDS", 10.0))
+# "local": realtime eventlar faqat shu jarayondagi websocketlarga; "postgres": NOTIFY orqali
+# boshqa worker/konteynerlardagi websocketlarga ham uzatiladi
+COGNILABSAI_REALTIME_BACKEND = os.environ.get("COGNILABSAI_REALTIME_BACKEND", "local").strip().lower()
+# Qayta ulangan website vidjetiga xotiradan qayta yuboriladigan oxirgi eventlar soni (har bir suhbat uchun)
+COGNILABSAI_WS_REPLAY_BUFFER_SIZE = int(os.environ.get("COGNILABSAI_WS_REPLAY_BUFFER_SIZE", 50))
+# Replay buffer'da saqlanadigan suhbatlar soni; oshsa eng uzoq jim turgan suhbat chiqariladi
+COGNILABSAI_WS_REPLAY_CONVERSATIONS = int(os.environ.get("COGNILABSAI_WS_REPLAY_CONVERSATIONS", 1000))
+# Instagram/Telegram javoblarini yuboruvchi outbox: "live" haqiqiy API, "stub" hech narsa yubormaydi (lokal ishlash uchun)
+COGNILABSAI_OUTBOX_SENDER = os.environ.get("COGNILABSAI_OUTBOX_SENDER", "live").strip().lower()
+# Kanal bo'yicha yuborish tezligi (sekundiga xabar) va bir zumda yuborish mumkin bo'lgan zaxira (burst)
+COGNILABSAI_OUTBOX_INSTAGRAM_RATE = float(os.environ.get("COGNILABSAI_OUTBOX_INSTAGRAM_RATE", 10.0))
+COGNILABSAI_OUTBOX_INSTAGRAM_BURST = int(os.environ.get("COGNILABSAI_OUTBOX_INSTAGRAM_BURST", 20))
+COGNILABSAI_OUTBOX_TELEGRAM_RATE = float(os.environ.get("COGNILABSAI_OUTBOX_TELEGRAM_RATE", 1.0))
+COGNILABSAI_OUTBOX_TELEGRAM_BURST = int(os.environ.get("COGNILABSAI_OUTBOX_TELEGRAM_BURST", 3))
+# Shuncha urinishdan keyin xabar "failed" deb belgilanadi
+COGNILABSAI_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("COGNILABSAI_OUTBOX_MAX_ATTEMPTS", 6))
+# Ochiq (autentifikatsiyasiz) website chat limitlari: IP bo'yicha so'rovlar va xabarlar, sessiya
+# bo'yicha xabarlar (daqiqasiga), bitta IP'dan bir vaqtda ochiq websocketlar va xabar uzunligi
+COGNILABSAI_PUBLIC_IP_REQUESTS_PER_MINUTE = int(os.environ.get("COGNILABSAI_PUBLIC_IP_REQUESTS_PER_MINUTE", 120))
+COGNILABSAI_PUBLIC_IP_MESSAGES_PER_MINUTE = int(os.environ.get("COGNILABSAI_PUBLIC_IP_MESSAGES_PER_MINUTE", 20))
+COGNILABSAI_PUBLIC_SESSION_MESSAGES_PER_MINUTE = int(os.environ.get("COGNILABSAI_PUBLIC_SESSION_MESSAGES_PER_MINUTE", 10))
+COGNILABSAI_PUBLIC_WS_PER_IP = int(os.environ.get("COGNILABSAI_PUBLIC_WS_PER_IP", 5))
+COGNILABSAI_WEBSITE_MESSAGE_MAX_CHARS = int(os.environ.get("COGNILABSAI_WEBSITE_MESSAGE_MAX_CHARS", 2000))
+
+# Database pool
+# Ulanish pool'dan shuncha sekunddan uzoq ushlab turilsa ogohlantirish yoziladi
+DB_POOL_HOLD_WARN_SECONDS = float(os.environ.get("DB_POOL_HOLD_WARN_SECONDS", 2.0))
@@ -9,10 +9,12 @@ import os
 
 
 from config import DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+from utils.db_pool_monitor import pool_hold_monitor
 DATABASE_URL = f'postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
 
 
 engine = create_async_engine(DATABASE_URL)
+pool_hold_monitor.install(engine)
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=True)
 
 Base = declarative_base()
@@ -20,4 +22,19 @@ Base = declarative_base()
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def release_session_connection(session: AsyncSession, *, commit: bool = False) -> None:
+    """
+    Ochiq tranzaksiyani yakunlab, ulanishni pool'ga qaytaradi. LLM/HTTP kabi sekin chaqiruvdan
+    oldin ishlatiladi; keyingi execute yangi qisqa tranzaksiya ochadi. Standart holatda rollback
+    qilinadi (faqat o'qigan yo'llar, masalan LLM yozgan SQL ishlagan sessiya); saqlanmagan
+    yozuvlar bo'lsa commit=True beriladi.
+    """
+    if not session.in_transaction():
+        return
+    if commit:
+        await session.commit()
+    else:
+        await session.rollback()
@@ -0,0 +1,23 @@
+-- Migration: Add Email Outbox
+-- Date: 2026-10-19
+-- Description: Transactional emails are written to email_outbox by the request
+--              and delivered asynchronously by the outbox worker (retries + backoff)
+
+-- ========================================
+-- 1. Email Outbox table
+-- ========================================
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id SERIAL PRIMARY KEY,
+    to_email VARCHAR(255) NOT NULL,
+    subject VARCHAR(500) NOT NULL,
+    html_content TEXT NOT NULL,
+    text_content TEXT,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    last_error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    sent_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_outbox_status_next_attempt ON email_outbox(status, next_attempt_at);
@@ -0,0 +1,13 @@
+-- Migration: Verification code TTL and attempt counters
+-- Date: 2026-10-19
+-- Description: verification_code is written with a single upsert; rows carry an
+--              expiry and a failed-attempt counter, expired rows are swept periodically
+
+ALTER TABLE verification_code ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE verification_code ADD COLUMN IF NOT EXISTS expires_at TIMESTAMP;
+ALTER TABLE verification_code ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT NOW();
+
+-- Eski (muddatsiz) kodlar darhol eskirgan deb hisoblanadi
+UPDATE verification_code SET expires_at = NOW() WHERE expires_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS ix_verification_code_expires_at ON verification_code(expires_at);
@@ -0,0 +1,366 @@
+-- Migration: CognilabsAI schema and index pack
+-- Date: 2026-10-19
+-- Description: CognilabsAI tables were created by runtime DDL in cognilabsai.service.ensure_schema
+--              on every startup. The DDL now lives here (idempotent, safe on databases created by
+--              the old startup code) together with the indexes the inbox, history and webhook
+--              dedup queries need. ensure_schema only checks cognilabsai_schema_migration and
+--              applies this file itself when it has not been run yet.
+
+CREATE TABLE IF NOT EXISTS cognilabsai_schema_migration (
+    name VARCHAR(255) PRIMARY KEY,
+    applied_at TIMESTAMP DEFAULT NOW()
+);
+
+-- ========================================
+-- 1. Global integration settings (single row, id = 1)
+-- ========================================
+CREATE TABLE IF NOT EXISTS cognilabsai_global_integration (
+    id SERIAL PRIMARY KEY,
+    openai_api_key TEXT,
+    openai_model VARCHAR(255),
+    openai_base_url VARCHAR(500),
+    system_prompt TEXT,
+    instagram_access_token TEXT,
+    instagram_business_id VARCHAR(255),
+    instagram_verify_token VARCHAR(255),
+    telegram_api_id VARCHAR(100),
+    telegram_api_hash VARCHAR(255),
+    telegram_session TEXT,
+    cognilabs_telegram_token TEXT,
+    cognilabs_channel_id VARCHAR(255),
+    frontend_base_url VARCHAR(1000),
+    instagram_followup_enabled BOOLEAN NOT NULL DEFAULT FALSE,
+    instagram_followup_delay_minutes INTEGER NULL,
+    instagram_followup_message TEXT NULL,
+    telegram_followup_enabled BOOLEAN NOT NULL DEFAULT FALSE,
+    telegram_followup_delay_minutes INTEGER NULL,
+    telegram_followup_message TEXT NULL,
+    instagram_default_followup_enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    instagram_default_followup_step1_enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    instagram_default_followup_step1_delay_minutes INTEGER NULL,
+    instagram_default_followup_step1_message TEXT NULL,
+    instagram_default_followup_step2_enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    instagram_default_followup_step2_delay_minutes INTEGER NULL,
+    instagram_default_followup_step2_message TEXT NULL,
+    instagram_default_followup_step3_enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    instagram_default_followup_step3_delay_minutes INTEGER NULL,
+    instagram_default_followup_step3_message TEXT NULL,
+    ai_globally_enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    ai_enabled_since TIMESTAMP NULL,
+    websocket_api_key VARCHAR(255),
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS cognilabs_telegram_token TEXT;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS cognilabs_channel_id VARCHAR(255);
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS frontend_base_url VARCHAR(1000);
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_followup_enabled BOOLEAN NOT NULL DEFAULT FALSE;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_followup_delay_minutes INTEGER NULL;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_followup_message TEXT NULL;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS telegram_followup_enabled BOOLEAN NOT NULL DEFAULT FALSE;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS telegram_followup_delay_minutes INTEGER NULL;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS telegram_followup_message TEXT NULL;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_default_followup_enabled BOOLEAN NOT NULL DEFAULT TRUE;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_default_followup_step1_enabled BOOLEAN NOT NULL DEFAULT TRUE;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_default_followup_step1_delay_minutes INTEGER NULL;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_default_followup_step1_message TEXT NULL;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_default_followup_step2_enabled BOOLEAN NOT NULL DEFAULT TRUE;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_default_followup_step2_delay_minutes INTEGER NULL;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_default_followup_step2_message TEXT NULL;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_default_followup_step3_enabled BOOLEAN NOT NULL DEFAULT TRUE;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_default_followup_step3_delay_minutes INTEGER NULL;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS instagram_default_followup_step3_message TEXT NULL;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS ai_globally_enabled BOOLEAN NOT NULL DEFAULT TRUE;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS ai_enabled_since TIMESTAMP NULL;
+
+ALTER TABLE cognilabsai_global_integration
+    ADD COLUMN IF NOT EXISTS config_version BIGINT NOT NULL DEFAULT 0;
+
+-- ========================================
+-- 2. Conversations
+-- ========================================
+CREATE TABLE IF NOT EXISTS cognilabsai_conversation (
+    id SERIAL PRIMARY KEY,
+    channel VARCHAR(32) NOT NULL,
+    client_external_id VARCHAR(255) NOT NULL,
+    client_username VARCHAR(255),
+    client_full_name VARCHAR(255),
+    client_avatar_url VARCHAR(1000),
+    instagram_business_id VARCHAR(255),
+    ai_enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    lead_created BOOLEAN NOT NULL DEFAULT FALSE,
+    crm_customer_id INTEGER NULL,
+    lead_full_name VARCHAR(255) NULL,
+    lead_phone_number VARCHAR(64) NULL,
+    lead_business_field VARCHAR(255) NULL,
+    lead_scheduled_time VARCHAR(255) NULL,
+    last_lead_created_at TIMESTAMP NULL,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    pause_reason VARCHAR(64),
+    paused_until TIMESTAMP NULL,
+    follow_up_enabled BOOLEAN NOT NULL DEFAULT FALSE,
+    follow_up_mode VARCHAR(32) NULL,
+    follow_up_delay_minutes INTEGER NULL,
+    follow_up_message TEXT NULL,
+    follow_up_due_at TIMESTAMP NULL,
+    follow_up_sent_at TIMESTAMP NULL,
+    default_follow_up_last_step INTEGER NOT NULL DEFAULT 0,
+    default_follow_up_due_at TIMESTAMP NULL,
+    default_follow_up_last_sent_at TIMESTAMP NULL,
+    last_message_at TIMESTAMP NULL,
+    last_message_preview TEXT NULL,
+    last_operator_user_id INTEGER NULL,
+    last_operator_name VARCHAR(255) NULL,
+    is_imported BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    CONSTRAINT uq_cognilabsai_conversation_channel_client UNIQUE (channel, client_external_id)
+);
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS client_avatar_url VARCHAR(1000) NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS lead_created BOOLEAN NOT NULL DEFAULT FALSE;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS crm_customer_id INTEGER NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS lead_full_name VARCHAR(255) NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS lead_phone_number VARCHAR(64) NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS lead_business_field VARCHAR(255) NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS lead_scheduled_time VARCHAR(255) NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS last_lead_created_at TIMESTAMP NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS unread_count INTEGER NOT NULL DEFAULT 0;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS follow_up_enabled BOOLEAN NOT NULL DEFAULT FALSE;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS follow_up_mode VARCHAR(32) NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS follow_up_delay_minutes INTEGER NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS follow_up_message TEXT NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS follow_up_due_at TIMESTAMP NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS follow_up_sent_at TIMESTAMP NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS default_follow_up_last_step INTEGER NOT NULL DEFAULT 0;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS default_follow_up_due_at TIMESTAMP NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS default_follow_up_last_sent_at TIMESTAMP NULL;
+
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS telegram_is_online BOOLEAN NULL,
+    ADD COLUMN IF NOT EXISTS telegram_presence_status VARCHAR(32) NULL,
+    ADD COLUMN IF NOT EXISTS telegram_last_seen_at TIMESTAMP NULL,
+    ADD COLUMN IF NOT EXISTS telegram_snapshot_at TIMESTAMP NULL;
+
+UPDATE cognilabsai_conversation
+SET last_lead_created_at = updated_at
+WHERE lead_created = TRUE
+  AND last_lead_created_at IS NULL;
+
+-- ========================================
+-- 3. Messages
+-- ========================================
+CREATE TABLE IF NOT EXISTS cognilabsai_message (
+    id SERIAL PRIMARY KEY,
+    conversation_id INTEGER NOT NULL,
+    channel VARCHAR(32) NOT NULL,
+    sender_type VARCHAR(32) NOT NULL,
+    operator_user_id INTEGER NULL,
+    operator_name_snapshot VARCHAR(255) NULL,
+    client_external_id VARCHAR(255) NULL,
+    instagram_message_id VARCHAR(255) NULL,
+    telegram_message_id VARCHAR(255) NULL,
+    text TEXT NOT NULL,
+    media_type VARCHAR(64) NULL,
+    media_url VARCHAR(1000) NULL,
+    is_read BOOLEAN NOT NULL DEFAULT FALSE,
+    read_at TIMESTAMP NULL,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+ALTER TABLE cognilabsai_message
+    ADD COLUMN IF NOT EXISTS is_read BOOLEAN NOT NULL DEFAULT FALSE;
+
+ALTER TABLE cognilabsai_message
+    ADD COLUMN IF NOT EXISTS read_at TIMESTAMP NULL;
+
+ALTER TABLE cognilabsai_message
+    ADD COLUMN IF NOT EXISTS media_type VARCHAR(64) NULL;
+
+ALTER TABLE cognilabsai_message
+    ADD COLUMN IF NOT EXISTS media_url VARCHAR(1000) NULL;
+
+UPDATE cognilabsai_message
+SET is_read = TRUE, read_at = COALESCE(read_at, created_at)
+WHERE sender_type IN ('ai', 'operator', 'system')
+  AND is_read = FALSE;
+
+UPDATE cognilabsai_conversation c
+SET unread_count = COALESCE(sub.unread_count, 0)
+FROM (
+    SELECT conversation_id, COUNT(*)::INTEGER AS unread_count
+    FROM cognilabsai_message
+    WHERE sender_type = 'client' AND is_read = FALSE
+    GROUP BY conversation_id
+) AS sub
+WHERE c.id = sub.conversation_id;
+
+UPDATE cognilabsai_conversation
+SET unread_count = 0
+WHERE id NOT IN (
+    SELECT DISTINCT conversation_id
+    FROM cognilabsai_message
+    WHERE sender_type = 'client' AND is_read = FALSE
+);
+
+-- ========================================
+-- 4. AI pause events
+-- ========================================
+CREATE TABLE IF NOT EXISTS cognilabsai_pause_event (
+    id SERIAL PRIMARY KEY,
+    conversation_id INTEGER NOT NULL,
+    action VARCHAR(32) NOT NULL,
+    reason VARCHAR(64) NULL,
+    operator_user_id INTEGER NULL,
+    operator_name VARCHAR(255) NULL,
+    pause_until TIMESTAMP NULL,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- ========================================
+-- 5. Instagram export import log
+-- ========================================
+CREATE TABLE IF NOT EXISTS cognilabsai_import_log (
+    id SERIAL PRIMARY KEY,
+    source_file VARCHAR(500) NOT NULL,
+    source_hash VARCHAR(128) NOT NULL UNIQUE,
+    conversation_id INTEGER NULL,
+    imported_at TIMESTAMP DEFAULT NOW()
+);
+
+-- ========================================
+-- 6. Webhook inbox
+-- ========================================
+CREATE TABLE IF NOT EXISTS cognilabsai_webhook_inbox (
+    id SERIAL PRIMARY KEY,
+    source VARCHAR(32) NOT NULL,
+    dedupe_key VARCHAR(255) NOT NULL,
+    conversation_key VARCHAR(255) NULL,
+    payload TEXT NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT NULL,
+    received_at TIMESTAMP DEFAULT NOW(),
+    processed_at TIMESTAMP NULL,
+    CONSTRAINT uq_cognilabsai_webhook_inbox_dedupe UNIQUE (source, dedupe_key)
+);
+
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_webhook_inbox_status_id
+    ON cognilabsai_webhook_inbox (status, id);
+
+-- ========================================
+-- 7. Indexes
+-- ========================================
+-- Inbox list: ORDER BY last_message_at DESC NULLS LAST, updated_at DESC (optionally per channel)
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_conversation_last_message
+    ON cognilabsai_conversation (last_message_at DESC NULLS LAST, updated_at DESC);
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_conversation_channel_last_message
+    ON cognilabsai_conversation (channel, last_message_at DESC NULLS LAST, updated_at DESC);
+
+-- Follow-up scheduler polls only conversations that have something due
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_conversation_follow_up_due
+    ON cognilabsai_conversation (follow_up_due_at)
+    WHERE follow_up_due_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_conversation_default_follow_up_due
+    ON cognilabsai_conversation (default_follow_up_due_at)
+    WHERE default_follow_up_due_at IS NOT NULL;
+
+-- Message history and "last AI reply" lookups by conversation and time
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_message_conversation_created
+    ON cognilabsai_message (conversation_id, created_at, id);
+
+-- Unread counters and mark-as-read
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_message_unread_client
+    ON cognilabsai_message (conversation_id)
+    WHERE sender_type = 'client' AND is_read = FALSE;
+
+-- Webhook dedup by external message id (older rows may contain duplicates, so not UNIQUE)
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_message_instagram_message_id
+    ON cognilabsai_message (instagram_message_id)
+    WHERE instagram_message_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_message_telegram_message_id
+    ON cognilabsai_message (conversation_id, telegram_message_id)
+    WHERE telegram_message_id IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_pause_event_conversation_created
+    ON cognilabsai_pause_event (conversation_id, created_at);
+
+INSERT INTO cognilabsai_schema_migration (name) VALUES ('007_cognilabsai_schema')
+ON CONFLICT (name) DO NOTHING;
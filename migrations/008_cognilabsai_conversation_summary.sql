@@ -0,0 +1,19 @@
+-- Migration: CognilabsAI rolling conversation summary
+-- Date: 2026-10-19
+-- Description: AI replies used to send the raw message history. Messages that scroll out of
+--              the recent window are now folded into one stored summary per conversation;
+--              last_message_id is the newest message already covered by the summary.
+
+-- ========================================
+-- 1. Conversation summary (one row per conversation)
+-- ========================================
+CREATE TABLE IF NOT EXISTS cognilabsai_conversation_summary (
+    conversation_id INTEGER PRIMARY KEY,
+    summary TEXT NOT NULL,
+    last_message_id INTEGER NOT NULL,
+    summarized_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO cognilabsai_schema_migration (name) VALUES ('008_cognilabsai_conversation_summary')
+ON CONFLICT (name) DO NOTHING;
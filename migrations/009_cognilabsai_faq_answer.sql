@@ -0,0 +1,33 @@
+-- Migration: CognilabsAI FAQ answer cache
+-- Date: 2026-10-19
+-- Description: Standalone visitor questions and the AI answers they got are recorded as
+--              pending FAQ entries. Operators approve (optionally editing) or evict them;
+--              approved entries for the current integration config_version are answered from
+--              cache instead of calling the model.
+
+-- ========================================
+-- 1. FAQ answers (scoped per integration config_version)
+-- ========================================
+CREATE TABLE IF NOT EXISTS cognilabsai_faq_answer (
+    id SERIAL PRIMARY KEY,
+    config_version BIGINT NOT NULL,
+    question_key VARCHAR(64) NOT NULL,
+    question_text TEXT NOT NULL,
+    answer_text TEXT NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    source_conversation_id INTEGER NULL,
+    hit_count INTEGER NOT NULL DEFAULT 0,
+    last_hit_at TIMESTAMP NULL,
+    approved_by_user_id INTEGER NULL,
+    approved_by_name VARCHAR(255) NULL,
+    approved_at TIMESTAMP NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    CONSTRAINT uq_cognilabsai_faq_answer_version_key UNIQUE (config_version, question_key)
+);
+
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_faq_answer_status_version
+    ON cognilabsai_faq_answer (status, config_version);
+
+INSERT INTO cognilabsai_schema_migration (name) VALUES ('009_cognilabsai_faq_answer')
+ON CONFLICT (name) DO NOTHING;
@@ -0,0 +1,20 @@
+-- Migration: CognilabsAI realtime event spillover
+-- Date: 2026-10-19
+-- Description: Realtime websocket events are relayed between app processes with NOTIFY on the
+--              cognilabsai_realtime channel. Events larger than a NOTIFY payload allows are
+--              stored here and only their id is notified; rows are pruned after a few minutes.
+
+-- ========================================
+-- 1. Spilled realtime events
+-- ========================================
+CREATE TABLE IF NOT EXISTS cognilabsai_realtime_event (
+    id BIGSERIAL PRIMARY KEY,
+    envelope TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_realtime_event_created_at
+    ON cognilabsai_realtime_event (created_at);
+
+INSERT INTO cognilabsai_schema_migration (name) VALUES ('010_cognilabsai_realtime_event')
+ON CONFLICT (name) DO NOTHING;
@@ -0,0 +1,44 @@
+-- Migration: CognilabsAI per-conversation event sequence
+-- Date: 2026-10-19
+-- Description: Every message gets a monotonically increasing sequence number within its
+--              conversation. A reconnecting website widget sends the last sequence it saw and
+--              only receives the messages after it instead of reloading the whole history.
+
+-- ========================================
+-- 1. Sequence columns
+-- ========================================
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS last_event_seq BIGINT NOT NULL DEFAULT 0;
+
+ALTER TABLE cognilabsai_message
+    ADD COLUMN IF NOT EXISTS event_seq BIGINT NULL;
+
+-- ========================================
+-- 2. Backfill existing messages in their display order
+-- ========================================
+WITH numbered AS (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY conversation_id ORDER BY created_at, id) AS seq
+    FROM cognilabsai_message
+)
+UPDATE cognilabsai_message AS m
+SET event_seq = numbered.seq
+FROM numbered
+WHERE m.id = numbered.id AND m.event_seq IS NULL;
+
+UPDATE cognilabsai_conversation AS c
+SET last_event_seq = latest.max_seq
+FROM (
+    SELECT conversation_id, MAX(event_seq) AS max_seq
+    FROM cognilabsai_message
+    GROUP BY conversation_id
+) AS latest
+WHERE c.id = latest.conversation_id AND c.last_event_seq < latest.max_seq;
+
+-- ========================================
+-- 3. Resume lookups
+-- ========================================
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_message_conversation_event_seq
+    ON cognilabsai_message (conversation_id, event_seq);
+
+INSERT INTO cognilabsai_schema_migration (name) VALUES ('011_cognilabsai_event_seq')
+ON CONFLICT (name) DO NOTHING;
@@ -0,0 +1,53 @@
+-- Migration: CognilabsAI inbox keyset pagination
+-- Date: 2026-10-19
+-- Description: The operator inbox is paged with a (last_message_at, id) cursor instead of OFFSET,
+--              so the inbox indexes are rebuilt on that key. The denormalized last message and
+--              unread counters are recomputed once from the messages, and expired timed pauses
+--              (cleared on every inbox load) get a partial index.
+
+-- ========================================
+-- 1. Inbox indexes on the cursor key
+-- ========================================
+DROP INDEX IF EXISTS ix_cognilabsai_conversation_last_message;
+DROP INDEX IF EXISTS ix_cognilabsai_conversation_channel_last_message;
+
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_conversation_inbox
+    ON cognilabsai_conversation (last_message_at DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_conversation_channel_inbox
+    ON cognilabsai_conversation (channel, last_message_at DESC NULLS LAST, id DESC);
+
+-- ========================================
+-- 2. Timed pauses waiting to expire
+-- ========================================
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_conversation_timed_pause
+    ON cognilabsai_conversation (paused_until)
+    WHERE pause_reason = 'timed' AND ai_enabled = FALSE;
+
+-- ========================================
+-- 3. Recompute denormalized inbox columns
+-- ========================================
+UPDATE cognilabsai_conversation AS c
+SET last_message_at = latest.created_at,
+    last_message_preview = LEFT(latest.text, 1000)
+FROM (
+    SELECT DISTINCT ON (conversation_id) conversation_id, created_at, text
+    FROM cognilabsai_message
+    ORDER BY conversation_id, created_at DESC, id DESC
+) AS latest
+WHERE c.id = latest.conversation_id
+  AND c.last_message_at IS DISTINCT FROM latest.created_at;
+
+UPDATE cognilabsai_conversation AS c
+SET unread_count = COALESCE(unread.total, 0)
+FROM cognilabsai_conversation AS target
+LEFT JOIN (
+    SELECT conversation_id, COUNT(*) AS total
+    FROM cognilabsai_message
+    WHERE sender_type = 'client' AND is_read = FALSE
+    GROUP BY conversation_id
+) AS unread ON unread.conversation_id = target.id
+WHERE c.id = target.id
+  AND c.unread_count IS DISTINCT FROM COALESCE(unread.total, 0);
+
+INSERT INTO cognilabsai_schema_migration (name) VALUES ('012_cognilabsai_inbox_keyset')
+ON CONFLICT (name) DO NOTHING;
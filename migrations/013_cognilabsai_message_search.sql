@@ -0,0 +1,22 @@
+-- Migration: CognilabsAI message full-text search
+-- Date: 2026-10-19
+-- Description: Operators search message text across conversations. A stored generated tsvector
+--              with the 'simple' configuration (no stemming, so mixed Uzbek/Russian/English text
+--              is indexed word by word) is kept on every message and indexed with GIN.
+--              Adding a stored generated column rewrites cognilabsai_message once.
+
+-- ========================================
+-- 1. Search vector
+-- ========================================
+ALTER TABLE cognilabsai_message
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', COALESCE(text, ''))) STORED;
+
+-- ========================================
+-- 2. Index
+-- ========================================
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_message_search_vector
+    ON cognilabsai_message USING GIN (search_vector);
+
+INSERT INTO cognilabsai_schema_migration (name) VALUES ('013_cognilabsai_message_search')
+ON CONFLICT (name) DO NOTHING;
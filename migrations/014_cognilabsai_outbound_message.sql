@@ -0,0 +1,47 @@
+-- Migration: CognilabsAI outbound message outbox
+-- Date: 2026-10-19
+-- Description: Operator and AI replies to Instagram and Telegram are stored first and sent by
+--              per-channel outbox workers (rate limited, retried with backoff, deduplicated by
+--              idempotency key). Delivery status is mirrored on the message row.
+
+-- ========================================
+-- 1. Outbox
+-- ========================================
+CREATE TABLE IF NOT EXISTS cognilabsai_outbound_message (
+    id BIGSERIAL PRIMARY KEY,
+    idempotency_key VARCHAR(255) NOT NULL,
+    message_id INTEGER NOT NULL,
+    conversation_id INTEGER NOT NULL,
+    channel VARCHAR(32) NOT NULL,
+    recipient_id VARCHAR(255) NOT NULL,
+    text TEXT NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    last_error TEXT,
+    remote_message_id VARCHAR(255),
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    sent_at TIMESTAMP,
+    CONSTRAINT uq_cognilabsai_outbound_message_idempotency UNIQUE (idempotency_key)
+);
+
+-- Workers poll due rows per channel; later rows of a conversation wait for the earlier open one
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_outbound_message_due
+    ON cognilabsai_outbound_message (channel, next_attempt_at)
+    WHERE status IN ('pending', 'sending');
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_outbound_message_conversation_open
+    ON cognilabsai_outbound_message (conversation_id, id)
+    WHERE status IN ('pending', 'sending');
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_outbound_message_message
+    ON cognilabsai_outbound_message (message_id);
+
+-- ========================================
+-- 2. Delivery status on messages (NULL: not sent through the outbox)
+-- ========================================
+ALTER TABLE cognilabsai_message
+    ADD COLUMN IF NOT EXISTS delivery_status VARCHAR(16) NULL;
+ALTER TABLE cognilabsai_message
+    ADD COLUMN IF NOT EXISTS delivery_error TEXT NULL;
+
+INSERT INTO cognilabsai_schema_migration (name) VALUES ('014_cognilabsai_outbound_message')
+ON CONFLICT (name) DO NOTHING;
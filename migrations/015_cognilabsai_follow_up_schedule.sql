@@ -0,0 +1,33 @@
+-- Migration: CognilabsAI follow-up schedule
+-- Date: 2026-10-19
+-- Description: One indexed next_follow_up_at per conversation (the manual follow-up when enabled,
+--              otherwise the default Instagram one) so the in-memory follow-up scheduler loads
+--              its deadlines with an index range scan instead of polling. follow_up_claimed_until
+--              keeps two app processes from sending the same follow-up.
+
+-- ========================================
+-- 1. Next follow-up deadline
+-- ========================================
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS next_follow_up_at TIMESTAMP GENERATED ALWAYS AS (
+        CASE
+            WHEN follow_up_enabled THEN follow_up_due_at
+            WHEN channel = 'instagram' AND crm_customer_id IS NULL THEN default_follow_up_due_at
+        END
+    ) STORED;
+ALTER TABLE cognilabsai_conversation
+    ADD COLUMN IF NOT EXISTS follow_up_claimed_until TIMESTAMP NULL;
+
+-- ========================================
+-- 2. Indexes
+-- ========================================
+-- The per-kind indexes only served the old polling queries
+DROP INDEX IF EXISTS ix_cognilabsai_conversation_follow_up_due;
+DROP INDEX IF EXISTS ix_cognilabsai_conversation_default_follow_up_due;
+
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_conversation_next_follow_up
+    ON cognilabsai_conversation (next_follow_up_at, id)
+    WHERE next_follow_up_at IS NOT NULL;
+
+INSERT INTO cognilabsai_schema_migration (name) VALUES ('015_cognilabsai_follow_up_schedule')
+ON CONFLICT (name) DO NOTHING;
@@ -0,0 +1,14 @@
+-- Migration: CognilabsAI outbound message retention
+-- Date: 2026-10-19
+-- Description: Outbox workers delete sent rows after a retention period; this index lets the
+--              purge find expired rows without scanning the table.
+
+-- ========================================
+-- 1. Index for the sent-row purge
+-- ========================================
+CREATE INDEX IF NOT EXISTS ix_cognilabsai_outbound_message_sent
+    ON cognilabsai_outbound_message (channel, sent_at)
+    WHERE status = 'sent';
+
+INSERT INTO cognilabsai_schema_migration (name) VALUES ('016_cognilabsai_outbound_retention')
+ON CONFLICT (name) DO NOTHING;
@@ -287,6 +287,9 @@ verification_code = Table(
     ),
     Column("code", String(10), nullable=False),
     Column("type", String(50), nullable=False),  # 'verify_email' yoki 'reset_password'
+    Column("attempts", Integer, nullable=False, default=0),  # Noto'g'ri kiritishlar soni
+    Column("expires_at", DateTime, nullable=True, index=True),
+    Column("created_at", DateTime, nullable=True, default=datetime.utcnow),
     UniqueConstraint("user_id", "type", name="unique_user_code")  # ✅ Har user uchun har type unique
 )
 
@@ -302,3 +305,22 @@ refresh_token = Table(
     Column("is_active", Boolean, default=True),
     Column("device_info", String(255), nullable=True)  # Optional: track device/browser
 )
+
+# -- EmailOutbox table: tranzaksion emaillar navbati --
+email_outbox = Table(
+    "email_outbox",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("to_email", String(255), nullable=False),
+    Column("subject", String(500), nullable=False),
+    Column("html_content", Text, nullable=False),
+    Column("text_content", Text, nullable=True),
+    Column("status", String(20), nullable=False, default="pending"),  # pending / sending / sent / failed
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("next_attempt_at", DateTime, nullable=False, default=datetime.utcnow),
+    Column("last_error", Text, nullable=True),
+    Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
+    Column("sent_at", DateTime, nullable=True),
+)
+
+Index("idx_email_outbox_status_next_attempt", email_outbox.c.status, email_outbox.c.next_attempt_at)
@@ -1,19 +1,48 @@
+import base64
+import csv
+import io
+import json
 import math
 from datetime import date, datetime, timedelta, timezone
+from typing import AsyncIterator, Literal
 from zoneinfo import ZoneInfo
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import and_, desc, func, select
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, desc, func, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth_utils.auth_func import get_current_active_user
-from database import get_async_session
+from database import async_session_maker, get_async_session
 from models.admin_models import audit_log
 from schemes.schemes_audit import AuditLogListResponse, AuditLogResponse
 from utils.audit import json_loads_audit
 
 router = APIRouter(prefix="/audit", tags=["Audit Logs"])
 
+EXPORT_FETCH_SIZE = 500
+EXPORT_CSV_COLUMNS = [
+    "id",
+    "created_at",
+    "actor_user_id",
+    "actor_email",
+    "actor_name",
+    "module",
+    "table_name",
+    "entity_type",
+    "entity_id",
+    "action",
+    "summary",
+    "before_data",
+    "after_data",
+    "changed_fields",
+    "request_id",
+    "ip_address",
+    "user_agent",
+    "is_system_action",
+    "cursor",
+]
+
 try:
     UZBEKISTAN_TZ = ZoneInfo("Asia/Tashkent")
 except Exception:
@@ -80,8 +109,7 @@ def _serialize_log(row) -> AuditLogResponse:
     )
 
 
-async def _query_audit_logs(
-    session: AsyncSession,
+def _build_audit_conditions(
     *,
     module: str | None = None,
     table_name: str | None = None,
@@ -91,9 +119,7 @@ async def _query_audit_logs(
     actor_user_id: int | None = None,
     date_from: date | None = None,
     date_to: date | None = None,
-    page: int = 1,
-    page_size: int = 50,
-) -> AuditLogListResponse:
+) -> list:
     conditions = []
     if module:
         conditions.append(audit_log.c.module == module)
@@ -115,7 +141,47 @@ async def _query_audit_logs(
         conditions.append(audit_log.c.created_at >= start_utc)
     if end_utc is not None:
         conditions.append(audit_log.c.created_at < end_utc)
+    return conditions
+
+
+def _encode_export_cursor(created_at: datetime, log_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), log_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
+
+def _decode_export_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at_raw, log_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at_raw), int(log_id)
+    except Exception as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor noto'g'ri") from exc
+
+
+async def _query_audit_logs(
+    session: AsyncSession,
+    *,
+    module: str | None = None,
+    table_name: str | None = None,
+    entity_type: str | None = None,
+    entity_id: str | None = None,
+    action: str | None = None,
+    actor_user_id: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    page: int = 1,
+    page_size: int = 50,
+) -> AuditLogListResponse:
+    conditions = _build_audit_conditions(
+        module=module,
+        table_name=table_name,
+        entity_type=entity_type,
+        entity_id=entity_id,
+        action=action,
+        actor_user_id=actor_user_id,
+        date_from=date_from,
+        date_to=date_to,
+    )
     where_clause = and_(*conditions) if conditions else None
     base_query = select(audit_log)
     count_query = select(func.count(audit_log.c.id))
@@ -171,6 +237,85 @@ async def list_audit_logs(
     )
 
 
+async def _stream_audit_export(
+    conditions: list,
+    export_format: str,
+) -> AsyncIterator[str]:
+    """
+    Audit loglarni server-side cursor orqali qatorma-qator yuboradi.
+    Har bir qatorda `cursor` bor — ulanish uzilsa, oxirgi qabul qilingan cursor bilan davom ettiriladi.
+    """
+    query = (
+        select(audit_log)
+        .order_by(desc(audit_log.c.created_at), desc(audit_log.c.id))
+        .execution_options(yield_per=EXPORT_FETCH_SIZE)
+    )
+    if conditions:
+        query = query.where(and_(*conditions))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(EXPORT_CSV_COLUMNS)
+        yield buffer.getvalue()
+
+    async with async_session_maker() as session:
+        result = await session.stream(query)
+        async for row in result:
+            item = _serialize_log(row).model_dump()
+            item["cursor"] = _encode_export_cursor(row.created_at, row.id)
+            if export_format == "ndjson":
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+                continue
+            buffer.seek(0)
+            buffer.truncate(0)
+            writer.writerow(
+                [
+                    json.dumps(item[column], ensure_ascii=False) if isinstance(item[column], (dict, list)) else item[column]
+                    for column in EXPORT_CSV_COLUMNS
+                ]
+            )
+            yield buffer.getvalue()
+
+
+@router.get("/logs/export", summary="Audit loglarni eksport qilish (NDJSON/CSV)")
+async def export_audit_logs(
+    export_format: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+    cursor: str | None = Query(default=None, description="Oxirgi qabul qilingan qatordagi cursor (davom ettirish uchun)"),
+    module: str | None = Query(default=None),
+    table_name: str | None = Query(default=None),
+    entity_type: str | None = Query(default=None),
+    entity_id: str | None = Query(default=None),
+    action: str | None = Query(default=None),
+    actor_user_id: int | None = Query(default=None),
+    date_from: date | None = Query(default=None, description="Boshlanish sanasi (YYYY-MM-DD)"),
+    date_to: date | None = Query(default=None, description="Tugash sanasi (YYYY-MM-DD). Bo'sh bo'lsa date_from ning o'zi bir kun"),
+    current_user=Depends(get_current_active_user),
+):
+    _ensure_audit_access(current_user)
+    conditions = _build_audit_conditions(
+        module=module,
+        table_name=table_name,
+        entity_type=entity_type,
+        entity_id=entity_id,
+        action=action,
+        actor_user_id=actor_user_id,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    if cursor:
+        cursor_created_at, cursor_id = _decode_export_cursor(cursor)
+        conditions.append(tuple_(audit_log.c.created_at, audit_log.c.id) < tuple_(cursor_created_at, cursor_id))
+
+    media_type = "application/x-ndjson" if export_format == "ndjson" else "text/csv; charset=utf-8"
+    file_name = f"audit_logs.{export_format}"
+    return StreamingResponse(
+        _stream_audit_export(conditions, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={file_name}"},
+    )
+
+
 @router.get("/logs/{log_id}", response_model=AuditLogResponse, summary="Bitta audit log")
 async def get_audit_log(
     log_id: int,
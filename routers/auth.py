@@ -10,7 +10,8 @@ from config import VERIFICATION_CODE_EXPIRE_MINUTES, PASSWORD_RESET_EXPIRE_MINUT
 from sqlalchemy import func
 from utils.file_storage import delete_image_if_exists, save_image
 from utils.page_permissions import get_all_pages, get_user_permission_names, normalize_page_name
-from utils.audit import log_audit_event
+from utils.audit import client_ip, log_audit_event
+from auth_utils.rate_limiter import code_resend_limiter
 router = APIRouter(prefix="/auth",tags=['Autentifikatsiya'])
 from auth_utils.db_code_storage import db_code_storage
 
@@ -19,7 +20,6 @@ from auth_utils.db_code_storage import db_code_storage
 @router.post("/register", response_model=SuccessResponse, summary="Ro'yxatdan o'tish")
 async def register(
     user_data: UserCreate,
-    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_async_session),
 ):
     # Email mavjudligini tekshirish
@@ -96,7 +96,7 @@ async def register(
     code = email_service.generate_verification_code()
     await db_code_storage.set_code(session, user_id, code, "verify_email")
 
-    background_tasks.add_task(email_service.send_verification_email, user_data.email, code)
+    await email_service.send_verification_email(session, user_data.email, code)
 
     msg = (
         f"🎉 Birinchi CEO yaratildi! {user_data.email} ga tasdiqlash kodi yuborildi."
@@ -159,9 +159,12 @@ async def verify_email(
 @router.post("/resend-verification", response_model=SuccessResponse)
 async def resend_verification_code(
     request: EmailVerificationRequest,
-    background_tasks: BackgroundTasks,
+    http_request: Request,
     session: AsyncSession = Depends(get_async_session),
 ):
+    if not code_resend_limiter.allow(request.email, client_ip(http_request)):
+        raise HTTPException(status_code=429, detail="Juda ko'p so'rov. Birozdan keyin qayta urinib ko'ring")
+
     result = await session.execute(select(user).where(user.c.email == request.email))
     user_data = result.fetchone()
 
@@ -178,7 +181,7 @@ async def resend_verification_code(
     code = email_service.generate_verification_code()
     await db_code_storage.set_code(session, user_id, code, "verify_email")
 
-    background_tasks.add_task(email_service.send_verification_email, request.email, code)
+    await email_service.send_verification_email(session, request.email, code)
 
     return SuccessResponse(message="Yangi tasdiqlash kodi yuborildi")
 
@@ -238,9 +241,13 @@ async def login(
 @router.post("/forgot-password", response_model=SuccessResponse)
 async def forgot_password(
     request: PasswordResetRequest,
+    http_request: Request,
     background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_async_session),
 ):
+    if not code_resend_limiter.allow(request.email, client_ip(http_request)):
+        raise HTTPException(status_code=429, detail="Juda ko'p so'rov. Birozdan keyin qayta urinib ko'ring")
+
     result = await session.execute(
         select(user.c.id, user.c.chat_id).where(user.c.email == request.email)
     )
@@ -257,7 +264,7 @@ async def forgot_password(
                 code,
             )
         else:
-            background_tasks.add_task(email_service.send_password_reset_email, request.email, code)
+            await email_service.send_password_reset_email(session, request.email, code)
 
     return SuccessResponse(message="Agar email mavjud bo'lsa, parol tiklash kodi yuborildi")
 
@@ -29,7 +29,7 @@ from io import BytesIO
 from zoneinfo import ZoneInfo
 from  auth_utils.auth_func import get_current_user
 from auth_utils.auth_func import get_current_active_user
-from database import get_async_session
+from database import get_async_session, release_session_connection
 from utils.page_permissions import (
     build_permission_display_names,
     get_all_pages,
@@ -323,6 +323,8 @@ async def _recalculate_customer_priority(session: AsyncSession, customer_id: int
     customer_row = await _ensure_customer_exists(session, customer_id)
     note_rows = await _fetch_customer_note_rows(session, customer_id)
     additional_notes = [row.note for row in note_rows if getattr(row, "note", None)]
+    # Note o'zgarishi commit qilinadi, AI tahlili ulanishsiz kutiladi, natija alohida yoziladi
+    await release_session_connection(session, commit=True)
     priority_fields = await _build_customer_priority_fields(customer_row.notes, additional_notes)
     await session.execute(
         update(customer)
@@ -1085,19 +1087,6 @@ async def create_customer(
     if not phone_number.strip():
         raise HTTPException(status_code=400, detail="Telefon raqami bo'sh bo'lmasligi kerak")
 
-    # Audio yuklash
-    audio_file_id = None
-    if audio:
-        # Audio faylni validatsiya qilish
-        if not validate_audio_file(audio):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Faqat audio fayllar qabul qilinadi. Sizning fayl turi: {audio.content_type}"
-            )
-
-        # Telegram ga yuklash
-        audio_file_id = await upload_audio_to_telegram(audio)
-
     # Validate status exists in customer_status table
     from models.admin_models import customer_status_table
     status_result = await session.execute(
@@ -1124,6 +1113,22 @@ async def create_customer(
 
     resolved_status = _normalize_customer_status(status_name) or CustomerStatus.contacted
 
+    # O'qish tugadi: Telegram va AI chaqiruvlari davomida DB ulanishi band qilinmaydi
+    await release_session_connection(session)
+
+    # Audio yuklash
+    audio_file_id = None
+    if audio:
+        # Audio faylni validatsiya qilish
+        if not validate_audio_file(audio):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Faqat audio fayllar qabul qilinadi. Sizning fayl turi: {audio.content_type}"
+            )
+
+        # Telegram ga yuklash
+        audio_file_id = await upload_audio_to_telegram(audio)
+
     # Shifrlanadigan maydonlar
     encrypted_full_name = encrypt_text(full_name)
     encrypted_phone = encrypt_text(phone_number)
@@ -1199,8 +1204,9 @@ async def create_customer(
     from routers.crm_sales_manager import maybe_auto_assign_sales_manager
     try:
         await maybe_auto_assign_sales_manager(new_customer_id, session)
+        await release_session_connection(session, commit=True)
     except Exception:
-        pass  # Ignore sales manager assignment errors
+        await session.rollback()  # Ignore sales manager assignment errors
 
     await _sync_customer_calendar_best_effort(
         _calendar_customer_payload(
@@ -1280,6 +1286,9 @@ async def update_customer(
     current_full_name = _safe_decrypt(existing_customer.full_name)
     current_phone_number = _safe_decrypt(existing_customer.phone_number)
     before_snapshot = _serialize_customer_for_audit(existing_customer)
+    existing_note_rows = await _fetch_customer_note_rows(session, customer_id) if notes is not None else []
+    # O'qish tugadi: AI va Telegram chaqiruvlari davomida DB ulanishi band qilinmaydi
+    await release_session_connection(session)
 
     # --- 3. Yangilanadigan ma'lumotlarni tayyorlash ---
     update_data = {}
@@ -1303,7 +1312,6 @@ async def update_customer(
     if notes is not None:
         update_data["notes"] = notes
         update_data["aisummary"] = await generate_customer_ai_summary(notes)
-        existing_note_rows = await _fetch_customer_note_rows(session, customer_id)
         update_data.update(
             await _build_customer_priority_fields(
                 notes,
@@ -1448,6 +1456,9 @@ async def patch_customer(
     current_full_name = _safe_decrypt(existing.full_name)
     current_phone_number = _safe_decrypt(existing.phone_number)
     before_snapshot = _serialize_customer_for_audit(existing)
+    existing_note_rows = await _fetch_customer_note_rows(session, customer_id) if notes is not None else []
+    # O'qish tugadi: AI va Telegram chaqiruvlari davomida DB ulanishi band qilinmaydi
+    await release_session_connection(session)
 
     update_data = {}
     normalized_chat_url = chat_url.strip() if chat_url and chat_url.strip() else None
@@ -1470,7 +1481,6 @@ async def patch_customer(
     if notes is not None:
         update_data["notes"] = notes
         update_data["aisummary"] = await generate_customer_ai_summary(notes)
-        existing_note_rows = await _fetch_customer_note_rows(session, customer_id)
         update_data.update(
             await _build_customer_priority_fields(
                 notes,
@@ -1835,6 +1845,8 @@ async def create_customer_api_record(
         f"request received platform={customer_data.platform} phone={customer_data.phone_number} notes='{(customer_data.notes or '')[:220]}' recall_time_input={customer_data.recall_time}"
     )
 
+    # AI chaqiruvlaridan oldin chaqiruvchining ochiq tranzaksiyasi yakunlanadi
+    await release_session_connection(session, commit=True)
     created_at_uz = datetime.now(UZBEKISTAN_TZ)
     created_at = created_at_uz.replace(tzinfo=None)
     resolved_recall_time = customer_data.recall_time
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from auth_utils.auth_func import get_current_active_user
+from database import engine
+from utils.db_pool_monitor import pool_hold_monitor
+
+router = APIRouter(prefix="/db-pool", tags=["DB Pool"])
+
+
+def _ensure_pool_stats_access(current_user) -> None:
+    if current_user.company_code == "ceo" or current_user.is_admin or current_user.is_superuser:
+        return
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="DB pool statistikasini ko'rish huquqingiz yo'q")
+
+
+@router.get("/hold-times")
+async def db_pool_hold_times(
+    labels: int = Query(default=20, ge=1, le=200),
+    current_user=Depends(get_current_active_user),
+):
+    """Ulanishlarni ushlab turish vaqti histogrammasi, route kesimida va hozirgi uzoq checkout'lar"""
+    _ensure_pool_stats_access(current_user)
+    return {
+        "pool": engine.pool.status(),
+        **pool_hold_monitor.snapshot(label_limit=labels),
+    }
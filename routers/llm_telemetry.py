@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from auth_utils.auth_func import get_current_active_user
+from utils.llm_gateway import llm_telemetry
+
+router = APIRouter(prefix="/llm-telemetry", tags=["LLM Telemetry"])
+
+
+def _ensure_telemetry_access(current_user) -> None:
+    if current_user.company_code == "ceo" or current_user.is_admin or current_user.is_superuser:
+        return
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="LLM telemetriyasini ko'rish huquqingiz yo'q")
+
+
+@router.get("/summary")
+async def llm_telemetry_summary(
+    minutes: int | None = Query(default=None, ge=1, le=7 * 24 * 60),
+    current_user=Depends(get_current_active_user),
+):
+    """Feature va model kesimida latency percentillari, tokenlar, xatolar, narx va breaker holati"""
+    _ensure_telemetry_access(current_user)
+    since = None
+    if minutes is not None:
+        since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=minutes)
+    return {
+        "collecting_since": llm_telemetry.started_at,
+        "window_minutes": minutes,
+        "items": llm_telemetry.summary(since=since),
+        "circuit_breakers": llm_telemetry.breakers(),
+    }
+
+
+@router.get("/calls")
+async def llm_telemetry_calls(
+    feature: str | None = Query(default=None),
+    limit: int = Query(default=100, ge=1, le=1000),
+    current_user=Depends(get_current_active_user),
+):
+    """Oxirgi LLM chaqiruvlari (yangilari birinchi)"""
+    _ensure_telemetry_access(current_user)
+    return {"items": llm_telemetry.records(feature=feature, limit=limit)}
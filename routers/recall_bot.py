@@ -26,7 +26,7 @@ from config import (
     RECALL_DAILY_STATS_WINDOW_MINUTES,
     RECALL_DAILY_STATS_INTERVAL_DAYS
 )
-from database import get_async_session, async_session_maker
+from database import get_async_session, async_session_maker, release_session_connection
 from models.admin_models import (
     customer,
     CustomerStatus,
@@ -399,6 +399,7 @@ async def _build_ai_notes_summary_block(
     if len(notes_payload) > 7000:
         notes_payload = notes_payload[:7000]
 
+    await release_session_connection(session)
     ai_summary = await generate_customer_ai_summary(notes_payload)
     if not ai_summary:
         return f"AI xulosa ({source_label}): qisqa xulosa shakllantirib bo'lmadi."
@@ -23,10 +23,16 @@ from routers.projects import router as projects_router
 from routers.ai_chat import router as ai_chat_router
 from routers.attendance import router as attendance_router
 from routers.audit import router as audit_router
+from routers.llm_telemetry import router as llm_telemetry_router
+from routers.db_pool import router as db_pool_router
 from cognilabsai.router import router as cognilabsai_router
 from cognilabsai.service import shutdown_cognilabsai, startup_cognilabsai
-from utils.file_storage import FILES_ROOT, IMAGES_ROOT, ensure_image_directories
+from auth_utils.email_service import email_outbox_worker
+from auth_utils.db_code_storage import purge_expired_verification_codes
+from utils.file_storage import FILES_ROOT, IMAGES_ROOT, TELEGRAM_MEDIA_DIR, ImmutableStaticFiles, ensure_image_directories
 from utils.backup_service import send_daily_backup
+from utils.http_clients import http_clients
+from utils.db_pool_monitor import pool_hold_monitor, route_label
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from uuid import uuid4
 
@@ -42,6 +48,7 @@ app = FastAPI(
 )
 
 ensure_image_directories()
+app.mount("/images/telegram_media", ImmutableStaticFiles(directory=str(TELEGRAM_MEDIA_DIR)), name="telegram_media")
 app.mount("/images", StaticFiles(directory=str(IMAGES_ROOT)), name="images")
 app.mount("/files", StaticFiles(directory=str(FILES_ROOT)), name="files")
 
@@ -69,7 +76,8 @@ app.add_middleware(
 @app.middleware("http")
 async def attach_request_id(request: Request, call_next):
     request.state.request_id = str(uuid4())
-    response = await call_next(request)
+    with pool_hold_monitor.label(route_label(request.method, request.url.path)):
+        response = await call_next(request)
     response.headers["X-Request-ID"] = request.state.request_id
     return response
 
@@ -95,6 +103,8 @@ app.include_router(projects_router)
 app.include_router(ai_chat_router)
 app.include_router(attendance_router)
 app.include_router(audit_router)
+app.include_router(llm_telemetry_router)
+app.include_router(db_pool_router)
 app.include_router(cognilabsai_router)
 
 
@@ -129,7 +139,9 @@ _scheduler = AsyncIOScheduler(timezone="Asia/Tashkent")
 @app.on_event("startup")
 async def app_startup():
     await startup_cognilabsai()
+    await email_outbox_worker.start()
     _scheduler.add_job(send_daily_backup, "cron", hour=3, minute=0)
+    _scheduler.add_job(purge_expired_verification_codes, "interval", minutes=10)
     _scheduler.start()
     print("[backup] Scheduler ishga tushdi — har kuni 03:00 (Toshkent)")
 
@@ -137,7 +149,9 @@ async def app_startup():
 @app.on_event("shutdown")
 async def app_shutdown():
     await shutdown_cognilabsai()
+    await email_outbox_worker.stop()
     _scheduler.shutdown(wait=False)
+    await http_clients.aclose()
 
 
 # --------------------------------------------------
@@ -5,7 +5,7 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional, List
 from zoneinfo import ZoneInfo
 
-import httpx
+from utils.llm_gateway import post_llm
 
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -481,17 +481,19 @@ async def generate_customer_ai_summary(notes: Optional[str]) -> Optional[str]:
     }
 
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            response = await client.post(
-                f"{base_url.rstrip('/')}/responses",
-                json=payload,
-                headers=headers,
-            )
-            response.raise_for_status()
-            data = response.json()
-            summary = _extract_response_text(data)
-            if summary:
-                return summary[:500]
+        response = await post_llm(
+            "crm.customer_summary",
+            model,
+            f"{base_url.rstrip('/')}/responses",
+            headers=headers,
+            payload=payload,
+            timeout=20.0,
+        )
+        response.raise_for_status()
+        data = response.json()
+        summary = _extract_response_text(data)
+        if summary:
+            return summary[:500]
     except Exception:
         pass
 
@@ -577,42 +579,44 @@ async def infer_recall_time_from_notes_ai(
     }
 
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            _debug_recall(f"ai: sending request to model={model} base_url={base_url}")
-            response = await client.post(
-                f"{base_url.rstrip('/')}/responses",
-                json=payload,
-                headers=headers,
-            )
-            response.raise_for_status()
-            data = response.json()
-            raw_text = _extract_response_text(data)
-            _debug_recall(f"ai: raw response text='{(raw_text or '')[:220]}'")
-            if raw_text:
-                parsed_json = _extract_first_json_object(raw_text)
-                if parsed_json:
-                    _debug_recall(f"ai: parsed json={parsed_json}")
-                    recall_time_value = parsed_json.get("recall_time")
-                    if recall_time_value in (None, "", "null"):
-                        if _contains_flexible_time_phrase(cleaned_notes):
-                            result = (
-                                base_time_uz + timedelta(minutes=FLEXIBLE_RECALL_OFFSET_MINUTES)
-                            ).replace(second=0, microsecond=0)
-                            _debug_recall(
-                                f"ai: model returned null but flexible phrase matched -> {result.isoformat()}"
-                            )
-                            return result
-                        _debug_recall("ai: model returned null recall_time")
-                        return None
-                    parsed_dt = _parse_datetime_value(str(recall_time_value))
-                    if parsed_dt:
-                        result = parsed_dt.replace(second=0, microsecond=0)
-                        _debug_recall(f"ai: parsed model recall_time -> {result.isoformat()}")
+        _debug_recall(f"ai: sending request to model={model} base_url={base_url}")
+        response = await post_llm(
+            "crm.recall_inference",
+            model,
+            f"{base_url.rstrip('/')}/responses",
+            headers=headers,
+            payload=payload,
+            timeout=20.0,
+        )
+        response.raise_for_status()
+        data = response.json()
+        raw_text = _extract_response_text(data)
+        _debug_recall(f"ai: raw response text='{(raw_text or '')[:220]}'")
+        if raw_text:
+            parsed_json = _extract_first_json_object(raw_text)
+            if parsed_json:
+                _debug_recall(f"ai: parsed json={parsed_json}")
+                recall_time_value = parsed_json.get("recall_time")
+                if recall_time_value in (None, "", "null"):
+                    if _contains_flexible_time_phrase(cleaned_notes):
+                        result = (
+                            base_time_uz + timedelta(minutes=FLEXIBLE_RECALL_OFFSET_MINUTES)
+                        ).replace(second=0, microsecond=0)
+                        _debug_recall(
+                            f"ai: model returned null but flexible phrase matched -> {result.isoformat()}"
+                        )
                         return result
-                else:
-                    _debug_recall("ai: response text did not contain valid JSON object")
+                    _debug_recall("ai: model returned null recall_time")
+                    return None
+                parsed_dt = _parse_datetime_value(str(recall_time_value))
+                if parsed_dt:
+                    result = parsed_dt.replace(second=0, microsecond=0)
+                    _debug_recall(f"ai: parsed model recall_time -> {result.isoformat()}")
+                    return result
             else:
-                _debug_recall("ai: response text empty")
+                _debug_recall("ai: response text did not contain valid JSON object")
+        else:
+            _debug_recall("ai: response text empty")
     except Exception as exc:
         _debug_recall(f"ai: request failed, switching to fallback, error={exc}")
 
@@ -701,17 +705,19 @@ async def generate_update_tracking_ai_summary(
     }
 
     try:
-        async with httpx.AsyncClient(timeout=25.0) as client:
-            response = await client.post(
-                f"{base_url.rstrip('/')}/responses",
-                json=payload,
-                headers=headers,
-            )
-            response.raise_for_status()
-            data = response.json()
-            summary = _extract_response_text(data)
-            if summary:
-                return _clip_text(summary, max_len=1300)
+        response = await post_llm(
+            "update_tracking.summary",
+            model,
+            f"{base_url.rstrip('/')}/responses",
+            headers=headers,
+            payload=payload,
+            timeout=25.0,
+        )
+        response.raise_for_status()
+        data = response.json()
+        summary = _extract_response_text(data)
+        if summary:
+            return _clip_text(summary, max_len=1300)
     except Exception:
         pass
 
@@ -785,21 +791,23 @@ async def generate_customer_priority_insights(
     }
 
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            response = await client.post(
-                f"{base_url.rstrip('/')}/responses",
-                json=payload,
-                headers=headers,
-            )
-            response.raise_for_status()
-            data = response.json()
-            raw_text = _extract_response_text(data)
-            parsed = _extract_first_json_object(raw_text or "")
-            if isinstance(parsed, dict):
-                if parsed.get("industry") == "other":
-                    parsed["industry"] = None
-                parsed["priority_level"] = _normalize_priority_text(parsed.get("priority_level"))
-                return score_customer_priority(parsed)
+        response = await post_llm(
+            "crm.priority_insights",
+            model,
+            f"{base_url.rstrip('/')}/responses",
+            headers=headers,
+            payload=payload,
+            timeout=20.0,
+        )
+        response.raise_for_status()
+        data = response.json()
+        raw_text = _extract_response_text(data)
+        parsed = _extract_first_json_object(raw_text or "")
+        if isinstance(parsed, dict):
+            if parsed.get("industry") == "other":
+                parsed["industry"] = None
+            parsed["priority_level"] = _normalize_priority_text(parsed.get("priority_level"))
+            return score_customer_priority(parsed)
     except Exception:
         pass
 
@@ -5,6 +5,7 @@ from enum import Enum
 from typing import Any, Optional
 
 from fastapi import Request
+from fastapi.requests import HTTPConnection
 from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -49,6 +50,15 @@ def build_changed_fields(before_data: Optional[dict[str, Any]], after_data: Opti
     return sorted(key for key in keys if _json_safe(before.get(key)) != _json_safe(after.get(key)))
 
 
+def client_ip(connection: HTTPConnection) -> Optional[str]:
+    """
+    Peer address of the connection. X-Forwarded-For is not read here: uvicorn's proxy headers
+    support rewrites the peer from it only for proxies listed in FORWARDED_ALLOW_IPS, so a client
+    cannot pick the key its limits are counted under.
+    """
+    return connection.client.host if connection.client else None
+
+
 def request_metadata(request: Optional[Request]) -> dict[str, Optional[str]]:
     if request is None:
         return {"request_id": None, "ip_address": None, "user_agent": None}
@@ -8,7 +8,6 @@ from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
 from typing import Any, Optional
 
-import httpx
 from sqlalchemy import Date, and_, cast, desc, func, or_, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from zoneinfo import ZoneInfo
@@ -39,7 +38,9 @@ from models.user_models import (
     user,
     user_payment,
 )
+from database import release_session_connection
 from utils.crypto import decrypt_text
+from utils.llm_gateway import post_llm
 from utils.workday_overrides import fetch_override_pack, list_expected_update_days, summarize_expected_days
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -1703,6 +1704,7 @@ async def _call_llm(
     temperature: float = 0.2,
     max_tokens: int = 700,
     timeout: float = 35.0,
+    feature: str = "cims_ai.answer",
 ) -> Optional[str]:
     """
     Standard OpenAI chat/completions formatida so'rov yuboradi.
@@ -1723,12 +1725,11 @@ async def _call_llm(
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
     url = f"{base_url.rstrip('/')}/chat/completions"
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(url, json=payload, headers=headers)
-            if response.status_code != 200:
-                print(f"[cims-ai] LLM API xato {response.status_code}: {response.text[:300]}", flush=True)
-                return None
-            return _extract_any_response_text(response.json())
+        response = await post_llm(feature, model, url, headers=headers, payload=payload, timeout=timeout)
+        if response.status_code != 200:
+            print(f"[cims-ai] LLM API xato {response.status_code}: {response.text[:300]}", flush=True)
+            return None
+        return _extract_any_response_text(response.json())
     except Exception as exc:
         print(f"[cims-ai] LLM chaqirishda xato: {exc}", flush=True)
         return None
@@ -1804,6 +1805,7 @@ async def _generate_sql_analytics(
         api_key=api_key, model=model, base_url=base_url,
         system=system_prompt, user=user_text,
         temperature=0, max_tokens=400, timeout=25.0,
+        feature="cims_ai.sql_analytics",
     )
     if not raw:
         return None
@@ -1825,6 +1827,7 @@ async def _generate_sql_analytics(
             "rows_preview": preview,
         }
     except Exception as exc:
+        await session.rollback()
         print(f"[cims-ai] SQL ijro xatosi: {exc}", flush=True)
         return None
 
@@ -1843,6 +1846,8 @@ async def generate_cims_ai_answer(
         print("[cims-ai] OPENAI_API_KEY sozlanmagan, fallback qaytarilmoqda", flush=True)
         return fallback, False
 
+    # Context allaqachon yig'ilgan: LLM javobini kutayotganda DB ulanishi pool'da tursin
+    await release_session_connection(session)
     sql_analytics = None
     if "greeting" not in context.get("intents", []) and _should_run_sql_analytics(question, context):
         sql_analytics = await _generate_sql_analytics(
@@ -1851,6 +1856,7 @@ async def generate_cims_ai_answer(
         )
     if sql_analytics:
         context["sql_analytics"] = sql_analytics
+    await release_session_connection(session)
 
     history_text = "\n".join(
         f"{item.get('role', 'user')}: {item.get('content', '')}"
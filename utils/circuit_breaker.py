@@ -0,0 +1,121 @@
+# utils/circuit_breaker.py
+"""
+Tashqi upstream (LLM API) uchun circuit breaker va jitterli retry.
+
+Breaker oxirgi `window_size` ta chaqiruvni kuzatadi. Xatolar ulushi yoki sekin chaqiruvlar ulushi
+chegaradan oshsa circuit ochiladi: `open_seconds` davomida so'rovlar upstream'ga umuman
+yuborilmaydi, chaqiruvchi darhol CircuitOpenError oladi va fallback'ga o'tadi. Keyin bir nechta
+sinov so'rovi (half-open) o'tkaziladi; ular muvaffaqiyatli bo'lsa circuit yopiladi.
+"""
+import random
+import time
+from collections import deque
+from typing import Optional
+
+
+class CircuitOpenError(Exception):
+    telemetry_outcome = "circuit_open"
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit ochiq, {retry_after:.0f}s dan keyin qayta urinib ko'ring")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window_size: int = 20,
+        min_calls: int = 8,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_call_rate_threshold: float = 0.6,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 2,
+    ):
+        self.name = name
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self._window: deque[tuple[bool, bool]] = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self.stats = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0, "opened": 0}
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._window.clear()
+        self.stats["opened"] += 1
+        print(f"[circuit] {self.name} ochildi ({self.open_seconds:.0f}s)", flush=True)
+
+    def allow(self) -> None:
+        """So'rov yuborishdan oldin chaqiriladi; circuit ochiq bo'lsa CircuitOpenError."""
+        if self.state == self.OPEN:
+            remaining = self.open_seconds - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(self.name, remaining)
+            self.state = self.HALF_OPEN
+            self._half_open_in_flight = 0
+            self._half_open_successes = 0
+        if self.state == self.HALF_OPEN:
+            if self._half_open_in_flight >= self.half_open_max_calls:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(self.name, self.open_seconds)
+            self._half_open_in_flight += 1
+
+    def record(self, failed: bool, latency_seconds: float) -> None:
+        slow = latency_seconds >= self.slow_call_seconds
+        self.stats["calls"] += 1
+        self.stats["failures"] += int(failed)
+        self.stats["slow"] += int(slow)
+        if self.state == self.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            if failed or slow:
+                self._open()
+                return
+            self._half_open_successes += 1
+            if self._half_open_successes >= self.half_open_max_calls:
+                self.state = self.CLOSED
+                self._window.clear()
+                print(f"[circuit] {self.name} yopildi", flush=True)
+            return
+        if self.state == self.OPEN:
+            # circuit ochilishidan oldin yuborilgan so'rovning natijasi
+            return
+        self._window.append((failed, slow))
+        if len(self._window) < self.min_calls:
+            return
+        failures = sum(1 for item_failed, _ in self._window if item_failed)
+        slow_calls = sum(1 for _, item_slow in self._window if item_slow)
+        if failures / len(self._window) >= self.failure_rate_threshold or slow_calls / len(self._window) >= self.slow_call_rate_threshold:
+            self._open()
+
+    def release(self) -> None:
+        """Natijasi hisobga olinmaydigan chaqiruv (masalan, foydalanuvchi bekor qilgan) tugaganda"""
+        if self.state == self.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def snapshot(self) -> dict:
+        retry_after: Optional[float] = None
+        if self.state == self.OPEN:
+            retry_after = round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+        return {"name": self.name, "state": self.state, "retry_after": retry_after, **self.stats}
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Full jitter: [0, min(cap, base * 2^attempt)] oralig'ida tasodifiy kutish"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -2,10 +2,10 @@
 import os
 from datetime import datetime, timedelta
 from decimal import Decimal
-import httpx
 from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from models.admin_models import exchange_rate
+from utils.http_clients import http_clients
 
 # --- Tashqi API: CurrencyFreaks ---
 API_BASE = "https://api.currencyfreaks.com/v2.0/rates/latest"
@@ -50,7 +50,7 @@ class CurrencyService:
             return DEFAULT_RATE
 
         params = {"apikey": self.api_key}
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with http_clients.use("currency") as client:
             resp = await client.get(API_BASE, params=params)
 
             if resp.status_code == 401:
@@ -0,0 +1,159 @@
+# utils/db_pool_monitor.py
+"""
+DB pool ulanishlarini ushlab turish vaqti (checkout -> checkin) histogrammasi.
+
+AsyncSession tranzaksiya tugaguncha (commit/rollback/close) pool ulanishini ushlab turadi.
+Agar shu orada LLM yoki HTTP chaqiruvi kutilsa, ulanish sekundlab band bo'ladi va boshqa
+so'rovlar pool navbatida qoladi. Monitor har bir checkout davomiyligini bucket'larga yozadi,
+chegaradan (DB_POOL_HOLD_WARN_SECONDS) oshganlarini manbasi (HTTP route yoki fon vazifasi)
+bilan log qiladi va hozir uzoq ushlab turilgan ulanishlarni ko'rsatadi.
+"""
+import asyncio
+import contextlib
+import contextvars
+import re
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+
+from config import DB_POOL_HOLD_WARN_SECONDS
+
+
+POOL_HOLD_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SLOW_HOLD_BUFFER_SIZE = 200
+# label'lar soni cheklangan: undan keyingi yangi label'lar "other" ga yoziladi
+MAX_LABELS = 200
+BACKGROUND_LABEL = "background"
+
+_checkout_label: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("db_checkout_label", default=None)
+_numeric_segment = re.compile(r"/\d+(?=/|$)")
+# asyncio nom berilmagan har bir task'ka noyob "Task-N" nomini beradi
+_default_task_name = re.compile(r"Task-\d+")
+
+
+def route_label(method: str, path: str) -> str:
+    """`PUT /crm/customers/15` -> `PUT /crm/customers/{id}` (label'lar soni cheklangan bo'lishi uchun)"""
+    return f"{method} {_numeric_segment.sub('/{id}', path)}"
+
+
+def _current_label() -> str:
+    label = _checkout_label.get()
+    if label:
+        return label
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is None:
+        return "unknown"
+    # faqat atayin berilgan task nomi label bo'ladi, "Task-N" lar bitta umumiy label'ga tushadi
+    name = task.get_name()
+    return BACKGROUND_LABEL if _default_task_name.fullmatch(name) else name
+
+
+class PoolHoldMonitor:
+    def __init__(self, warn_seconds: float = DB_POOL_HOLD_WARN_SECONDS, buckets: tuple[float, ...] = POOL_HOLD_BUCKETS):
+        self.warn_seconds = warn_seconds
+        self.buckets = buckets
+        self.started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        self._counts = [0] * (len(buckets) + 1)
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+        self._by_label: dict[str, dict] = {}
+        self._slow: deque[dict] = deque(maxlen=SLOW_HOLD_BUFFER_SIZE)
+        self._in_use: dict[int, tuple[float, str]] = {}
+
+    def install(self, engine) -> None:
+        """AsyncEngine yoki oddiy Engine'ning pool event'lariga ulanadi"""
+        target = getattr(engine, "sync_engine", engine)
+        event.listen(target, "checkout", self._on_checkout)
+        event.listen(target, "checkin", self._on_checkin)
+
+    @contextlib.contextmanager
+    def label(self, name: str) -> Iterator[None]:
+        """Blok ichidagi checkout'lar shu nom bilan yoziladi"""
+        token = _checkout_label.set(name)
+        try:
+            yield
+        finally:
+            _checkout_label.reset(token)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self._in_use[id(connection_record)] = (time.perf_counter(), _current_label())
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        checkout = self._in_use.pop(id(connection_record), None)
+        if checkout is None:
+            return
+        started, label = checkout
+        self.observe(time.perf_counter() - started, label)
+
+    def observe(self, seconds: float, label: str) -> None:
+        index = next((position for position, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        self._counts[index] += 1
+        self._total_seconds += seconds
+        self._max_seconds = max(self._max_seconds, seconds)
+        if label not in self._by_label and len(self._by_label) >= MAX_LABELS:
+            label = "other"
+        stats = self._by_label.setdefault(label, {"checkouts": 0, "total_seconds": 0.0, "max_seconds": 0.0, "slow": 0})
+        stats["checkouts"] += 1
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        if seconds >= self.warn_seconds:
+            stats["slow"] += 1
+            self._slow.append({
+                "at": datetime.now(timezone.utc).replace(tzinfo=None),
+                "label": label,
+                "seconds": round(seconds, 3),
+            })
+            print(f"[db-pool] ulanish {seconds:.2f}s ushlab turildi: {label}", flush=True)
+
+    def snapshot(self, label_limit: int = 20) -> dict:
+        now = time.perf_counter()
+        checkouts = sum(self._counts)
+        histogram = [
+            {"le": bound, "count": count}
+            for bound, count in zip(self.buckets + (None,), self._counts)
+        ]
+        labels = sorted(
+            (
+                {
+                    "label": label,
+                    "checkouts": stats["checkouts"],
+                    "slow": stats["slow"],
+                    "mean_seconds": round(stats["total_seconds"] / stats["checkouts"], 4),
+                    "max_seconds": round(stats["max_seconds"], 3),
+                    "total_seconds": round(stats["total_seconds"], 3),
+                }
+                for label, stats in self._by_label.items()
+            ),
+            key=lambda item: item["total_seconds"],
+            reverse=True,
+        )
+        held_now = sorted(
+            (
+                {"label": label, "seconds": round(now - started, 3)}
+                for started, label in self._in_use.values()
+                if now - started >= self.warn_seconds
+            ),
+            key=lambda item: item["seconds"],
+            reverse=True,
+        )
+        return {
+            "collecting_since": self.started_at,
+            "warn_seconds": self.warn_seconds,
+            "checkouts": checkouts,
+            "in_use": len(self._in_use),
+            "mean_seconds": round(self._total_seconds / checkouts, 4) if checkouts else None,
+            "max_seconds": round(self._max_seconds, 3),
+            "histogram": histogram,
+            "labels": labels[:label_limit],
+            "held_now": held_now,
+            "recent_slow": list(reversed(self._slow)),
+        }
+
+
+pool_hold_monitor = PoolHoldMonitor()
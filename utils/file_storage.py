@@ -3,6 +3,7 @@ from typing import Optional
 from uuid import uuid4
 
 from fastapi import HTTPException, UploadFile, status
+from fastapi.staticfiles import StaticFiles
 
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -12,12 +13,14 @@ PROJECT_IMAGES_DIR = IMAGES_ROOT / "project_images"
 PROFILE_IMAGES_DIR = IMAGES_ROOT / "profil_images"
 CARD_IMAGES_DIR = IMAGES_ROOT / "card_images"
 TELEGRAM_STICKERS_DIR = IMAGES_ROOT / "telegram_stickers"
+TELEGRAM_MEDIA_DIR = IMAGES_ROOT / "telegram_media"
 PROJECT_ATTACHMENTS_DIR = FILES_ROOT / "project_attachments"
 IMAGE_CATEGORY_DIRS = {
     "project_images": PROJECT_IMAGES_DIR,
     "profil_images": PROFILE_IMAGES_DIR,
     "card_images": CARD_IMAGES_DIR,
     "telegram_stickers": TELEGRAM_STICKERS_DIR,
+    "telegram_media": TELEGRAM_MEDIA_DIR,
 }
 
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
@@ -52,9 +55,20 @@ def ensure_image_directories() -> None:
     PROFILE_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
     CARD_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
     TELEGRAM_STICKERS_DIR.mkdir(parents=True, exist_ok=True)
+    TELEGRAM_MEDIA_DIR.mkdir(parents=True, exist_ok=True)
     PROJECT_ATTACHMENTS_DIR.mkdir(parents=True, exist_ok=True)
 
 
+class ImmutableStaticFiles(StaticFiles):
+    """Fayl nomi kontent identifikatoridan olingan papkalar uchun: brauzer faylni qayta so'ramaydi"""
+
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
 def normalize_image_path(image_path: Optional[str]) -> Optional[str]:
     if not image_path:
         return None
@@ -17,6 +17,7 @@ from config import (
     GOOGLE_SERVICE_ACCOUNT_JSON,
     GOOGLE_SERVICE_ACCOUNT_SUBJECT,
 )
+from utils.http_clients import http_clients
 from utils.recall_policy import get_effective_reminder_minutes, get_event_duration_minutes
 
 GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
@@ -115,7 +116,7 @@ async def _get_access_token() -> str:
         headers=headers or None,
     )
 
-    async with httpx.AsyncClient(timeout=20.0) as client:
+    async with http_clients.use("google") as client:
         response = await client.post(
             GOOGLE_TOKEN_URL,
             data={
@@ -234,7 +235,7 @@ async def sync_customer_recall_event(customer_data: dict[str, Any]) -> None:
     }
     customer_id = int(customer_data["id"])
 
-    async with httpx.AsyncClient(timeout=20.0) as client:
+    async with http_clients.use("google") as client:
         event_id = await _find_event_id_by_customer_id(client, headers, customer_id)
 
         if customer_data.get("recall_time") is None:
@@ -272,7 +273,7 @@ async def delete_customer_recall_event(customer_id: int) -> None:
     access_token = await _get_access_token()
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    async with httpx.AsyncClient(timeout=20.0) as client:
+    async with http_clients.use("google") as client:
         event_id = await _find_event_id_by_customer_id(client, headers, customer_id)
         if not event_id:
             return
@@ -0,0 +1,114 @@
+# utils/http_clients.py
+"""
+Tashqi servislar uchun umumiy (pooled) httpx.AsyncClient'lar.
+
+Har bir upstream uchun bitta client: keep-alive ulanishlar qayta ishlatiladi,
+TCP/TLS handshake har so'rovda takrorlanmaydi. Clientlar birinchi murojaatda
+yaratiladi va app shutdown'da `http_clients.aclose()` bilan yopiladi.
+"""
+import asyncio
+import contextlib
+import importlib.util
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+import httpx
+
+
+# HTTP/2 uchun `h2` paketi kerak (pip install "httpx[http2]"); bo'lmasa HTTP/1.1 bilan ishlaymiz
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@dataclass(frozen=True)
+class UpstreamSettings:
+    timeout: float
+    connect_timeout: float = 10.0
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+
+
+UPSTREAMS: dict[str, UpstreamSettings] = {
+    # OpenAI-compatible chat/completions va responses API (CognilabsAI, CIMS AI, ai_summary)
+    "llm": UpstreamSettings(timeout=60.0, max_connections=50, max_keepalive_connections=20, keepalive_expiry=60.0),
+    # graph.facebook.com / graph.instagram.com
+    "meta_graph": UpstreamSettings(timeout=30.0, max_connections=20, max_keepalive_connections=10),
+    # oauth2.googleapis.com va Calendar API
+    "google": UpstreamSettings(timeout=20.0, max_connections=10, max_keepalive_connections=5),
+    # CurrencyFreaks: kuniga bir necha so'rov
+    "currency": UpstreamSettings(timeout=10.0, max_connections=2, max_keepalive_connections=1, http2=False),
+}
+
+
+class HTTPClientRegistry:
+    """Upstream nomi bo'yicha bitta umumiy AsyncClient"""
+
+    def __init__(self, upstreams: dict[str, UpstreamSettings]):
+        self.upstreams = upstreams
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._loops: dict[str, asyncio.AbstractEventLoop] = {}
+        # almashtirilgan clientlarni yopayotgan task'lar (GC yig'ib yubormasligi uchun)
+        self._closing: set[asyncio.Task] = set()
+
+    def _build(self, name: str) -> httpx.AsyncClient:
+        settings = self.upstreams[name]
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+            http2=settings.http2 and HTTP2_AVAILABLE,
+        )
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        if name not in self.upstreams:
+            raise KeyError(f"Noma'lum upstream: {name}")
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(name)
+        # Ulanishlar event loop'ga bog'langan: skriptlar har safar yangi asyncio.run() bilan ishlaydi
+        if client is None or client.is_closed or self._loops.get(name) is not loop:
+            if client is not None and not client.is_closed:
+                self._retire(name, client, self._loops.get(name))
+            client = self._clients[name] = self._build(name)
+            self._loops[name] = loop
+        return client
+
+    def _retire(self, name: str, client: httpx.AsyncClient, old_loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Eski loop'ga bog'langan clientni yopadi, aks holda uning pool'i va socket'lari ochiq qoladi"""
+        if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+            # boshqa thread'dagi loop hali ishlayapti: client o'z loop'ida yopiladi
+            asyncio.run_coroutine_threadsafe(client.aclose(), old_loop)
+            return
+        task = asyncio.get_running_loop().create_task(self._close_quietly(name, client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close_quietly(self, name: str, client: httpx.AsyncClient) -> None:
+        # eski loop yopilgan bo'lsa transport'larni yopish xato berishi mumkin: u faqat log qilinadi
+        try:
+            await client.aclose()
+        except Exception as exc:
+            print(f"[http-clients] {name} eski clientini yopishda xato: {exc}", flush=True)
+
+    @contextlib.asynccontextmanager
+    async def use(self, name: str) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        `async with httpx.AsyncClient(...) as client:` o'rniga ishlatiladi.
+        Blokdan chiqqanda client yopilmaydi.
+        """
+        yield self.get(name)
+
+    async def aclose(self, name: Optional[str] = None) -> None:
+        names = [name] if name else list(self._clients.keys())
+        for item in names:
+            client = self._clients.pop(item, None)
+            self._loops.pop(item, None)
+            if client is not None and not client.is_closed:
+                with contextlib.suppress(Exception):
+                    await client.aclose()
+
+
+http_clients = HTTPClientRegistry(UPSTREAMS)
@@ -2,7 +2,6 @@
 Instagram Graph API Service
 Fetches follower counts and stores them in database
 """
-import httpx
 from datetime import datetime, timedelta, date
 from decimal import Decimal
 from typing import Optional, Dict
@@ -10,6 +9,7 @@ from sqlalchemy import select, insert, update, func, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.instagram_models import instagram_account, instagram_stats
+from utils.http_clients import http_clients
 
 
 class InstagramService:
@@ -27,13 +27,14 @@ class InstagramService:
         Fetch current follower count from Instagram Graph API
         """
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
+            async with http_clients.use("meta_graph") as client:
                 response = await client.get(
                     f"{self.graph_api_base}/{ig_business_account_id}",
                     params={
                         "fields": "followers_count,follows_count,media_count",
                         "access_token": access_token
-                    }
+                    },
+                    timeout=15.0,
                 )
 
                 if response.status_code == 200:
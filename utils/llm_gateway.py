@@ -0,0 +1,238 @@
+# utils/llm_gateway.py
+"""
+LLM chaqiruvlari telemetriyasi.
+
+Har bir chat/completions yoki responses so'rovi `llm_telemetry.track(feature, model)` ichida
+bajariladi: latency, prompt/completion tokenlar, natija (ok, http_error, timeout, error, aborted)
+va taxminiy narx yoziladi. Yozuvlar jarayon xotirasidagi ring buffer'da saqlanadi (DB ga
+yozilmaydi), admin endpoint ular bo'yicha feature/model kesimida percentillarni qaytaradi.
+
+URL berilgan chaqiruvlar upstream host bo'yicha circuit breaker'dan o'tadi; `post_llm` bunga
+qo'shimcha ravishda timeout/5xx/429 da jitterli retry qiladi.
+"""
+import asyncio
+import contextlib
+import math
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, backoff_delay
+from utils.http_clients import http_clients
+
+
+TELEMETRY_BUFFER_SIZE = 5000
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# USD, 1M token uchun (input, output). Prefiks bo'yicha eng uzun moslik olinadi.
+MODEL_PRICES_PER_MILLION: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5": (1.25, 10.00),
+}
+
+
+def estimate_cost_usd(model: Optional[str], prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> Optional[float]:
+    normalized = (model or "").strip().lower()
+    matches = [prefix for prefix in MODEL_PRICES_PER_MILLION if normalized.startswith(prefix)]
+    if not matches or prompt_tokens is None:
+        return None
+    input_price, output_price = MODEL_PRICES_PER_MILLION[max(matches, key=len)]
+    return (prompt_tokens * input_price + (completion_tokens or 0) * output_price) / 1_000_000
+
+
+@dataclass
+class LLMCallRecord:
+    at: datetime
+    feature: str
+    model: Optional[str]
+    outcome: str = "ok"
+    status_code: Optional[int] = None
+    latency_seconds: float = 0.0
+    first_token_seconds: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
+
+    def set_usage(self, usage: Optional[dict]) -> None:
+        """chat/completions (prompt/completion_tokens) va responses (input/output_tokens) formatlari"""
+        if not isinstance(usage, dict):
+            return
+        prompt_tokens = usage.get("prompt_tokens", usage.get("input_tokens"))
+        completion_tokens = usage.get("completion_tokens", usage.get("output_tokens"))
+        if prompt_tokens is not None:
+            self.prompt_tokens = int(prompt_tokens)
+        if completion_tokens is not None:
+            self.completion_tokens = int(completion_tokens)
+
+    def observe(self, response: httpx.Response) -> None:
+        self.status_code = response.status_code
+        if response.status_code >= 400:
+            self.outcome = "http_error"
+
+
+def _percentile(ordered: list[float], fraction: float) -> Optional[float]:
+    if not ordered:
+        return None
+    position = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return round(ordered[position], 3)
+
+
+def is_upstream_failure(call: LLMCallRecord) -> bool:
+    if call.outcome in ("timeout", "error"):
+        return True
+    return call.outcome == "http_error" and (call.status_code or 0) in RETRYABLE_STATUS_CODES
+
+
+class LLMTelemetry:
+    def __init__(self, maxlen: int = TELEMETRY_BUFFER_SIZE):
+        self._records: deque[LLMCallRecord] = deque(maxlen=maxlen)
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self.started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def breaker_for(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc or url
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(host)
+        return breaker
+
+    def breakers(self) -> list[dict]:
+        return [breaker.snapshot() for breaker in self._breakers.values()]
+
+    @contextlib.asynccontextmanager
+    async def track(self, feature: str, model: Optional[str], url: Optional[str] = None) -> AsyncIterator[LLMCallRecord]:
+        """
+        So'rovni o'rab oladi. Blok ichida `call.observe(response)` va
+        `call.set_usage(data.get("usage"))` chaqiriladi; exception bo'lsa natija
+        avtomatik belgilanadi va exception qayta ko'tariladi. `url` berilsa circuit
+        ochiq bo'lganda blok bajarilmaydi, darhol CircuitOpenError ko'tariladi.
+        """
+        call = LLMCallRecord(at=datetime.now(timezone.utc).replace(tzinfo=None), feature=feature, model=model)
+        breaker = self.breaker_for(url) if url else None
+        if breaker is not None:
+            try:
+                breaker.allow()
+            except CircuitOpenError:
+                call.outcome = "circuit_open"
+                self._records.append(call)
+                raise
+        started = time.perf_counter()
+        try:
+            yield call
+        except httpx.TimeoutException:
+            call.outcome = "timeout"
+            raise
+        except httpx.HTTPStatusError as exc:
+            call.outcome = "http_error"
+            call.status_code = exc.response.status_code
+            raise
+        except asyncio.CancelledError:
+            # mijoz uzilgan yoki vazifa bekor qilingan: upstream xatosi emas, circuit'ga hisoblanmaydi
+            call.outcome = "aborted"
+            raise
+        except BaseException as exc:
+            call.outcome = getattr(exc, "telemetry_outcome", "error")
+            call.status_code = getattr(exc, "status_code", call.status_code)
+            raise
+        finally:
+            call.latency_seconds = time.perf_counter() - started
+            call.cost_usd = estimate_cost_usd(call.model, call.prompt_tokens, call.completion_tokens)
+            self._records.append(call)
+            if breaker is not None:
+                if call.outcome == "aborted":
+                    breaker.release()
+                else:
+                    # stream uchun sekinlik birinchi token bo'yicha o'lchanadi
+                    breaker.record(
+                        is_upstream_failure(call),
+                        call.first_token_seconds if call.first_token_seconds is not None else call.latency_seconds,
+                    )
+
+    def records(self, feature: Optional[str] = None, limit: int = 100) -> list[dict]:
+        items = [record for record in reversed(self._records) if feature is None or record.feature == feature]
+        return [asdict(record) for record in items[:limit]]
+
+    def summary(self, since: Optional[datetime] = None) -> list[dict]:
+        groups: dict[tuple[str, Optional[str]], list[LLMCallRecord]] = {}
+        for record in self._records:
+            if since is not None and record.at < since:
+                continue
+            groups.setdefault((record.feature, record.model), []).append(record)
+        rows = []
+        for (feature, model), records in groups.items():
+            latencies = sorted(record.latency_seconds for record in records)
+            first_tokens = sorted(record.first_token_seconds for record in records if record.first_token_seconds is not None)
+            outcomes: dict[str, int] = {}
+            for record in records:
+                outcomes[record.outcome] = outcomes.get(record.outcome, 0) + 1
+            costs = [record.cost_usd for record in records if record.cost_usd is not None]
+            rows.append({
+                "feature": feature,
+                "model": model,
+                "calls": len(records),
+                "outcomes": outcomes,
+                "error_rate": round(1 - outcomes.get("ok", 0) / len(records), 4),
+                "latency_p50": _percentile(latencies, 0.50),
+                "latency_p95": _percentile(latencies, 0.95),
+                "latency_p99": _percentile(latencies, 0.99),
+                "latency_max": round(latencies[-1], 3),
+                "first_token_p50": _percentile(first_tokens, 0.50),
+                "first_token_p95": _percentile(first_tokens, 0.95),
+                "prompt_tokens": sum(record.prompt_tokens or 0 for record in records),
+                "completion_tokens": sum(record.completion_tokens or 0 for record in records),
+                "cost_usd": round(sum(costs), 6) if costs else None,
+                "cost_per_call_usd": round(sum(costs) / len(costs), 6) if costs else None,
+            })
+        rows.sort(key=lambda row: (row["cost_usd"] or 0, row["latency_p95"] or 0), reverse=True)
+        return rows
+
+
+llm_telemetry = LLMTelemetry()
+
+
+async def post_llm(
+    feature: str,
+    model: Optional[str],
+    url: str,
+    *,
+    headers: dict,
+    payload: dict,
+    timeout: float,
+    attempts: int = 2,
+) -> httpx.Response:
+    """
+    LLM API ga POST. Timeout, ulanish xatosi, 429 va 5xx da jitter bilan qayta urinadi
+    (so'rovlar yon ta'sirsiz, shuning uchun takrorlash xavfsiz). Circuit ochiq bo'lsa yoki
+    ochilib qolsa darhol CircuitOpenError ko'tariladi — chaqiruvchi fallback'ga o'tadi.
+    Oxirgi urinishning javobi (xato status bo'lsa ham) qaytariladi.
+    """
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        try:
+            async with http_clients.use("llm") as client, llm_telemetry.track(feature, model, url) as call:
+                response = await client.post(url, headers=headers, json=payload, timeout=timeout)
+                call.observe(response)
+                if response.status_code < 400:
+                    try:
+                        call.set_usage(response.json().get("usage"))
+                    except ValueError:
+                        pass
+        except (httpx.TimeoutException, httpx.TransportError):
+            if last_attempt:
+                raise
+        else:
+            if response.status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+                return response
+        await asyncio.sleep(backoff_delay(attempt))
+    raise RuntimeError("unreachable")